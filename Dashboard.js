@@ -46,6 +46,7 @@ const Dashboard = ({ tenantId, user, tenants, onLogout }) => {
       aovGrowth: 0
     },
     revenueData: [],
+    revenueSeries: { labels: [], revenue: [], orders: [] },
     orderStatus: [],
     recentOrders: []
   });
@@ -102,11 +103,11 @@ const Dashboard = ({ tenantId, user, tenants, onLogout }) => {
 
   // Chart configurations
   const revenueChartData = {
-    labels: dashboardData.revenueData.map(item => item.month),
+    labels: dashboardData.revenueSeries.labels,
     datasets: [
       {
         label: 'Revenue ($)',
-        data: dashboardData.revenueData.map(item => item.revenue),
+        data: dashboardData.revenueSeries.revenue,
         borderColor: 'rgb(59, 130, 246)',
         backgroundColor: 'rgba(59, 130, 246, 0.1)',
         tension: 0.4,
@@ -114,7 +115,7 @@ const Dashboard = ({ tenantId, user, tenants, onLogout }) => {
       },
       {
         label: 'Orders',
-        data: dashboardData.revenueData.map(item => item.orders),
+        data: dashboardData.revenueSeries.orders,
         borderColor: 'rgb(16, 185, 129)',
         backgroundColor: 'rgba(16, 185, 129, 0.1)',
         tension: 0.4,
@@ -1,6 +1,7 @@
 const express = require('express');
 const { User, Tenant } = require('../models');
 const { generateToken } = require('../middleware/auth');
+const { passwordHasher, PasswordHasherBusyError } = require('../services/password_hasher');
 const router = express.Router();
 
 // Login
@@ -26,8 +27,12 @@ router.post('/login', async (req, res) => {
       return res.status(401).json({ error: 'Account is not active' });
     }
 
-    // Update last login
-    await user.update({ last_login: new Date() });
+    // Update last login, upgrading the hash if BCRYPT_COST changed
+    const updates = { last_login: new Date() };
+    if (passwordHasher.needsRehash(user.password)) {
+      updates.password = password;
+    }
+    await user.update(updates);
 
     const token = generateToken(user);
 
@@ -44,6 +49,9 @@ router.post('/login', async (req, res) => {
     });
     console.log('success');
   } catch (error) {
+    if (error instanceof PasswordHasherBusyError) {
+      return res.status(503).set('Retry-After', '1').json({ error: 'Too many sign-ins, please retry shortly' });
+    }
     console.error('Login error:', error);
     res.status(500).json({ error: 'Internal server error' });
   }
@@ -86,6 +94,9 @@ router.post('/register', async (req, res) => {
       tenants: []
     });
   } catch (error) {
+    if (error instanceof PasswordHasherBusyError) {
+      return res.status(503).set('Retry-After', '1').json({ error: 'Too many sign-ups, please retry shortly' });
+    }
     console.error('Register error:', error);
     res.status(500).json({ error: 'Internal server error' });
   }
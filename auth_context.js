@@ -0,0 +1,150 @@
+const jwt = require('jsonwebtoken');
+const { User } = require('../models');
+const { LruTtlCache } = require('../services/lru_cache');
+const { publish, subscribe } = require('../services/cluster_bus');
+
+const AUTH_CACHE_MAX = parseInt(process.env.AUTH_CACHE_MAX, 10) || 10000;
+const AUTH_CACHE_TTL_MS = parseInt(process.env.AUTH_CACHE_TTL_MS, 10) || 60 * 1000;
+
+// Bearer token -> { claims, user, expiresAt }. Holds the verified claims
+// and the user row, so repeat requests skip both jwt.verify and the user
+// lookup until the entry (or the token itself) expires.
+const sessions = new LruTtlCache({ max: AUTH_CACHE_MAX, ttlMs: AUTH_CACHE_TTL_MS });
+
+// User id -> Map(tenant id -> tenant status) of the user's memberships
+const memberships = new LruTtlCache({ max: AUTH_CACHE_MAX, ttlMs: AUTH_CACHE_TTL_MS });
+
+const stats = { sessionHits: 0, sessionMisses: 0, membershipHits: 0, membershipMisses: 0 };
+
+// Tokens carry the user id as userId (older tokens: id or sub)
+function claimsUserId(claims) {
+  return claims.userId ?? claims.id ?? claims.sub;
+}
+
+async function loadSession(token) {
+  const cached = sessions.get(token);
+  if (cached && cached.expiresAt > Date.now()) {
+    stats.sessionHits += 1;
+    return cached;
+  }
+  stats.sessionMisses += 1;
+
+  const claims = jwt.verify(token, process.env.JWT_SECRET);
+  const user = await User.findByPk(claimsUserId(claims), { raw: true });
+  const session = {
+    claims,
+    user,
+    expiresAt: claims.exp ? claims.exp * 1000 : Infinity
+  };
+  sessions.set(token, session);
+  return session;
+}
+
+// Verify the bearer token and attach req.user (a User instance built from
+// the cached row, so instance methods keep working) and req.auth (claims)
+async function authenticate(req, res, next) {
+  const header = req.headers.authorization || '';
+  const token = header.startsWith('Bearer ') ? header.slice(7) : null;
+
+  if (!token) {
+    return res.status(401).json({ error: 'Access token required' });
+  }
+
+  try {
+    const session = await loadSession(token);
+    if (!session.user || session.user.status !== 'active') {
+      return res.status(401).json({ error: 'Account is not active' });
+    }
+
+    req.user = User.build(session.user, { isNewRecord: false, raw: true });
+    req.auth = session.claims;
+    next();
+  } catch (error) {
+    if (error.name === 'JsonWebTokenError' || error.name === 'TokenExpiredError') {
+      return res.status(403).json({ error: 'Invalid or expired token' });
+    }
+    next(error);
+  }
+}
+
+// Tenants the user belongs to, with their status
+async function tenantMemberships(user) {
+  const cached = memberships.get(String(user.id));
+  if (cached) {
+    stats.membershipHits += 1;
+    return cached;
+  }
+  stats.membershipMisses += 1;
+
+  const tenants = await user.getTenants({
+    attributes: ['id', 'status'],
+    joinTableAttributes: [],
+    raw: true
+  });
+  const tenantStatus = new Map(tenants.map(tenant => [String(tenant.id), tenant.status]));
+  memberships.set(String(user.id), tenantStatus);
+  return tenantStatus;
+}
+
+// Whether the user may act on the tenant
+async function hasTenantAccess(user, tenantId) {
+  const tenantStatus = await tenantMemberships(user);
+  return tenantStatus.has(String(tenantId));
+}
+
+// Resolve :tenantId for tenant-scoped routes from the cached memberships
+async function tenantContext(req, res, next) {
+  try {
+    const tenantId = req.params.tenantId;
+    const status = (await tenantMemberships(req.user)).get(String(tenantId));
+
+    if (!status) {
+      return res.status(403).json({ error: 'Access denied to this tenant' });
+    }
+    if (status !== 'active') {
+      return res.status(403).json({ error: 'Tenant is not active' });
+    }
+
+    req.tenantId = tenantId;
+    next();
+  } catch (error) {
+    next(error);
+  }
+}
+
+function dropUser(userId) {
+  memberships.delete(String(userId));
+  sessions.deleteWhere(session => String(session.user?.id) === String(userId));
+}
+
+function dropTenant(tenantId) {
+  memberships.deleteWhere(tenantStatus => tenantStatus.has(String(tenantId)));
+}
+
+subscribe('auth:user', dropUser);
+subscribe('auth:tenant', dropTenant);
+
+// Call after a user's memberships or account status change
+function invalidateUser(userId) {
+  dropUser(userId);
+  publish('auth:user', String(userId));
+}
+
+// Call after a tenant's status changes or it is deleted
+function invalidateTenant(tenantId) {
+  dropTenant(tenantId);
+  publish('auth:tenant', String(tenantId));
+}
+
+function getAuthCacheStats() {
+  return { ...stats, sessions: sessions.size, memberships: memberships.size };
+}
+
+module.exports = {
+  authenticate,
+  tenantContext,
+  hasTenantAccess,
+  invalidateUser,
+  invalidateTenant,
+  getAuthCacheStats
+};
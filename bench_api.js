@@ -0,0 +1,300 @@
+// Read-path benchmark for the dashboard metrics and list endpoints. For
+// each database size, seeds the database (scripts/seed.js), starts the API
+// server, and drives every endpoint in turn from an in-process keep-alive
+// HTTP client, recording throughput, latency percentiles and DB statements
+// per request. Results are written as a JSON baseline; --compare checks a
+// run against an earlier baseline and exits non-zero on regressions.
+//
+// Usage: node scripts/bench_api.js --reset-db [--orders 10000,100000,1000000]
+//   [--tenants 3] [--seed 1] [--duration 10] [--warmup 2] [--concurrency 8]
+//   [--cached] [--out bench/api-baseline.json] [--compare bench/api-baseline.json]
+//   [--threshold 0.2]
+// Runs against the database configured by the DB_* env vars, which the
+// seed step drops and recreates: point them at a scratch MySQL instance.
+// Responses from the metrics cache are bypassed (each request has a unique
+// query string) unless --cached is given.
+require('dotenv').config();
+const fs = require('fs');
+const net = require('net');
+const http = require('http');
+const path = require('path');
+const { fork } = require('child_process');
+const { parseArgs } = require('util');
+
+const { values } = parseArgs({
+  options: {
+    'reset-db': { type: 'boolean', default: false },
+    orders: { type: 'string', default: '10000,100000,1000000' },
+    tenants: { type: 'string', default: '3' },
+    seed: { type: 'string', default: '1' },
+    duration: { type: 'string', default: '10' },
+    warmup: { type: 'string', default: '2' },
+    concurrency: { type: 'string', default: '8' },
+    cached: { type: 'boolean', default: false },
+    out: { type: 'string' },
+    compare: { type: 'string' },
+    threshold: { type: 'string', default: '0.2' }
+  }
+});
+
+// The seed's largest tenant
+const TENANT_ID = 'fashion-boutique';
+const CURSOR_DEPTH = 20;
+
+const ENDPOINTS = [
+  { name: 'metrics', path: '/metrics' },
+  { name: 'metrics.revenue', path: '/metrics/revenue' },
+  { name: 'metrics.customers', path: '/metrics/customers' },
+  { name: 'metrics.products', path: '/metrics/products' },
+  { name: 'metrics.products.revenue', path: '/metrics/products?rank=revenue' },
+  { name: 'customers', path: '/customers?limit=50' },
+  { name: 'customers.by_spend', path: '/customers?limit=50&sort=total_spent:DESC' },
+  { name: 'customers.deep_page', path: '/customers?limit=50', cursorDepth: CURSOR_DEPTH },
+  { name: 'customers.search', path: '/customers?search=sarah&limit=20' },
+  { name: 'orders', path: '/orders?limit=50' },
+  { name: 'orders.by_status', path: '/orders?limit=50&status=Fulfilled' },
+  { name: 'products', path: '/products?limit=50' }
+];
+
+// Generous limits so the rate limiter never answers for the database
+const SERVER_ENV = {
+  NODE_ENV: 'benchmark',
+  SYNC_WORKER: 'external',
+  ACCESS_LOG_SAMPLE_RATE: '0',
+  RATE_LIMIT_STORE: 'memory',
+  RATE_LIMIT_TENANT_CAPACITY: '1e12',
+  RATE_LIMIT_TENANT_RATE: '1e12',
+  RATE_LIMIT_USER_CAPACITY: '1e12',
+  RATE_LIMIT_USER_RATE: '1e12',
+  RATE_LIMIT_IP_CAPACITY: '1e12',
+  RATE_LIMIT_IP_RATE: '1e12'
+};
+
+function runScript(script, args, env = {}) {
+  return new Promise((resolve, reject) => {
+    const child = fork(script, args, { env: { ...process.env, ...env } });
+    child.on('exit', code => (code === 0 ? resolve() : reject(new Error(`${path.basename(script)} exited with code ${code}`))));
+  });
+}
+
+function freePort() {
+  return new Promise((resolve, reject) => {
+    const server = net.createServer();
+    server.listen(0, () => {
+      const { port } = server.address();
+      server.close(() => resolve(port));
+    });
+    server.on('error', reject);
+  });
+}
+
+function request(agent, port, { method = 'GET', path: urlPath, headers = {}, body }) {
+  return new Promise((resolve, reject) => {
+    const req = http.request({ host: '127.0.0.1', port, method, path: urlPath, agent, headers }, (res) => {
+      const chunks = [];
+      res.on('data', chunk => chunks.push(chunk));
+      res.on('end', () => resolve({ status: res.statusCode, body: Buffer.concat(chunks) }));
+    });
+    req.on('error', reject);
+    if (body) req.end(body);
+    else req.end();
+  });
+}
+
+async function startServer(port) {
+  const server = fork(path.join(__dirname, '..', 'server.js'), [], {
+    env: { ...process.env, ...SERVER_ENV, PORT: String(port) },
+    stdio: ['ignore', 'ignore', 'inherit', 'ipc']
+  });
+  const agent = new http.Agent({ keepAlive: true });
+
+  for (let attempt = 0; attempt < 100; attempt++) {
+    if (server.exitCode !== null) throw new Error(`Server exited with code ${server.exitCode}`);
+    const ready = await request(agent, port, { path: '/health' }).then(res => res.status === 200, () => false);
+    if (ready) return server;
+    await new Promise(resolve => setTimeout(resolve, 200));
+  }
+  server.kill();
+  throw new Error('Server did not become healthy');
+}
+
+// DB statements executed by the server so far, from its telemetry
+async function statementCount(agent, port) {
+  const headers = process.env.METRICS_TOKEN ? { Authorization: `Bearer ${process.env.METRICS_TOKEN}` } : {};
+  const { body } = await request(agent, port, { path: '/metrics?scope=process', headers });
+  return body.toString().split('\n')
+    .filter(line => line.startsWith('db_query_duration_seconds_count'))
+    .reduce((sum, line) => sum + Number(line.slice(line.lastIndexOf(' ') + 1)), 0);
+}
+
+function percentile(sorted, p) {
+  if (sorted.length === 0) return null;
+  return sorted[Math.min(sorted.length - 1, Math.floor(p * sorted.length))];
+}
+
+// Closed-loop load: `concurrency` clients each send the next request as
+// soon as the previous one completes, until the deadline
+async function drive(agent, port, { path: urlPath, headers, seconds, concurrency, bust }) {
+  const deadline = performance.now() + seconds * 1000;
+  const latencies = [];
+  const statuses = {};
+  let bytes = 0;
+  let sequence = 0;
+  const started = performance.now();
+
+  const client = async () => {
+    while (performance.now() < deadline) {
+      const target = bust ? `${urlPath}${urlPath.includes('?') ? '&' : '?'}_bench=${sequence++}` : urlPath;
+      const sent = performance.now();
+      const res = await request(agent, port, { path: target, headers });
+      latencies.push(performance.now() - sent);
+      statuses[res.status] = (statuses[res.status] || 0) + 1;
+      bytes += res.body.length;
+    }
+  };
+  await Promise.all(Array.from({ length: concurrency }, client));
+
+  const elapsed = (performance.now() - started) / 1000;
+  latencies.sort((a, b) => a - b);
+  const round = ms => Math.round(ms * 100) / 100;
+  return {
+    requests: latencies.length,
+    rps: Math.round((latencies.length / elapsed) * 10) / 10,
+    p50Ms: round(percentile(latencies, 0.5)),
+    p95Ms: round(percentile(latencies, 0.95)),
+    p99Ms: round(percentile(latencies, 0.99)),
+    maxMs: round(latencies[latencies.length - 1]),
+    statuses,
+    avgBytes: latencies.length ? Math.round(bytes / latencies.length) : 0
+  };
+}
+
+async function benchSize(orders) {
+  console.log(`\nSeeding ${values.tenants} tenants, ${orders} orders for the largest...`);
+  await runScript(path.join(__dirname, 'seed.js'), [
+    '--tenants', values.tenants,
+    '--orders', String(orders),
+    '--seed', values.seed
+  ]);
+
+  const port = await freePort();
+  const server = await startServer(port);
+  const agent = new http.Agent({ keepAlive: true, maxSockets: parseInt(values.concurrency, 10) });
+
+  try {
+    const login = await request(agent, port, {
+      method: 'POST',
+      path: '/api/auth/login',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ email: 'demo@xeno.com', password: 'demo123' })
+    });
+    if (login.status !== 200) throw new Error(`Login failed with status ${login.status}`);
+    const headers = { Authorization: `Bearer ${JSON.parse(login.body).token}` };
+
+    const results = [];
+    for (const endpoint of ENDPOINTS) {
+      let urlPath = `/api/${TENANT_ID}${endpoint.path}`;
+      // Start deep in the list by following nextCursor
+      for (let page = 0; page < (endpoint.cursorDepth || 0); page++) {
+        const { body } = await request(agent, port, { path: urlPath, headers });
+        const { nextCursor } = JSON.parse(body);
+        if (!nextCursor) break;
+        urlPath = `/api/${TENANT_ID}${endpoint.path}&cursor=${encodeURIComponent(nextCursor)}`;
+      }
+
+      const options = { path: urlPath, headers, concurrency: parseInt(values.concurrency, 10), bust: !values.cached };
+      await drive(agent, port, { ...options, seconds: parseFloat(values.warmup) });
+
+      const before = await statementCount(agent, port);
+      const result = await drive(agent, port, { ...options, seconds: parseFloat(values.duration) });
+      const statements = (await statementCount(agent, port)) - before;
+
+      results.push({
+        name: endpoint.name,
+        path: endpoint.path,
+        ...result,
+        queriesPerRequest: result.requests ? Math.round((statements / result.requests) * 100) / 100 : null
+      });
+      console.log(`  ${endpoint.name.padEnd(26)} ${String(result.rps).padStart(8)} req/s  `
+        + `p50 ${result.p50Ms}ms  p95 ${result.p95Ms}ms  p99 ${result.p99Ms}ms  `
+        + `${results[results.length - 1].queriesPerRequest} queries/req`);
+    }
+    return { orders, endpoints: results };
+  } finally {
+    agent.destroy();
+    server.kill('SIGTERM');
+    await new Promise(resolve => server.once('exit', resolve));
+  }
+}
+
+// Endpoints whose p95 latency grew, or throughput fell, by more than
+// threshold against the baseline at the same size
+function compareRuns(baseline, current, threshold) {
+  const regressions = [];
+  for (const run of current) {
+    const previous = baseline.results.find(r => r.orders === run.orders);
+    if (!previous) continue;
+    for (const endpoint of run.endpoints) {
+      const before = previous.endpoints.find(e => e.name === endpoint.name);
+      if (!before) continue;
+      const latency = endpoint.p95Ms / before.p95Ms - 1;
+      const throughput = 1 - endpoint.rps / before.rps;
+      if (latency > threshold || throughput > threshold) {
+        regressions.push({
+          orders: run.orders,
+          endpoint: endpoint.name,
+          p95Ms: [before.p95Ms, endpoint.p95Ms],
+          rps: [before.rps, endpoint.rps]
+        });
+      }
+    }
+  }
+  return regressions;
+}
+
+(async () => {
+  try {
+    if (!values['reset-db']) {
+      console.error('bench_api drops and reseeds the configured database; pass --reset-db to confirm.');
+      process.exit(2);
+    }
+
+    const results = [];
+    for (const orders of values.orders.split(',').map(n => parseInt(n, 10))) {
+      results.push(await benchSize(orders));
+    }
+
+    if (values.out) {
+      fs.mkdirSync(path.dirname(values.out), { recursive: true });
+      fs.writeFileSync(values.out, `${JSON.stringify({
+        benchmark: 'api',
+        createdAt: new Date().toISOString(),
+        node: process.version,
+        options: {
+          tenants: values.tenants,
+          seed: values.seed,
+          duration: values.duration,
+          concurrency: values.concurrency,
+          cached: values.cached
+        },
+        results
+      }, null, 2)}\n`);
+      console.log(`\nResults written to ${values.out}`);
+    }
+
+    if (values.compare) {
+      const baseline = JSON.parse(fs.readFileSync(values.compare, 'utf8'));
+      const regressions = compareRuns(baseline, results, parseFloat(values.threshold));
+      for (const r of regressions) {
+        console.log(`REGRESSION ${r.endpoint} @ ${r.orders} orders: p95 ${r.p95Ms[0]} -> ${r.p95Ms[1]}ms, `
+          + `${r.rps[0]} -> ${r.rps[1]} req/s`);
+      }
+      if (regressions.length > 0) process.exit(1);
+      console.log('No regressions against the baseline');
+    }
+    process.exit(0);
+  } catch (err) {
+    console.error(err);
+    process.exit(1);
+  }
+})();
@@ -0,0 +1,177 @@
+// Sync throughput benchmark against the mock Admin API
+// (scripts/mock_shopify.js). For each store size, runs a full sync of a
+// dedicated tenant in a fresh process and reports records/sec, peak RSS,
+// Shopify calls and DB statements per record.
+//
+// Usage: node scripts/bench_sync.js [--sizes 10000,100000,1000000]
+//   [--seed 1] [--bucket 400] [--latency 50] [--jitter 20] [--error-rate 0]
+//   [--out bench/sync.json] [--keep]
+// Needs a database configured as for the app (DB_* env vars). The bench
+// tenants (bench-sync-<size>) are deleted afterwards unless --keep is set.
+require('dotenv').config();
+const fs = require('fs');
+const path = require('path');
+const { fork } = require('child_process');
+const { parseArgs } = require('util');
+
+const { values } = parseArgs({
+  options: {
+    sizes: { type: 'string', default: '10000,100000,1000000' },
+    seed: { type: 'string', default: '1' },
+    // Shopify Plus-sized bucket, so runs measure the pipeline rather than
+    // the standard plan's 2 calls/sec
+    bucket: { type: 'string', default: '400' },
+    latency: { type: 'string', default: '50' },
+    jitter: { type: 'string', default: '20' },
+    'error-rate': { type: 'string', default: '0' },
+    out: { type: 'string' },
+    keep: { type: 'boolean', default: false },
+    run: { type: 'string' }
+  }
+});
+
+const TENANT_DATA = ['OrderLineItem', 'SearchToken', 'DailyRollup', 'Order', 'Customer', 'Product',
+  'SyncCheckpoint', 'SyncRun', 'SyncJob'];
+const DELETE_BATCH = 10000;
+const RSS_SAMPLE_MS = 100;
+
+function startMock(size) {
+  return new Promise((resolve, reject) => {
+    const mock = fork(path.join(__dirname, 'mock_shopify.js'), [
+      '--port', '0',
+      '--records', String(size),
+      '--seed', values.seed,
+      '--bucket', values.bucket,
+      '--latency', values.latency,
+      '--jitter', values.jitter,
+      '--error-rate', values['error-rate']
+    ], { stdio: ['ignore', 'ignore', 'inherit', 'ipc'] });
+    mock.once('message', message => resolve({ mock, port: message.port }));
+    mock.once('exit', code => reject(new Error(`Mock Shopify exited with code ${code}`)));
+  });
+}
+
+async function clearTenant(models, tenantId) {
+  for (const name of TENANT_DATA) {
+    while (await models[name].destroy({ where: { tenant_id: tenantId }, limit: DELETE_BATCH }) > 0);
+  }
+}
+
+// One size, in this (child) process so peak RSS belongs to this run only
+async function runOne(size) {
+  const models = require('../models');
+  const { ShopifyService } = require('../services/shopify_service');
+  const { snapshot } = require('../services/telemetry');
+  const tenantId = `bench-sync-${size}`;
+  const accessToken = `bench-${process.pid}`;
+
+  const { mock, port } = await startMock(size);
+  try {
+    await models.Tenant.upsert({
+      id: tenantId,
+      name: `Sync benchmark (${size} records)`,
+      domain: `${tenantId}.example.com`,
+      shopify_domain: `${tenantId}.myshopify.com`,
+      shopify_access_token: accessToken
+    });
+    await clearTenant(models, tenantId);
+
+    const statements = () => snapshot().queries.reduce((sum, q) => sum + q.duration.total.count, 0);
+    const statementsBefore = statements();
+    let peakRss = process.memoryUsage().rss;
+    const sampler = setInterval(() => {
+      peakRss = Math.max(peakRss, process.memoryUsage().rss);
+    }, RSS_SAMPLE_MS);
+
+    const service = new ShopifyService(tenantId, {
+      storeDomain: `${tenantId}.myshopify.com`,
+      accessToken,
+      apiBaseUrl: `http://127.0.0.1:${port}`
+    });
+    const started = Date.now();
+    const result = await service.fullSync({ full: true });
+    const durationMs = Date.now() - started;
+    clearInterval(sampler);
+
+    const records = result.customers + result.orders + result.products;
+    const statementCount = statements() - statementsBefore;
+    const topQueries = snapshot().queries
+      .sort((a, b) => b.duration.total.sum - a.duration.total.sum)
+      .slice(0, 5)
+      .map(q => ({ sql: q.sql, count: q.duration.total.count, totalMs: Math.round(q.duration.total.sum * 1000) }));
+
+    if (!values.keep) {
+      await clearTenant(models, tenantId);
+      await models.Tenant.destroy({ where: { id: tenantId } });
+    }
+
+    return {
+      size,
+      records,
+      durationMs,
+      recordsPerSec: Math.round(records / (durationMs / 1000)),
+      peakRssMb: Math.round(peakRss / 1024 / 1024),
+      statements: statementCount,
+      statementsPerRecord: Math.round((statementCount / records) * 1000) / 1000,
+      api: {
+        calls: result.api.calls,
+        retries: result.api.retries,
+        throttleWaitMs: result.api.throttleWaitMs,
+        backoffWaitMs: result.api.backoffWaitMs
+      },
+      stages: result.stages,
+      topQueries
+    };
+  } finally {
+    mock.kill();
+    await models.sequelize.close();
+  }
+}
+
+function runChild(size) {
+  return new Promise((resolve, reject) => {
+    const args = process.argv.slice(2).filter((arg, i, all) => arg !== '--run' && all[i - 1] !== '--run');
+    const child = fork(__filename, [...args, '--run', String(size)]);
+    let result = null;
+    child.on('message', (message) => {
+      result = message;
+    });
+    child.on('exit', code => (result ? resolve(result) : reject(new Error(`Benchmark for ${size} exited with code ${code}`))));
+  });
+}
+
+(async () => {
+  try {
+    if (values.run) {
+      process.send(await runOne(parseInt(values.run, 10)));
+      process.exit(0);
+    }
+
+    const sizes = values.sizes.split(',').map(size => parseInt(size, 10));
+    const results = [];
+    for (const size of sizes) {
+      console.log(`Syncing ${size} records...`);
+      const result = await runChild(size);
+      results.push(result);
+      console.log(`  ${result.recordsPerSec} records/sec, ${result.durationMs}ms, peak RSS ${result.peakRssMb}MB, `
+        + `${result.statementsPerRecord} statements/record, ${result.api.calls} API calls `
+        + `(${result.api.throttleWaitMs}ms throttled)`);
+    }
+
+    if (values.out) {
+      fs.mkdirSync(path.dirname(values.out), { recursive: true });
+      fs.writeFileSync(values.out, `${JSON.stringify({
+        benchmark: 'sync',
+        createdAt: new Date().toISOString(),
+        node: process.version,
+        options: { seed: values.seed, bucket: values.bucket, latency: values.latency, jitter: values.jitter },
+        results
+      }, null, 2)}\n`);
+      console.log(`Results written to ${values.out}`);
+    }
+    process.exit(0);
+  } catch (err) {
+    console.error(err);
+    process.exit(1);
+  }
+})();
@@ -0,0 +1,306 @@
+const fs = require('fs');
+const http = require('http');
+const https = require('https');
+const readline = require('readline');
+const { runPipeline } = require('./sync_pipeline');
+
+const BULK_POLL_INTERVAL_MS = 2000;
+
+// Bulk operation queries. Each connection node becomes one JSONL line;
+// nested connection nodes become their own lines carrying __parentId.
+const BULK_QUERIES = {
+    customers: `{
+        customers {
+            edges { node {
+                id firstName lastName email phone tags numberOfOrders createdAt updatedAt
+                amountSpent { amount }
+                defaultAddress { city country }
+            } }
+        }
+    }`,
+    orders: `{
+        orders {
+            edges { node {
+                id name createdAt updatedAt currencyCode
+                displayFinancialStatus displayFulfillmentStatus
+                totalPriceSet { shopMoney { amount } }
+                customer { id firstName lastName }
+                lineItems { edges { node {
+                    id quantity currentQuantity sku
+                    originalUnitPriceSet { shopMoney { amount } }
+                    totalDiscountSet { shopMoney { amount } }
+                    product { id }
+                    variant { id }
+                } } }
+            } }
+        }
+    }`,
+    products: `{
+        products {
+            edges { node {
+                id title productType status updatedAt
+                variants { edges { node {
+                    id title price sku inventoryQuantity
+                } } }
+            } }
+        }
+    }`
+};
+
+// Child collections reassembled onto their parent, keyed by child GID type
+const CHILD_COLLECTIONS = {
+    LineItem: 'line_items',
+    ProductVariant: 'variants'
+};
+
+// Numeric id from a GID such as gid://shopify/Order/450789469
+function gidToId(gid) {
+    if (!gid) return null;
+    return Number(String(gid).split('/').pop());
+}
+
+function gidType(gid) {
+    const parts = String(gid).split('/');
+    return parts[parts.length - 2];
+}
+
+// Parsed objects from a JSONL stream, one line at a time
+async function* readJsonl(stream) {
+    const lines = readline.createInterface({ input: stream, crlfDelay: Infinity });
+    for await (const line of lines) {
+        if (line.trim()) {
+            yield JSON.parse(line);
+        }
+    }
+}
+
+// Reattach child lines to their parent. Parents come before their
+// children, but children of different parents may be interleaved and
+// arrive after later parents, so the last ASSEMBLE_WINDOW parents stay
+// open and the oldest is emitted as the window slides. Children whose
+// parent was never seen, or arrived more than a window later, count as
+// orphans.
+const ASSEMBLE_WINDOW = 1000;
+
+async function* assemble(objects, stats = {}, window = ASSEMBLE_WINDOW) {
+    const open = new Map();
+    const waiting = new Map();
+    stats.orphans = 0;
+
+    for await (const object of objects) {
+        if (object.__parentId) {
+            const parent = open.get(object.__parentId);
+            if (parent) {
+                attach(parent, object);
+            } else {
+                // Before its parent, or after the parent left the window
+                const children = waiting.get(object.__parentId) || [];
+                children.push(object);
+                waiting.set(object.__parentId, children);
+            }
+            continue;
+        }
+
+        for (const child of waiting.get(object.id) || []) attach(object, child);
+        waiting.delete(object.id);
+        open.set(object.id, object);
+
+        if (open.size > window) {
+            const [oldestId, oldest] = open.entries().next().value;
+            open.delete(oldestId);
+            yield oldest;
+        }
+    }
+
+    yield* open.values();
+    for (const children of waiting.values()) stats.orphans += children.length;
+}
+
+function attach(parent, child) {
+    const collection = CHILD_COLLECTIONS[gidType(child.id)] || 'children';
+    (parent[collection] || (parent[collection] = [])).push(child);
+}
+
+// Group an async iterable into arrays of `size`
+async function* batches(iterable, size) {
+    let batch = [];
+    for await (const item of iterable) {
+        batch.push(item);
+        if (batch.length >= size) {
+            yield batch;
+            batch = [];
+        }
+    }
+    if (batch.length > 0) yield batch;
+}
+
+function lower(value) {
+    return value ? String(value).toLowerCase() : null;
+}
+
+function money(set) {
+    return set?.shopMoney?.amount ?? null;
+}
+
+// GraphQL bulk nodes -> the REST payload shape ShopifyService normalizes
+const toRest = {
+    customers: node => ({
+        id: gidToId(node.id),
+        first_name: node.firstName,
+        last_name: node.lastName,
+        email: node.email,
+        phone: node.phone,
+        tags: Array.isArray(node.tags) ? node.tags.join(', ') : node.tags,
+        orders_count: Number(node.numberOfOrders) || 0,
+        total_spent: node.amountSpent?.amount,
+        default_address: node.defaultAddress,
+        created_at: node.createdAt,
+        updated_at: node.updatedAt
+    }),
+    orders: node => ({
+        id: gidToId(node.id),
+        order_number: String(node.name || '').replace(/^#/, ''),
+        created_at: node.createdAt,
+        updated_at: node.updatedAt,
+        currency: node.currencyCode,
+        total_price: money(node.totalPriceSet),
+        financial_status: lower(node.displayFinancialStatus),
+        fulfillment_status: {
+            FULFILLED: 'fulfilled',
+            PARTIALLY_FULFILLED: 'partial'
+        }[node.displayFulfillmentStatus] || null,
+        customer: node.customer ? {
+            id: gidToId(node.customer.id),
+            first_name: node.customer.firstName,
+            last_name: node.customer.lastName
+        } : null,
+        line_items: (node.line_items || []).map(item => ({
+            id: gidToId(item.id),
+            quantity: item.quantity,
+            current_quantity: item.currentQuantity,
+            sku: item.sku,
+            price: money(item.originalUnitPriceSet),
+            total_discount: money(item.totalDiscountSet),
+            product_id: gidToId(item.product?.id),
+            variant_id: gidToId(item.variant?.id)
+        }))
+    }),
+    products: node => ({
+        id: gidToId(node.id),
+        title: node.title,
+        product_type: node.productType,
+        status: lower(node.status),
+        updated_at: node.updatedAt,
+        variants: (node.variants || []).map(variant => ({
+            id: gidToId(variant.id),
+            title: variant.title,
+            price: variant.price,
+            sku: variant.sku,
+            inventory_quantity: variant.inventoryQuantity
+        }))
+    })
+};
+
+function openFile(path) {
+    return fs.createReadStream(path, { highWaterMark: 1024 * 1024 });
+}
+
+// Stream a bulk operation result URL (or any stand-in endpoint)
+function openUrl(url) {
+    return new Promise((resolve, reject) => {
+        const transport = url.startsWith('https:') ? https : http;
+        transport.get(url, (res) => {
+            if (res.statusCode >= 300 && res.statusCode < 400 && res.headers.location) {
+                res.resume();
+                return resolve(openUrl(res.headers.location));
+            }
+            if (res.statusCode !== 200) {
+                res.resume();
+                return reject(new Error(`Bulk export download failed with status ${res.statusCode}`));
+            }
+            resolve(res);
+        }).on('error', reject);
+    });
+}
+
+// Feeds bulk-operation JSONL exports through a ShopifyService's
+// normalizers and batched writer
+class BulkIngestor {
+    constructor(service) {
+        this.service = service;
+    }
+
+    async ingest(entity, stream, timings) {
+        const { service } = this;
+        const stats = {};
+        const started = Date.now();
+
+        if (entity === 'orders') {
+            await service.customerIndex.load();
+        }
+
+        const count = await runPipeline({
+            source: batches(assemble(readJsonl(stream), stats), service.writer.batchSize),
+            transform: nodes => service.normalize(entity, nodes.map(toRest[entity])),
+            write: rows => service.writer.write(entity, rows),
+            depth: service.prefetchDepth,
+            onPage: processed => service.reportProgress(entity, { processed }),
+            timings
+        });
+
+        const seconds = (Date.now() - started) / 1000;
+        if (stats.orphans > 0) {
+            console.warn(`Bulk ingest skipped ${stats.orphans} ${entity} child lines without a preceding parent`);
+        }
+        return {
+            count,
+            recordsPerSec: seconds > 0 ? Math.round(count / seconds) : count
+        };
+    }
+
+    // Run a bulk export on Shopify and return the result file URL
+    async export(entity) {
+        const { client } = this.service;
+        const started = await client.graphql(`mutation {
+            bulkOperationRunQuery(query: ${JSON.stringify(BULK_QUERIES[entity])}) {
+                bulkOperation { id status }
+                userErrors { field message }
+            }
+        }`);
+        const errors = started.bulkOperationRunQuery.userErrors;
+        if (errors.length > 0) {
+            throw new Error(`Bulk ${entity} export failed: ${errors.map(e => e.message).join(', ')}`);
+        }
+
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, BULK_POLL_INTERVAL_MS));
+            const { currentBulkOperation: operation } = await client.graphql(`{
+                currentBulkOperation { id status errorCode url }
+            }`);
+
+            if (operation.status === 'COMPLETED') return operation.url;
+            if (['FAILED', 'CANCELED', 'EXPIRED'].includes(operation.status)) {
+                throw new Error(`Bulk ${entity} export ${operation.status.toLowerCase()}: ${operation.errorCode}`);
+            }
+        }
+    }
+
+    // Source for an entity: a local fixture file, an explicit URL, or a
+    // fresh export. An entity with no export (url null) is skipped.
+    async open(entity, sources = {}) {
+        const source = sources[entity];
+        if (source && !/^https?:/.test(source)) return openFile(source);
+
+        const url = source || await this.export(entity);
+        return url ? openUrl(url) : null;
+    }
+}
+
+module.exports = {
+    BulkIngestor,
+    BULK_QUERIES,
+    readJsonl,
+    assemble,
+    gidToId,
+    toRest
+};
@@ -0,0 +1,132 @@
+const fs = require('fs');
+const path = require('path');
+const { readJsonl, assemble, toRest } = require('./bulk_ingest');
+
+async function ingest(file, entity, window) {
+    const stats = {};
+    const payloads = [];
+    const stream = fs.createReadStream(path.join(__dirname, '__fixtures__', file));
+    for await (const node of assemble(readJsonl(stream), stats, window)) {
+        payloads.push(toRest[entity](node));
+    }
+    return { payloads, stats };
+}
+
+describe('bulk export ingest', () => {
+    test('reattaches interleaved line items to their orders', async () => {
+        const { payloads, stats } = await ingest('bulk_orders.jsonl', 'orders');
+
+        expect(payloads.map(order => order.id)).toEqual([1001, 1002, 1003]);
+        expect(payloads[0]).toEqual({
+            id: 1001,
+            order_number: '1001',
+            created_at: '2024-03-01T10:00:00Z',
+            updated_at: '2024-03-02T09:00:00Z',
+            currency: 'USD',
+            total_price: '45.00',
+            financial_status: 'paid',
+            fulfillment_status: 'fulfilled',
+            customer: { id: 501, first_name: 'Sarah', last_name: 'Chen' },
+            line_items: [
+                {
+                    id: 9001,
+                    quantity: 2,
+                    current_quantity: 2,
+                    sku: 'TEE-M',
+                    price: '15.00',
+                    total_discount: '0.00',
+                    product_id: 301,
+                    variant_id: 401
+                },
+                {
+                    id: 9002,
+                    quantity: 1,
+                    current_quantity: 1,
+                    sku: 'MUG',
+                    price: '20.00',
+                    total_discount: '5.00',
+                    product_id: 302,
+                    variant_id: 402
+                }
+            ]
+        });
+        expect(payloads[1].customer).toBeNull();
+        expect(payloads[1].financial_status).toBe('partially_refunded');
+        expect(payloads[1].line_items.map(item => [item.id, item.current_quantity])).toEqual([[9003, 0]]);
+        expect(payloads[2].fulfillment_status).toBe('partial');
+        expect(payloads[2].line_items.map(item => item.id)).toEqual([9004]);
+        // The line item whose order is not in the export
+        expect(stats.orphans).toBe(1);
+    });
+
+    test('reattaches variants that arrive out of order', async () => {
+        const { payloads, stats } = await ingest('bulk_products.jsonl', 'products');
+
+        expect(payloads).toEqual([
+            {
+                id: 301,
+                title: 'Classic Tee',
+                product_type: 'Apparel',
+                status: 'active',
+                updated_at: '2024-02-01T00:00:00Z',
+                variants: [
+                    { id: 403, title: 'L', price: '15.00', sku: 'TEE-L', inventory_quantity: 0 },
+                    { id: 401, title: 'M', price: '15.00', sku: 'TEE-M', inventory_quantity: 12 }
+                ]
+            },
+            {
+                id: 302,
+                title: 'Mug',
+                product_type: 'Home',
+                status: 'draft',
+                updated_at: '2024-02-02T00:00:00Z',
+                variants: [
+                    { id: 402, title: 'Default Title', price: '20.00', sku: 'MUG', inventory_quantity: 7 }
+                ]
+            }
+        ]);
+        expect(stats.orphans).toBe(0);
+    });
+
+    test('converts customers', async () => {
+        const { payloads, stats } = await ingest('bulk_customers.jsonl', 'customers');
+
+        expect(payloads).toEqual([
+            {
+                id: 501,
+                first_name: 'Sarah',
+                last_name: 'Chen',
+                email: 'sarah@example.com',
+                phone: null,
+                tags: 'vip, wholesale',
+                orders_count: 3,
+                total_spent: '180.50',
+                default_address: { city: 'Toronto', country: 'Canada' },
+                created_at: '2023-06-01T12:00:00Z',
+                updated_at: '2024-03-02T09:00:00Z'
+            },
+            {
+                id: 502,
+                first_name: 'Mike',
+                last_name: 'Park',
+                email: 'mike@example.com',
+                phone: '+15550000001',
+                tags: '',
+                orders_count: 1,
+                total_spent: '15.00',
+                default_address: null,
+                created_at: '2024-03-02T08:00:00Z',
+                updated_at: '2024-03-02T08:30:00Z'
+            }
+        ]);
+        expect(stats.orphans).toBe(0);
+    });
+
+    test('counts children that arrive after their parent left the window', async () => {
+        const { payloads, stats } = await ingest('bulk_orders.jsonl', 'orders', 1);
+
+        // Order 1001 is emitted when 1002 arrives, before its second line item
+        expect(payloads.map(order => order.line_items.map(item => item.id))).toEqual([[9001], [9003], [9004]]);
+        expect(stats.orphans).toBe(2);
+    });
+});
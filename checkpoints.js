@@ -0,0 +1,35 @@
+const { SyncCheckpoint } = require('../models');
+
+// Per-tenant, per-entity sync high-water marks
+async function getCheckpoint(tenantId, entity) {
+    return SyncCheckpoint.findOne({
+        where: { tenant_id: tenantId, entity }
+    });
+}
+
+async function saveCheckpoint(tenantId, entity, { highWaterMark, full = false, state }) {
+    const existing = await getCheckpoint(tenantId, entity);
+    const values = {
+        tenant_id: tenantId,
+        entity,
+        // Never move the mark backwards, e.g. after an empty incremental run
+        high_water_mark: maxDate(existing?.high_water_mark, highWaterMark),
+        last_full_sync: full ? new Date() : existing?.last_full_sync || null
+    };
+    if (state !== undefined) {
+        values.state = state;
+    }
+
+    if (existing) {
+        return existing.update(values);
+    }
+    return SyncCheckpoint.create(values);
+}
+
+function maxDate(a, b) {
+    if (!a) return b || null;
+    if (!b) return a;
+    return new Date(a) > new Date(b) ? a : b;
+}
+
+module.exports = { getCheckpoint, saveCheckpoint };
@@ -0,0 +1,134 @@
+// Cluster launcher: node cluster.js
+// Forks WEB_CONCURRENCY workers running server.js on a shared port,
+// restarts crashed workers, relays cache invalidations between them and
+// collects per-worker health and telemetry. SIGHUP replaces workers one at a time
+// (rolling reload) without dropping the port.
+require('dotenv').config();
+const cluster = require('cluster');
+const os = require('os');
+const { relay } = require('./services/cluster_bus');
+const { mergeSnapshots } = require('./services/telemetry');
+
+const WORKERS = parseInt(process.env.WEB_CONCURRENCY, 10)
+  || (os.availableParallelism ? os.availableParallelism() : os.cpus().length);
+const SHUTDOWN_TIMEOUT_MS = 30000;
+const HEALTH_BROADCAST_INTERVAL_MS = 5000;
+// Workers dying sooner than this after start are restarted with backoff
+const CRASH_WINDOW_MS = 10000;
+const MAX_RESTART_DELAY_MS = 30000;
+
+if (cluster.isWorker) {
+  require('./server');
+} else {
+  const health = new Map();
+  const telemetry = new Map();
+  const startedAt = Date.now();
+  let restarts = 0;
+  let crashStreak = 0;
+  let reloading = false;
+  let stopping = false;
+
+  const fork = () => {
+    const worker = cluster.fork();
+    worker.startedAt = Date.now();
+
+    worker.on('message', (message) => {
+      if (!message) return;
+      if (message.bus) {
+        relay(worker, message);
+      } else if (message.type === 'health') {
+        health.set(worker.id, { ...message.health, reportedAt: new Date().toISOString() });
+        if (message.telemetry) telemetry.set(worker.id, message.telemetry);
+      }
+    });
+    return worker;
+  };
+
+  // Disconnect lets the worker finish in-flight requests and shut down on
+  // its own; kill it if it doesn't exit in time
+  const stopWorker = worker => new Promise((resolve) => {
+    if (worker.isDead()) return resolve();
+    const timer = setTimeout(() => worker.process.kill('SIGKILL'), SHUTDOWN_TIMEOUT_MS);
+    worker.once('exit', () => {
+      clearTimeout(timer);
+      resolve();
+    });
+    worker.disconnect();
+  });
+
+  const listening = worker => new Promise((resolve, reject) => {
+    worker.once('listening', resolve);
+    worker.once('exit', () => reject(new Error(`Worker ${worker.id} exited before listening`)));
+  });
+
+  cluster.on('exit', (worker, code, signal) => {
+    health.delete(worker.id);
+    telemetry.delete(worker.id);
+    if (stopping || worker.exitedAfterDisconnect) return;
+
+    restarts += 1;
+    crashStreak = Date.now() - worker.startedAt < CRASH_WINDOW_MS ? crashStreak + 1 : 0;
+    const delay = Math.min(MAX_RESTART_DELAY_MS, crashStreak * 1000);
+    console.error(`❌ Worker ${worker.id} (pid ${worker.process.pid}) died (${signal || code}), restarting in ${delay}ms`);
+    setTimeout(() => {
+      if (!stopping) fork();
+    }, delay);
+  });
+
+  // Replace every worker, one at a time: the new worker must be listening
+  // before the old one is disconnected, so capacity never drops by more
+  // than one worker
+  const rollingReload = async () => {
+    if (reloading || stopping) return;
+    reloading = true;
+    console.log('🔁 Rolling reload started');
+    try {
+      for (const old of Object.values(cluster.workers)) {
+        if (!old || stopping) continue;
+        const replacement = fork();
+        await listening(replacement);
+        await stopWorker(old);
+      }
+      console.log('🔁 Rolling reload finished');
+    } catch (error) {
+      console.error('Rolling reload failed:', error);
+    } finally {
+      reloading = false;
+    }
+  };
+
+  const shutdown = async (signal) => {
+    if (stopping) return;
+    stopping = true;
+    console.log(`${signal} received, stopping ${Object.keys(cluster.workers).length} workers`);
+    await Promise.all(Object.values(cluster.workers).map(stopWorker));
+    process.exit(0);
+  };
+
+  // Every worker's /health and /metrics show the whole cluster
+  setInterval(() => {
+    const message = {
+      type: 'cluster-health',
+      cluster: {
+        primaryPid: process.pid,
+        uptime: Math.round((Date.now() - startedAt) / 1000),
+        size: WORKERS,
+        restarts,
+        workers: [...health.values()]
+      },
+      telemetry: mergeSnapshots([...telemetry.values()])
+    };
+    for (const worker of Object.values(cluster.workers)) {
+      if (worker && worker.isConnected()) worker.send(message);
+    }
+  }, HEALTH_BROADCAST_INTERVAL_MS).unref();
+
+  process.on('SIGHUP', rollingReload);
+  process.on('SIGTERM', () => shutdown('SIGTERM'));
+  process.on('SIGINT', () => shutdown('SIGINT'));
+
+  console.log(`🧩 Primary ${process.pid} starting ${WORKERS} workers`);
+  for (let i = 0; i < WORKERS; i++) {
+    fork();
+  }
+}
@@ -0,0 +1,42 @@
+const cluster = require('cluster');
+
+// In-process state (cache versions, auth and shop caches) lives in each
+// cluster worker. Workers publish changes to the primary, which relays
+// them to every other worker. Outside cluster mode publish is a no-op.
+const handlers = new Map();
+
+function publish(type, payload) {
+    if (cluster.isWorker && process.connected) {
+        process.send({ bus: true, type, payload });
+    }
+}
+
+// Run handler(payload) for messages published by other workers
+function subscribe(type, handler) {
+    if (!handlers.has(type)) handlers.set(type, []);
+    handlers.get(type).push(handler);
+}
+
+if (cluster.isWorker) {
+    process.on('message', (message) => {
+        if (!message || !message.bus) return;
+        for (const handler of handlers.get(message.type) || []) {
+            try {
+                handler(message.payload);
+            } catch (error) {
+                console.error(`Cluster bus handler for ${message.type} failed:`, error);
+            }
+        }
+    });
+}
+
+// Primary side: forward a worker's bus message to all other workers
+function relay(from, message) {
+    for (const worker of Object.values(cluster.workers)) {
+        if (worker && worker !== from && worker.isConnected()) {
+            worker.send(message);
+        }
+    }
+}
+
+module.exports = { publish, subscribe, relay };
@@ -37,10 +37,31 @@ module.exports = (sequelize, DataTypes) => {
       type: DataTypes.STRING,
       allowNull: true
     },
+    // Maintained by the RFM segmentation job (services/segments.js)
     segment: {
-      type: DataTypes.ENUM('VIP', 'Regular', 'New'),
+      type: DataTypes.ENUM('VIP', 'Regular', 'New', 'At Risk', 'Lost'),
       defaultValue: 'New'
     },
+    recency_score: {
+      type: DataTypes.TINYINT,
+      allowNull: true
+    },
+    frequency_score: {
+      type: DataTypes.TINYINT,
+      allowNull: true
+    },
+    monetary_score: {
+      type: DataTypes.TINYINT,
+      allowNull: true
+    },
+    last_order_date: {
+      type: DataTypes.DATEONLY,
+      allowNull: true
+    },
+    segmented_at: {
+      type: DataTypes.DATE,
+      allowNull: true
+    },
     phone: {
       type: DataTypes.STRING,
       allowNull: true
@@ -48,6 +69,12 @@ module.exports = (sequelize, DataTypes) => {
     tags: {
       type: DataTypes.TEXT,
       allowNull: true
+    },
+    // Shopify's created_at; created_at is when the row was first synced.
+    // New-customer rollups are bucketed on this (services/rollups.js).
+    shopify_created_at: {
+      type: DataTypes.DATE,
+      allowNull: true
     }
   }, {
     tableName: 'customers',
@@ -56,6 +83,8 @@ module.exports = (sequelize, DataTypes) => {
       { fields: ['tenant_id', 'email'] },
       { fields: ['tenant_id', 'total_spent'] },
       { fields: ['tenant_id', 'segment'] },
+      { fields: ['tenant_id', 'created_at'] },
+      { fields: ['tenant_id', 'shopify_created_at'] },
       { unique: true, fields: ['tenant_id', 'shopify_customer_id'] }
     ],
     defaultScope: {
@@ -0,0 +1,169 @@
+const { Customer } = require('../models');
+const { Op } = require('sequelize');
+
+const SCAN_PAGE_SIZE = 10000;
+// The overlay is folded into the sorted arrays once it holds this many
+// entries, or 1/16 of the index if that is larger
+const OVERLAY_MERGE_MIN = 4096;
+
+// Compact shopify_customer_id -> local customer id lookup for one tenant.
+// The bulk of the index lives in two parallel Float64Arrays sorted by
+// Shopify id (16 bytes per customer); customers written after the scan
+// go into a small overlay Map, which is merged into the arrays as it
+// grows (a first sync writes every customer after the scan).
+class CustomerIndex {
+    constructor(tenantId) {
+        this.tenantId = tenantId;
+        this.keys = new Float64Array(0);
+        this.values = new Float64Array(0);
+        this.size = 0;
+        this.overlay = new Map();
+        this.loading = null;
+        this.scanning = false;
+    }
+
+    // Build the index once with a keyset scan over the
+    // (tenant_id, shopify_customer_id) unique index
+    load() {
+        if (!this.loading) {
+            this.loading = this.scan();
+        }
+        return this.loading;
+    }
+
+    async scan() {
+        this.scanning = true;
+        try {
+            await this.scanAll();
+        } finally {
+            this.scanning = false;
+        }
+        this.mergeIfFull();
+        return this.size;
+    }
+
+    async scanAll() {
+        let keys = new Float64Array(SCAN_PAGE_SIZE);
+        let values = new Float64Array(SCAN_PAGE_SIZE);
+        let size = 0;
+        let lastKey = null;
+
+        while (true) {
+            const where = {
+                tenant_id: this.tenantId,
+                shopify_customer_id: lastKey === null ? { [Op.ne]: null } : { [Op.gt]: lastKey }
+            };
+            const page = await Customer.findAll({
+                attributes: ['id', 'shopify_customer_id'],
+                where,
+                order: [['shopify_customer_id', 'ASC']],
+                limit: SCAN_PAGE_SIZE,
+                raw: true
+            });
+
+            if (size + page.length > keys.length) {
+                const capacity = Math.max(keys.length * 2, size + page.length);
+                keys = grow(keys, capacity);
+                values = grow(values, capacity);
+            }
+            for (const row of page) {
+                keys[size] = Number(row.shopify_customer_id);
+                values[size] = Number(row.id);
+                size++;
+            }
+
+            if (page.length < SCAN_PAGE_SIZE) break;
+            lastKey = page[page.length - 1].shopify_customer_id;
+        }
+
+        this.keys = keys.subarray(0, size);
+        this.values = values.subarray(0, size);
+        this.size = size;
+    }
+
+    get(shopifyCustomerId) {
+        if (shopifyCustomerId === null || shopifyCustomerId === undefined) return null;
+        const key = Number(shopifyCustomerId);
+
+        const recent = this.overlay.get(key);
+        if (recent !== undefined) return recent;
+
+        let lo = 0;
+        let hi = this.size - 1;
+        while (lo <= hi) {
+            const mid = (lo + hi) >>> 1;
+            const k = this.keys[mid];
+            if (k === key) return this.values[mid];
+            if (k < key) lo = mid + 1;
+            else hi = mid - 1;
+        }
+        return null;
+    }
+
+    set(shopifyCustomerId, customerId) {
+        this.overlay.set(Number(shopifyCustomerId), Number(customerId));
+        this.mergeIfFull();
+    }
+
+    // Not while a scan is running: its result replaces the arrays
+    mergeIfFull() {
+        if (this.scanning || this.overlay.size < Math.max(OVERLAY_MERGE_MIN, this.size >>> 4)) return;
+
+        const recent = [...this.overlay].sort((a, b) => a[0] - b[0]);
+        const keys = new Float64Array(this.size + recent.length);
+        const values = new Float64Array(this.size + recent.length);
+        let i = 0;
+        let j = 0;
+        let n = 0;
+        while (i < this.size || j < recent.length) {
+            if (j === recent.length || (i < this.size && this.keys[i] < recent[j][0])) {
+                keys[n] = this.keys[i];
+                values[n++] = this.values[i++];
+            } else {
+                // The overlay is newer than the scanned row for the same key
+                if (i < this.size && this.keys[i] === recent[j][0]) i++;
+                keys[n] = recent[j][0];
+                values[n++] = recent[j++][1];
+            }
+        }
+
+        this.keys = keys.subarray(0, n);
+        this.values = values.subarray(0, n);
+        this.size = n;
+        this.overlay.clear();
+    }
+
+    // Look up local ids for Shopify ids the index doesn't know yet, in one
+    // query. Used for freshly written customers and for incremental runs
+    // that resolve a page of orders without scanning the whole tenant.
+    async ensure(shopifyCustomerIds, transaction) {
+        const missing = [...new Set(shopifyCustomerIds
+            .filter(id => id !== null && id !== undefined && this.get(id) === null))];
+        if (missing.length === 0) return;
+
+        const found = await Customer.findAll({
+            attributes: ['id', 'shopify_customer_id'],
+            where: {
+                tenant_id: this.tenantId,
+                shopify_customer_id: missing
+            },
+            raw: true,
+            transaction
+        });
+        for (const row of found) {
+            this.set(row.shopify_customer_id, row.id);
+        }
+    }
+
+    async addWritten(rows, transaction) {
+        return this.ensure(rows.map(row => row.shopify_customer_id), transaction);
+    }
+}
+
+function grow(array, capacity) {
+    const next = new Float64Array(capacity);
+    next.set(array);
+    return next;
+}
+
+module.exports = { CustomerIndex };
@@ -1,58 +1,52 @@
 const express = require('express');
 const { Customer } = require('../models');
-const { Op } = require('sequelize');
+const { invalidateOnWrite } = require('../services/metrics_cache');
+const { paginate, PaginationError } = require('../services/pagination');
+const { refreshCustomerDays, customerDay } = require('../services/rollups');
+const searchIndex = require('../services/search');
 const router = express.Router();
 
+// Successful writes invalidate the tenant's cached metrics
+router.use(invalidateOnWrite);
+
 // Get customers
 router.get('/', async (req, res) => {
   try {
-    const { limit, offset, sort, search, segment } = req.query;
+    const { search, segment } = req.query;
     
     // Build query options
     const queryOptions = {
       where: { tenant_id: req.tenantId }
     };
 
-    // Add search filter
-    if (search) {
-      queryOptions.where[Op.or] = [
-        { name: { [Op.like]: `%${search}%` } },
-        { email: { [Op.like]: `%${search}%` } }
-      ];
-    }
-
     // Add segment filter
     if (segment) {
       queryOptions.where.segment = segment;
     }
 
-    // Add pagination
-    if (limit) {
-      queryOptions.limit = parseInt(limit);
-    }
-    if (offset) {
-      queryOptions.offset = parseInt(offset);
-    }
-
-    // Add sorting
-    if (sort) {
-      const [field, direction] = sort.split(':');
-      queryOptions.order = [[field, direction || 'ASC']];
-    } else {
-      queryOptions.order = [['created_at', 'DESC']];
+    // Search goes through the token index and is ordered by relevance
+    if (search) {
+      const data = await searchIndex.search(req.tenantId, 'customers', search, {
+        where: queryOptions.where,
+        limit: Math.min(parseInt(req.query.limit, 10) || 20, 100)
+      });
+      return res.json({ data, limit: data.length, sort: 'relevance', nextCursor: null, prevCursor: null });
     }
 
-    const customers = await Customer.findAll(queryOptions);
-    const total = await Customer.count({ where: queryOptions.where });
-
-    res.json({
-      data: customers,
-      total,
-      page: offset ? Math.floor(offset / (limit || 10)) + 1 : 1,
-      totalPages: limit ? Math.ceil(total / limit) : 1
+    // Cursor pagination over indexed sort keys
+    const result = await paginate(Customer, {
+      ...queryOptions,
+      query: req.query,
+      sortable: ['created_at', 'total_spent'],
+      defaultSort: 'created_at:DESC'
     });
 
+    res.json(result);
+
   } catch (error) {
+    if (error instanceof PaginationError) {
+      return res.status(400).json({ error: error.message });
+    }
     console.error('Get customers error:', error);
     res.status(500).json({ error: 'Failed to fetch customers' });
   }
@@ -88,6 +82,8 @@ router.post('/', async (req, res) => {
     };
 
     const customer = await Customer.create(customerData);
+    await searchIndex.indexRecords(req.tenantId, 'customers', [customer]);
+    await refreshCustomerDays(req.tenantId, [customerDay(customer)]);
     res.status(201).json(customer);
   } catch (error) {
     console.error('Create customer error:', error);
@@ -110,6 +106,7 @@ router.put('/:id', async (req, res) => {
     }
 
     await customer.update(req.body);
+    await searchIndex.indexRecords(req.tenantId, 'customers', [customer]);
     res.json(customer);
   } catch (error) {
     console.error('Update customer error:', error);
@@ -132,6 +129,8 @@ router.delete('/:id', async (req, res) => {
     }
 
     await customer.destroy();
+    await searchIndex.removeRecords(req.tenantId, 'customers', [customer.id]);
+    await refreshCustomerDays(req.tenantId, [customerDay(customer)]);
     res.json({ message: 'Customer deleted successfully' });
   } catch (error) {
     console.error('Delete customer error:', error);
@@ -0,0 +1,56 @@
+module.exports = (sequelize, DataTypes) => {
+  const DailyRollup = sequelize.define('DailyRollup', {
+    id: {
+      type: DataTypes.BIGINT,
+      autoIncrement: true,
+      primaryKey: true
+    },
+    tenant_id: {
+      type: DataTypes.STRING,
+      allowNull: false,
+      references: {
+        model: 'tenants',
+        key: 'id'
+      }
+    },
+    day: {
+      type: DataTypes.DATEONLY,
+      allowNull: false
+    },
+    orders_count: {
+      type: DataTypes.INTEGER,
+      defaultValue: 0
+    },
+    revenue: {
+      type: DataTypes.DECIMAL(14, 2),
+      defaultValue: 0.00
+    },
+    fulfilled_count: {
+      type: DataTypes.INTEGER,
+      defaultValue: 0
+    },
+    processing_count: {
+      type: DataTypes.INTEGER,
+      defaultValue: 0
+    },
+    pending_count: {
+      type: DataTypes.INTEGER,
+      defaultValue: 0
+    },
+    cancelled_count: {
+      type: DataTypes.INTEGER,
+      defaultValue: 0
+    },
+    new_customers: {
+      type: DataTypes.INTEGER,
+      defaultValue: 0
+    }
+  }, {
+    tableName: 'daily_rollups',
+    indexes: [
+      { unique: true, fields: ['tenant_id', 'day'] }
+    ]
+  });
+
+  return DailyRollup;
+};
@@ -1,5 +1,6 @@
 require('dotenv').config();
 const { Sequelize } = require('sequelize');
+const { instrumentSequelize } = require('../services/telemetry');
 
 const sequelize = new Sequelize(
   process.env.DB_NAME || 'insightsx',
@@ -28,4 +29,7 @@ const sequelize = new Sequelize(
   }
 );
 
+// Query and pool-wait timings for the /metrics endpoint
+instrumentSequelize(sequelize);
+
 module.exports = sequelize;
@@ -7,6 +7,13 @@ const User = require('./user');
 const Customer = require('./customer');
 const Order = require('./order');
 const Product = require('./product');
+const SyncCheckpoint = require('./sync_checkpoint');
+const SyncJob = require('./sync_job');
+const SyncRun = require('./sync_run');
+const DailyRollup = require('./daily_rollup');
+const SearchToken = require('./search_token');
+const OrderLineItem = require('./order_line_item');
+const RateLimitBucket = require('./rate_limit_bucket');
 
 // Initialize models
 const models = {
@@ -14,7 +21,14 @@ const models = {
   User: User(sequelize, DataTypes),
   Customer: Customer(sequelize, DataTypes),
   Order: Order(sequelize, DataTypes),
-  Product: Product(sequelize, DataTypes)
+  Product: Product(sequelize, DataTypes),
+  SyncCheckpoint: SyncCheckpoint(sequelize, DataTypes),
+  SyncJob: SyncJob(sequelize, DataTypes),
+  SyncRun: SyncRun(sequelize, DataTypes),
+  DailyRollup: DailyRollup(sequelize, DataTypes),
+  SearchToken: SearchToken(sequelize, DataTypes),
+  OrderLineItem: OrderLineItem(sequelize, DataTypes),
+  RateLimitBucket: RateLimitBucket(sequelize, DataTypes)
 };
 
 // Define associations
@@ -39,6 +53,21 @@ models.Customer.hasMany(models.Order, { foreignKey: 'customer_id' });
 models.Product.belongsTo(models.Tenant, { foreignKey: 'tenant_id' });
 models.Tenant.hasMany(models.Product, { foreignKey: 'tenant_id' });
 
+models.SyncCheckpoint.belongsTo(models.Tenant, { foreignKey: 'tenant_id' });
+models.Tenant.hasMany(models.SyncCheckpoint, { foreignKey: 'tenant_id' });
+
+models.SyncJob.belongsTo(models.Tenant, { foreignKey: 'tenant_id' });
+models.Tenant.hasMany(models.SyncJob, { foreignKey: 'tenant_id' });
+
+models.SyncRun.belongsTo(models.Tenant, { foreignKey: 'tenant_id' });
+models.Tenant.hasMany(models.SyncRun, { foreignKey: 'tenant_id' });
+
+models.DailyRollup.belongsTo(models.Tenant, { foreignKey: 'tenant_id' });
+models.Tenant.hasMany(models.DailyRollup, { foreignKey: 'tenant_id' });
+
+models.OrderLineItem.belongsTo(models.Tenant, { foreignKey: 'tenant_id' });
+models.Tenant.hasMany(models.OrderLineItem, { foreignKey: 'tenant_id' });
+
 // Add sequelize instance and Sequelize constructor to models
 models.sequelize = sequelize;
 models.Sequelize = require('sequelize');
@@ -0,0 +1,94 @@
+const EventEmitter = require('events');
+const { sequelize } = require('../models');
+
+const LOCK_NAME = process.env.LEADER_LOCK_NAME || 'insightx:background-leader';
+const CHECK_INTERVAL_MS = 15000;
+
+// Run a query on a raw mysql2 connection held outside the Sequelize pool
+function rawQuery(connection, sql, params) {
+    return new Promise((resolve, reject) => {
+        connection.query(sql, params, (error, rows) => (error ? reject(error) : resolve(rows)));
+    });
+}
+
+// Elects one process (across all cluster workers and hosts sharing the
+// database) to run background work, using a MySQL named lock. The lock
+// belongs to a dedicated connection, so it is released by MySQL as soon as
+// the leader's process dies or loses its connection, and the next check
+// on another process takes over. Emits 'elected' and 'deposed'.
+class LeaderElector extends EventEmitter {
+    constructor({ name = LOCK_NAME, interval = CHECK_INTERVAL_MS } = {}) {
+        super();
+        this.name = name;
+        this.interval = interval;
+        this.connection = null;
+        this.isLeader = false;
+        this.timer = null;
+    }
+
+    start() {
+        let checking = null;
+        const check = () => {
+            checking = checking || this.check()
+                .catch((error) => {
+                    console.error('Leader election check failed:', error.message);
+                    return this.depose();
+                })
+                .finally(() => {
+                    checking = null;
+                });
+        };
+        check();
+        this.timer = setInterval(check, this.interval);
+        this.timer.unref();
+    }
+
+    async check() {
+        if (this.isLeader) {
+            // Still holding the lock on our connection?
+            const [row] = await rawQuery(this.connection,
+                'SELECT IS_USED_LOCK(?) = CONNECTION_ID() AS held', [this.name]);
+            if (!row || !row.held) await this.depose();
+            return;
+        }
+
+        const connection = await sequelize.connectionManager.getConnection({ type: 'write' });
+        let acquired = false;
+        try {
+            const [row] = await rawQuery(connection, 'SELECT GET_LOCK(?, 0) AS acquired', [this.name]);
+            acquired = row && row.acquired === 1;
+        } finally {
+            if (!acquired) sequelize.connectionManager.releaseConnection(connection);
+        }
+
+        if (acquired) {
+            this.connection = connection;
+            this.isLeader = true;
+            this.emit('elected');
+        }
+    }
+
+    // Give up leadership. The lock is released before the connection goes
+    // back to the pool, so no pooled connection keeps holding it; a broken
+    // connection fails validation and is discarded by the pool.
+    async depose() {
+        const wasLeader = this.isLeader;
+        const connection = this.connection;
+        this.isLeader = false;
+        this.connection = null;
+
+        if (connection) {
+            await rawQuery(connection, 'SELECT RELEASE_LOCK(?)', [this.name]).catch(() => {});
+            sequelize.connectionManager.releaseConnection(connection);
+        }
+        if (wasLeader) this.emit('deposed');
+    }
+
+    async stop() {
+        clearInterval(this.timer);
+        this.timer = null;
+        await this.depose();
+    }
+}
+
+module.exports = { LeaderElector };
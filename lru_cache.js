@@ -0,0 +1,48 @@
+// Map-backed LRU with a per-entry TTL. Map iteration order is insertion
+// order, so re-inserting on read keeps the least recently used entry first.
+class LruTtlCache {
+    constructor({ max = 1000, ttlMs = 5 * 60 * 1000 } = {}) {
+        this.max = max;
+        this.ttlMs = ttlMs;
+        this.entries = new Map();
+        this.evictions = 0;
+    }
+
+    get(key) {
+        const entry = this.entries.get(key);
+        if (!entry) return undefined;
+
+        this.entries.delete(key);
+        if (entry.expiresAt <= Date.now()) return undefined;
+
+        this.entries.set(key, entry);
+        return entry.value;
+    }
+
+    set(key, value) {
+        this.entries.delete(key);
+        this.entries.set(key, { value, expiresAt: Date.now() + this.ttlMs });
+
+        while (this.entries.size > this.max) {
+            this.entries.delete(this.entries.keys().next().value);
+            this.evictions += 1;
+        }
+    }
+
+    delete(key) {
+        return this.entries.delete(key);
+    }
+
+    // Drop every entry whose value matches, e.g. all entries of one user
+    deleteWhere(predicate) {
+        for (const [key, entry] of this.entries) {
+            if (predicate(entry.value, key)) this.entries.delete(key);
+        }
+    }
+
+    get size() {
+        return this.entries.size;
+    }
+}
+
+module.exports = { LruTtlCache };
@@ -1,52 +1,53 @@
 const express = require('express');
-const { Customer, Order, Product, sequelize } = require('../models');
+const { Customer, Order, Product, DailyRollup, sequelize } = require('../models');
 const { Op } = require('sequelize');
 const moment = require('moment');
+const { cacheResponse } = require('../services/metrics_cache');
+const timeseries = require('../services/timeseries');
 const router = express.Router();
 
+// Responses are cached per tenant and query until the tenant's data changes
+router.use(cacheResponse);
+
 // Get dashboard metrics
 router.get('/', async (req, res) => {
   try {
     const tenantId = req.tenantId;
 
-    // Calculate date ranges for growth comparison
+    // Everything except recent orders comes from the per-day rollups
     const currentMonth = moment().startOf('month');
-    const lastMonth = moment().subtract(1, 'month').startOf('month');
-    const currentMonthEnd = moment().endOf('month');
-    const lastMonthEnd = moment().subtract(1, 'month').endOf('month');
+    const beforeCurrentMonth = (column) => sequelize.literal(
+      `SUM(CASE WHEN day < ${sequelize.escape(currentMonth.format('YYYY-MM-DD'))} THEN ${column} ELSE 0 END)`
+    );
 
-    // Get overview metrics
-    const [
-      totalCustomers,
-      totalOrders,
-      totalRevenue,
-      lastMonthCustomers,
-      lastMonthOrders,
-      lastMonthRevenue
-    ] = await Promise.all([
-      Customer.count({ where: { tenant_id: tenantId } }),
-      Order.count({ where: { tenant_id: tenantId } }),
-      Order.sum('amount', { where: { tenant_id: tenantId } }) || 0,
-      Customer.count({ 
-        where: { 
-          tenant_id: tenantId,
-          created_at: { [Op.lt]: currentMonth.toDate() }
-        } 
-      }),
-      Order.count({ 
-        where: { 
-          tenant_id: tenantId,
-          date: { [Op.lt]: currentMonth.format('YYYY-MM-DD') }
-        } 
+    const [totals, revenueSeries] = await Promise.all([
+      DailyRollup.findOne({
+        attributes: [
+          [sequelize.fn('SUM', sequelize.col('new_customers')), 'totalCustomers'],
+          [sequelize.fn('SUM', sequelize.col('orders_count')), 'totalOrders'],
+          [sequelize.fn('SUM', sequelize.col('revenue')), 'totalRevenue'],
+          [beforeCurrentMonth('new_customers'), 'lastMonthCustomers'],
+          [beforeCurrentMonth('orders_count'), 'lastMonthOrders'],
+          [beforeCurrentMonth('revenue'), 'lastMonthRevenue'],
+          [sequelize.fn('SUM', sequelize.col('fulfilled_count')), 'Fulfilled'],
+          [sequelize.fn('SUM', sequelize.col('processing_count')), 'Processing'],
+          [sequelize.fn('SUM', sequelize.col('pending_count')), 'Pending'],
+          [sequelize.fn('SUM', sequelize.col('cancelled_count')), 'Cancelled']
+        ],
+        where: { tenant_id: tenantId },
+        raw: true
       }),
-      Order.sum('amount', { 
-        where: { 
-          tenant_id: tenantId,
-          date: { [Op.lt]: currentMonth.format('YYYY-MM-DD') }
-        } 
-      }) || 0
+      // Revenue and orders over the dashboard's selected period
+      timeseries.revenueSeries(tenantId, req.query)
     ]);
 
+    const totalCustomers = parseInt(totals?.totalCustomers) || 0;
+    const totalOrders = parseInt(totals?.totalOrders) || 0;
+    const totalRevenue = parseFloat(totals?.totalRevenue) || 0;
+    const lastMonthCustomers = parseInt(totals?.lastMonthCustomers) || 0;
+    const lastMonthOrders = parseInt(totals?.lastMonthOrders) || 0;
+    const lastMonthRevenue = parseFloat(totals?.lastMonthRevenue) || 0;
+
     // Calculate average order value
     const avgOrderValue = totalOrders > 0 ? totalRevenue / totalOrders : 0;
     const lastMonthAvgOrderValue = lastMonthOrders > 0 ? lastMonthRevenue / lastMonthOrders : 0;
@@ -68,34 +69,10 @@ router.get('/', async (req, res) => {
       ? ((avgOrderValue - lastMonthAvgOrderValue) / lastMonthAvgOrderValue) * 100 
       : 0;
 
-    // Get revenue data for last 6 months
-    const revenueData = await Order.findAll({
-      attributes: [
-        [sequelize.fn('DATE_FORMAT', sequelize.col('date'), '%b'), 'month'],
-        [sequelize.fn('SUM', sequelize.col('amount')), 'revenue'],
-        [sequelize.fn('COUNT', sequelize.col('id')), 'orders']
-      ],
-      where: {
-        tenant_id: tenantId,
-        date: {
-          [Op.gte]: moment().subtract(5, 'months').startOf('month').format('YYYY-MM-DD')
-        }
-      },
-      group: [sequelize.fn('MONTH', sequelize.col('date'))],
-      order: [['date', 'ASC']],
-      raw: true
-    });
-
-    // Get order status distribution
-    const orderStatus = await Order.findAll({
-      attributes: [
-        'status',
-        [sequelize.fn('COUNT', sequelize.col('id')), 'count']
-      ],
-      where: { tenant_id: tenantId },
-      group: ['status'],
-      raw: true
-    });
+    // Order status distribution
+    const orderStatus = ['Fulfilled', 'Processing', 'Pending', 'Cancelled']
+      .map(status => ({ status, count: parseInt(totals?.[status]) || 0 }))
+      .filter(item => item.count > 0);
 
     // Add colors to order status
     const statusColors = {
@@ -143,11 +120,12 @@ router.get('/', async (req, res) => {
 
     res.json({
       overview,
-      revenueData: revenueData.map(item => ({
-        month: item.month,
-        revenue: parseFloat(item.revenue) || 0,
-        orders: parseInt(item.orders) || 0
+      revenueData: revenueSeries.labels.map((label, i) => ({
+        month: label,
+        revenue: revenueSeries.revenue[i],
+        orders: revenueSeries.orders[i]
       })),
+      revenueSeries: timeseries.seriesToJSON(revenueSeries),
       orderStatus: orderStatusWithColors.map(item => ({
         status: item.status,
         count: parseInt(item.count),
@@ -157,11 +135,30 @@ router.get('/', async (req, res) => {
     });
 
   } catch (error) {
+    if (error instanceof timeseries.TimeSeriesError) {
+      return res.status(400).json({ error: error.message });
+    }
     console.error('Get metrics error:', error);
     res.status(500).json({ error: 'Failed to fetch metrics' });
   }
 });
 
+// Get revenue/orders time series
+// Query: period (7days|1month|3months|6months|1year) or from/to (YYYY-MM-DD),
+// optional granularity (day|week|month)
+router.get('/revenue', async (req, res) => {
+  try {
+    const series = await timeseries.revenueSeries(req.tenantId, req.query);
+    res.json(timeseries.seriesToJSON(series));
+  } catch (error) {
+    if (error instanceof timeseries.TimeSeriesError) {
+      return res.status(400).json({ error: error.message });
+    }
+    console.error('Get revenue series error:', error);
+    res.status(500).json({ error: 'Failed to fetch revenue series' });
+  }
+});
+
 // Get customer metrics
 router.get('/customers', async (req, res) => {
   try {
@@ -186,19 +183,19 @@ router.get('/customers', async (req, res) => {
     });
 
     // Get customer growth over time
-    const customerGrowth = await Customer.findAll({
+    const customerGrowth = await DailyRollup.findAll({
       attributes: [
-        [sequelize.fn('DATE_FORMAT', sequelize.col('created_at'), '%b'), 'month'],
-        [sequelize.fn('COUNT', sequelize.col('id')), 'newCustomers']
+        [sequelize.fn('DATE_FORMAT', sequelize.fn('MIN', sequelize.col('day')), '%b'), 'month'],
+        [sequelize.fn('SUM', sequelize.col('new_customers')), 'newCustomers']
       ],
       where: {
         tenant_id: tenantId,
-        created_at: {
-          [Op.gte]: moment().subtract(11, 'months').startOf('month').toDate()
+        day: {
+          [Op.gte]: moment().subtract(11, 'months').startOf('month').format('YYYY-MM-DD')
         }
       },
-      group: [sequelize.fn('MONTH', sequelize.col('created_at'))],
-      order: [['created_at', 'ASC']],
+      group: [sequelize.fn('DATE_FORMAT', sequelize.col('day'), '%Y-%m')],
+      order: [[sequelize.fn('MIN', sequelize.col('day')), 'ASC']],
       raw: true
     });
 
@@ -225,10 +222,12 @@ router.get('/products', async (req, res) => {
   try {
     const tenantId = req.tenantId;
 
-    // Get top selling products
+    // Top products by units sold (or ?rank=revenue), read from the
+    // precomputed counters through the (tenant_id, sales|revenue) indexes
+    const rank = req.query.rank === 'revenue' ? 'revenue' : 'sales';
     const topProducts = await Product.findAll({
       where: { tenant_id: tenantId },
-      order: [['sales', 'DESC']],
+      order: [[rank, 'DESC']],
       limit: 10
     });
 
@@ -238,6 +237,7 @@ router.get('/products', async (req, res) => {
         'category',
         [sequelize.fn('COUNT', sequelize.col('id')), 'productCount'],
         [sequelize.fn('SUM', sequelize.col('sales')), 'totalSales'],
+        [sequelize.fn('SUM', sequelize.col('revenue')), 'totalRevenue'],
         [sequelize.fn('AVG', sequelize.col('price')), 'avgPrice']
       ],
       where: { 
@@ -264,6 +264,7 @@ router.get('/products', async (req, res) => {
         category: c.category,
         productCount: parseInt(c.productCount),
         totalSales: parseInt(c.totalSales) || 0,
+        totalRevenue: parseFloat(c.totalRevenue) || 0,
         avgPrice: parseFloat(c.avgPrice) || 0
       })),
       lowInventoryProducts
@@ -0,0 +1,136 @@
+const crypto = require('crypto');
+const { Tenant } = require('../models');
+const { publish, subscribe } = require('./cluster_bus');
+const { LruTtlCache } = require('./lru_cache');
+
+const DEFAULT_MAX_ENTRIES = parseInt(process.env.METRICS_CACHE_MAX, 10) || 1000;
+const DEFAULT_TTL_MS = parseInt(process.env.METRICS_CACHE_TTL_MS, 10) || 5 * 60 * 1000;
+// How long a process trusts its copy of a tenant's data version
+const VERSION_TTL_MS = parseInt(process.env.METRICS_CACHE_VERSION_TTL_MS, 10) || 1000;
+
+// Per-tenant data version, bumped by every write that can change metrics.
+// Cached responses remember the version they were computed at. The version
+// is tenants.data_version, so writes from any process (the external sync
+// worker, webhooks handled on another dyno) invalidate every web process;
+// each process re-reads it at most every VERSION_TTL_MS.
+const dataVersions = new LruTtlCache({ ttlMs: VERSION_TTL_MS, max: 10000 });
+
+async function dataVersion(tenantId) {
+    const key = String(tenantId);
+    let version = dataVersions.get(key);
+    if (version === undefined) {
+        const tenant = await Tenant.findByPk(key, { attributes: ['data_version'], raw: true });
+        version = tenant ? Number(tenant.data_version) : 0;
+        dataVersions.set(key, version);
+    }
+    return version;
+}
+
+function dropVersion(tenantId) {
+    dataVersions.delete(String(tenantId));
+}
+
+// Bumps made in this cluster also drop the workers' copies at once rather
+// than after VERSION_TTL_MS
+async function bumpDataVersion(tenantId, transaction) {
+    await Tenant.increment('data_version', {
+        where: { id: String(tenantId) },
+        silent: true,
+        transaction
+    });
+    dropVersion(tenantId);
+    publish('data-version', String(tenantId));
+}
+
+subscribe('data-version', dropVersion);
+
+const cache = new LruTtlCache({ max: DEFAULT_MAX_ENTRIES, ttlMs: DEFAULT_TTL_MS });
+const stats = { hits: 0, misses: 0, notModified: 0 };
+
+function cacheKey(req) {
+    const query = Object.keys(req.query)
+        .sort()
+        .map(name => `${name}=${req.query[name]}`)
+        .join('&');
+    return `${req.tenantId}:${req.baseUrl}${req.path}?${query}`;
+}
+
+// Response cache for tenant-scoped GET routes. Serves cached JSON while
+// the tenant's data version is unchanged, and answers If-None-Match with
+// 304 so unchanged dashboards skip the body entirely.
+async function cacheResponse(req, res, next) {
+    if (req.method !== 'GET') return next();
+
+    const key = cacheKey(req);
+    let version;
+    try {
+        version = await dataVersion(req.tenantId);
+    } catch (error) {
+        return next(error);
+    }
+    const entry = cache.get(key);
+
+    res.set('Cache-Control', 'private, no-cache');
+
+    if (entry && entry.version === version) {
+        stats.hits += 1;
+        res.set('ETag', entry.etag);
+        if (req.fresh) {
+            stats.notModified += 1;
+            return res.status(304).end();
+        }
+        res.type('json');
+        return res.send(entry.body);
+    }
+
+    stats.misses += 1;
+    const json = res.json.bind(res);
+    res.json = (payload) => {
+        if (res.statusCode === 200) {
+            const body = JSON.stringify(payload);
+            const etag = `"${crypto.createHash('sha1').update(body).digest('base64url')}"`;
+            cache.set(key, { version, etag, body });
+
+            res.set('ETag', etag);
+            if (req.fresh) {
+                stats.notModified += 1;
+                return res.status(304).end();
+            }
+            res.type('json');
+            return res.send(body);
+        }
+        return json(payload);
+    };
+    next();
+}
+
+// Bump the tenant's data version after successful writes on a router
+function invalidateOnWrite(req, res, next) {
+    if (req.method !== 'GET') {
+        res.on('finish', () => {
+            if (res.statusCode < 400) {
+                bumpDataVersion(req.tenantId)
+                    .catch(error => console.error(`Data version bump failed for tenant ${req.tenantId}:`, error));
+            }
+        });
+    }
+    next();
+}
+
+function getCacheStats() {
+    const lookups = stats.hits + stats.misses;
+    return {
+        ...stats,
+        hitRate: lookups > 0 ? parseFloat((stats.hits / lookups).toFixed(3)) : 0,
+        entries: cache.size,
+        evictions: cache.evictions
+    };
+}
+
+module.exports = {
+    cacheResponse,
+    invalidateOnWrite,
+    bumpDataVersion,
+    dataVersion,
+    getCacheStats
+};
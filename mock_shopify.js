@@ -0,0 +1,165 @@
+// Stand-in for the Shopify Admin REST API, serving a deterministic
+// synthetic store (scripts/synthetic.js) for sync benchmarks and local
+// development. Supports the list and count endpoints ShopifyService uses,
+// with limit / since_id / updated_at_min paging, the call-limit header, 429s
+// when the leaky bucket overflows, and injected latency and 5xx errors.
+//
+// Usage: node scripts/mock_shopify.js [--port 4010] [--records 10000]
+//   [--seed 1] [--bucket 40] [--leak 2] [--latency 50] [--jitter 20]
+//   [--error-rate 0]
+// Point the app at it with SHOPIFY_API_BASE_URL=http://localhost:4010
+const http = require('http');
+const { parseArgs } = require('util');
+const { storeLayout, customerAt, orderAt, productAt } = require('./synthetic');
+
+const MAX_LIMIT = 250;
+const DEFAULT_LIMIT = 50;
+
+const RESOURCES = {
+  customers: { count: layout => layout.customers, at: customerAt, base: layout => layout.ids.customer },
+  orders: { count: layout => layout.orders, at: orderAt, base: layout => layout.ids.order },
+  products: { count: layout => layout.products, at: productAt, base: layout => layout.ids.product }
+};
+
+// Server-side leaky bucket, as Shopify enforces it per app and shop
+class LeakyBucket {
+  constructor(max, leakPerSec) {
+    this.max = max;
+    this.leakPerSec = leakPerSec;
+    this.level = 0;
+    this.updatedAt = Date.now();
+  }
+
+  take() {
+    const now = Date.now();
+    this.level = Math.max(0, this.level - ((now - this.updatedAt) / 1000) * this.leakPerSec);
+    this.updatedAt = now;
+    if (this.level + 1 > this.max) return false;
+    this.level += 1;
+    return true;
+  }
+}
+
+// Records of a resource with id > sinceId and updated_at >= updatedMin, in
+// id order. Without a time filter this is a direct slice; with one it scans
+// forward from since_id, like an index range scan on the real API.
+function listRecords(layout, resource, { limit, sinceId, updatedMin }) {
+  const { count, at, base } = RESOURCES[resource];
+  const total = count(layout);
+  const records = [];
+
+  for (let index = Math.max(0, sinceId - base(layout) + 1); index < total && records.length < limit; index++) {
+    const record = at(layout, index);
+    if (!updatedMin || Date.parse(record.updated_at) >= updatedMin) {
+      records.push(record);
+    }
+  }
+  return records;
+}
+
+function countRecords(layout, resource, { updatedMin }) {
+  const { count, at } = RESOURCES[resource];
+  const total = count(layout);
+  if (!updatedMin) return total;
+
+  let matched = 0;
+  for (let index = 0; index < total; index++) {
+    if (Date.parse(at(layout, index).updated_at) >= updatedMin) matched += 1;
+  }
+  return matched;
+}
+
+function createMockShopify(options = {}) {
+  const layout = storeLayout(options);
+  const bucketSize = options.bucket || 40;
+  const latency = options.latency ?? 50;
+  const jitter = options.jitter ?? 20;
+  const errorRate = options.errorRate || 0;
+  const buckets = new Map();
+  const stats = { requests: 0, throttled: 0, errors: 0 };
+
+  const server = http.createServer((req, res) => {
+    const url = new URL(req.url, 'http://localhost');
+    const match = url.pathname.match(/^\/admin\/api\/[^/]+\/(customers|orders|products)(\/count)?\.json$/);
+    stats.requests += 1;
+
+    const send = (status, body, headers = {}) => {
+      setTimeout(() => {
+        res.writeHead(status, { 'Content-Type': 'application/json', ...headers });
+        res.end(JSON.stringify(body));
+      }, latency + Math.random() * jitter);
+    };
+
+    if (!match || req.method !== 'GET') {
+      return send(404, { errors: 'Not Found' });
+    }
+
+    // One bucket per shop; every shop shares the mock's host, so the
+    // access token tells them apart
+    const shop = req.headers['x-shopify-access-token'] || 'default';
+    if (!buckets.has(shop)) buckets.set(shop, new LeakyBucket(bucketSize, options.leak || bucketSize / 20));
+    const bucket = buckets.get(shop);
+
+    if (!bucket.take()) {
+      stats.throttled += 1;
+      return send(429, { errors: 'Exceeded call limit. Reduce request rates to resume uninterrupted service.' }, {
+        'Retry-After': '1.0',
+        'X-Shopify-Shop-Api-Call-Limit': `${bucketSize}/${bucketSize}`
+      });
+    }
+    const callLimit = { 'X-Shopify-Shop-Api-Call-Limit': `${Math.ceil(bucket.level)}/${bucketSize}` };
+
+    if (Math.random() < errorRate) {
+      stats.errors += 1;
+      return send(503, { errors: 'Service Unavailable' }, callLimit);
+    }
+
+    const [, resource, isCount] = match;
+    const updatedMin = url.searchParams.get('updated_at_min') ? Date.parse(url.searchParams.get('updated_at_min')) : null;
+
+    if (isCount) {
+      return send(200, { count: countRecords(layout, resource, { updatedMin }) }, callLimit);
+    }
+
+    const limit = Math.min(MAX_LIMIT, parseInt(url.searchParams.get('limit'), 10) || DEFAULT_LIMIT);
+    const sinceId = parseInt(url.searchParams.get('since_id'), 10) || 0;
+    send(200, { [resource]: listRecords(layout, resource, { limit, sinceId, updatedMin }) }, callLimit);
+  });
+
+  return { server, layout, stats };
+}
+
+if (require.main === module) {
+  const { values } = parseArgs({
+    options: {
+      port: { type: 'string', default: process.env.MOCK_SHOPIFY_PORT || '4010' },
+      records: { type: 'string', default: '10000' },
+      seed: { type: 'string', default: '1' },
+      bucket: { type: 'string', default: '40' },
+      leak: { type: 'string' },
+      latency: { type: 'string', default: '50' },
+      jitter: { type: 'string', default: '20' },
+      'error-rate': { type: 'string', default: '0' }
+    }
+  });
+
+  const { server, layout } = createMockShopify({
+    records: parseInt(values.records, 10),
+    seed: parseInt(values.seed, 10),
+    bucket: parseInt(values.bucket, 10),
+    leak: values.leak ? parseFloat(values.leak) : undefined,
+    latency: parseInt(values.latency, 10),
+    jitter: parseInt(values.jitter, 10),
+    errorRate: parseFloat(values['error-rate'])
+  });
+
+  server.listen(parseInt(values.port, 10), () => {
+    const { port } = server.address();
+    console.log(`Mock Shopify on http://localhost:${port}: ${layout.customers} customers, `
+      + `${layout.orders} orders, ${layout.products} products`);
+    // When forked (scripts/bench_sync.js), report the bound port
+    if (process.send) process.send({ type: 'listening', port });
+  });
+}
+
+module.exports = { createMockShopify, LeakyBucket };
@@ -73,6 +73,7 @@ module.exports = (sequelize, DataTypes) => {
       { fields: ['tenant_id', 'status'] },
       { fields: ['tenant_id', 'date'] },
       { fields: ['tenant_id', 'financial_status'] },
+      { fields: ['tenant_id', 'updated_at'] },
       { unique: true, fields: ['tenant_id', 'shopify_order_id'] }
     ],
     scopes: {
@@ -0,0 +1,60 @@
+module.exports = (sequelize, DataTypes) => {
+  const OrderLineItem = sequelize.define('OrderLineItem', {
+    id: {
+      type: DataTypes.BIGINT,
+      autoIncrement: true,
+      primaryKey: true
+    },
+    tenant_id: {
+      type: DataTypes.STRING,
+      allowNull: false,
+      references: {
+        model: 'tenants',
+        key: 'id'
+      }
+    },
+    shopify_order_id: {
+      type: DataTypes.BIGINT,
+      allowNull: false
+    },
+    shopify_line_item_id: {
+      type: DataTypes.BIGINT,
+      allowNull: false
+    },
+    shopify_product_id: {
+      type: DataTypes.BIGINT,
+      allowNull: true
+    },
+    shopify_variant_id: {
+      type: DataTypes.BIGINT,
+      allowNull: true
+    },
+    quantity: {
+      type: DataTypes.INTEGER,
+      defaultValue: 0
+    },
+    refunded_quantity: {
+      type: DataTypes.INTEGER,
+      defaultValue: 0
+    },
+    price: {
+      type: DataTypes.DECIMAL(10, 2),
+      defaultValue: 0.00
+    },
+    // Line total after discounts and refunds
+    net_revenue: {
+      type: DataTypes.DECIMAL(12, 2),
+      defaultValue: 0.00
+    }
+  }, {
+    tableName: 'order_line_items',
+    timestamps: false,
+    indexes: [
+      { unique: true, fields: ['tenant_id', 'shopify_line_item_id'] },
+      { fields: ['tenant_id', 'shopify_order_id'] },
+      { fields: ['tenant_id', 'shopify_variant_id'] }
+    ]
+  });
+
+  return OrderLineItem;
+};
@@ -1,12 +1,19 @@
 const express = require('express');
 const { Order, Customer } = require('../models');
 const { Op } = require('sequelize');
+const { invalidateOnWrite } = require('../services/metrics_cache');
+const { paginate, PaginationError } = require('../services/pagination');
+const { refreshOrderDays } = require('../services/rollups');
+const { removeOrderLineItems } = require('../services/product_sales');
 const router = express.Router();
 
+// Successful writes invalidate the tenant's cached metrics
+router.use(invalidateOnWrite);
+
 // Get orders
 router.get('/', async (req, res) => {
   try {
-    const { limit, offset, sort, status, from, to } = req.query;
+    const { status, from, to } = req.query;
     
     // Build query options
     const queryOptions = {
@@ -29,33 +36,20 @@ router.get('/', async (req, res) => {
       if (to) queryOptions.where.date[Op.lte] = to;
     }
 
-    // Add pagination
-    if (limit) {
-      queryOptions.limit = parseInt(limit);
-    }
-    if (offset) {
-      queryOptions.offset = parseInt(offset);
-    }
-
-    // Add sorting
-    if (sort) {
-      const [field, direction] = sort.split(':');
-      queryOptions.order = [[field, direction || 'ASC']];
-    } else {
-      queryOptions.order = [['date', 'DESC']];
-    }
-
-    const orders = await Order.findAll(queryOptions);
-    const total = await Order.count({ where: queryOptions.where });
-
-    res.json({
-      data: orders,
-      total,
-      page: offset ? Math.floor(offset / (limit || 10)) + 1 : 1,
-      totalPages: limit ? Math.ceil(total / limit) : 1
+    // Cursor pagination over indexed sort keys
+    const result = await paginate(Order, {
+      ...queryOptions,
+      query: req.query,
+      sortable: ['date'],
+      defaultSort: 'date:DESC'
     });
 
+    res.json(result);
+
   } catch (error) {
+    if (error instanceof PaginationError) {
+      return res.status(400).json({ error: error.message });
+    }
     console.error('Get orders error:', error);
     res.status(500).json({ error: 'Failed to fetch orders' });
   }
@@ -95,6 +89,7 @@ router.post('/', async (req, res) => {
     };
 
     const order = await Order.create(orderData);
+    await refreshOrderDays(req.tenantId, [order.date]);
     res.status(201).json(order);
   } catch (error) {
     console.error('Create order error:', error);
@@ -116,7 +111,9 @@ router.put('/:id', async (req, res) => {
       return res.status(404).json({ error: 'Order not found' });
     }
 
+    const previousDate = order.date;
     await order.update(req.body);
+    await refreshOrderDays(req.tenantId, [previousDate, order.date]);
     res.json(order);
   } catch (error) {
     console.error('Update order error:', error);
@@ -139,6 +136,8 @@ router.delete('/:id', async (req, res) => {
     }
 
     await order.destroy();
+    await refreshOrderDays(req.tenantId, [order.date]);
+    await removeOrderLineItems(req.tenantId, [order.shopify_order_id]);
     res.json({ message: 'Order deleted successfully' });
   } catch (error) {
     console.error('Delete order error:', error);
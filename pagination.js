@@ -0,0 +1,145 @@
+const { Op, QueryTypes } = require('sequelize');
+
+const DEFAULT_LIMIT = 20;
+const MAX_LIMIT = 100;
+
+class PaginationError extends Error {
+    constructor(message) {
+        super(message);
+        this.name = 'PaginationError';
+        this.status = 400;
+    }
+}
+
+// Query params arrive as arrays when repeated (?sort=a&sort=b)
+function stringParam(query, name) {
+    const value = query[name];
+    if (value !== undefined && typeof value !== 'string') {
+        throw new PaginationError(`Invalid ${name}: expected a single value`);
+    }
+    return value;
+}
+
+// Parse "field:direction" against the fields a list route has a
+// (tenant_id, field) index for
+function parseSort(sort, sortable, defaultSort) {
+    const [field, direction = 'DESC'] = (sort || defaultSort).split(':');
+    const dir = direction.toUpperCase();
+
+    if (!sortable.includes(field)) {
+        throw new PaginationError(`Unsupported sort field: ${field}. Supported: ${sortable.join(', ')}`);
+    }
+    if (!['ASC', 'DESC'].includes(dir)) {
+        throw new PaginationError(`Unsupported sort direction: ${direction}`);
+    }
+    return { field, direction: dir };
+}
+
+function encodeCursor(payload) {
+    return Buffer.from(JSON.stringify(payload)).toString('base64url');
+}
+
+function decodeCursor(cursor) {
+    try {
+        const payload = JSON.parse(Buffer.from(cursor, 'base64url').toString());
+        if (!payload || payload.id === undefined || !['next', 'prev'].includes(payload.dir)) {
+            throw new Error('malformed');
+        }
+        return payload;
+    } catch (error) {
+        throw new PaginationError('Invalid cursor');
+    }
+}
+
+// Rows after (or before) the cursor position in (field, id) order
+function keysetCondition(field, ascending, value, id) {
+    const op = ascending ? Op.gt : Op.lt;
+    return {
+        [Op.or]: [
+            { [field]: { [op]: value } },
+            { [field]: value, id: { [op]: id } }
+        ]
+    };
+}
+
+// Row estimate from the optimizer's plan for the list query; costs one
+// EXPLAIN instead of a COUNT over every matching row
+async function estimateCount(model, where) {
+    const sql = model.queryGenerator.selectQuery(
+        model.getTableName(),
+        { attributes: ['id'], where },
+        model
+    );
+    const plan = await model.sequelize.query(`EXPLAIN ${sql.replace(/;\s*$/, '')}`, {
+        type: QueryTypes.SELECT
+    });
+    return plan.length > 0 ? parseInt(plan[0].rows, 10) || 0 : 0;
+}
+
+// Keyset pagination over an indexed sort key with id as tie-breaker.
+// Query params: limit, sort (field:ASC|DESC), cursor (opaque, from a
+// previous response) and count=exact for an exact total.
+async function paginate(model, { where, include, query, sortable, defaultSort }) {
+    const { field, direction } = parseSort(stringParam(query, 'sort'), sortable, defaultSort);
+    const limit = Math.min(Math.max(parseInt(stringParam(query, 'limit'), 10) || DEFAULT_LIMIT, 1), MAX_LIMIT);
+    const cursorParam = stringParam(query, 'cursor');
+    const sortKey = `${field}:${direction}`;
+
+    let ascending = direction === 'ASC';
+    let pageWhere = where;
+    let backwards = false;
+
+    if (cursorParam) {
+        const cursor = decodeCursor(cursorParam);
+        if (cursor.sort !== sortKey) {
+            throw new PaginationError('Cursor does not match the requested sort');
+        }
+        // Walking backwards flips the comparison and order, then the page
+        // is reversed back into display order
+        backwards = cursor.dir === 'prev';
+        if (backwards) ascending = !ascending;
+        pageWhere = { [Op.and]: [where, keysetCondition(field, ascending, cursor.value, cursor.id)] };
+    }
+
+    const order = ascending ? 'ASC' : 'DESC';
+    const rows = await model.findAll({
+        where: pageWhere,
+        include,
+        order: [[field, order], ['id', order]],
+        limit: limit + 1
+    });
+
+    const hasMore = rows.length > limit;
+    const page = rows.slice(0, limit);
+    if (backwards) page.reverse();
+
+    const cursorFor = (row, dir) => (row ? encodeCursor({
+        sort: sortKey,
+        value: row.get(field),
+        id: row.id,
+        dir
+    }) : null);
+    const first = page[0];
+    const last = page[page.length - 1];
+
+    const hasNext = backwards ? !!cursorParam : hasMore;
+    const hasPrev = backwards ? hasMore : !!cursorParam;
+
+    const response = {
+        data: page,
+        limit,
+        sort: sortKey,
+        nextCursor: hasNext ? cursorFor(last, 'next') : null,
+        prevCursor: hasPrev ? cursorFor(first, 'prev') : null
+    };
+
+    if (query.count === 'exact') {
+        response.total = await model.count({ where });
+    } else {
+        response.estimatedTotal = await estimateCount(model, where);
+    }
+
+    return response;
+}
+
+module.exports = { paginate, parseSort, encodeCursor, decodeCursor, PaginationError };
@@ -0,0 +1,165 @@
+const os = require('os');
+const path = require('path');
+const { Worker } = require('worker_threads');
+
+const BCRYPT_COST = parseInt(process.env.BCRYPT_COST, 10) || 10;
+const POOL_SIZE = parseInt(process.env.BCRYPT_POOL_SIZE, 10)
+    || Math.max(1, Math.min(4, os.cpus().length - 1));
+// Jobs allowed to wait for a worker before new ones are refused
+const MAX_QUEUE = parseInt(process.env.BCRYPT_MAX_QUEUE, 10) || 200;
+
+class PasswordHasherBusyError extends Error {
+    constructor() {
+        super('Password hashing queue is full');
+        this.name = 'PasswordHasherBusyError';
+        this.status = 503;
+    }
+}
+
+// Fixed pool of worker threads running bcrypt. Jobs queue FIFO when every
+// worker is busy; past maxQueue they are refused so a login storm sheds
+// load instead of piling up unbounded latency.
+class PasswordHasher {
+    constructor({ size = POOL_SIZE, maxQueue = MAX_QUEUE, cost = BCRYPT_COST } = {}) {
+        this.size = size;
+        this.maxQueue = maxQueue;
+        this.cost = cost;
+        this.workers = [];
+        this.idle = [];
+        this.queue = [];
+        this.jobs = new Map();
+        this.nextId = 1;
+        this.closing = false;
+        this.stats = { completed: 0, failed: 0, refused: 0, maxQueueDepth: 0, waitMs: 0, runMs: 0 };
+    }
+
+    hash(password) {
+        return this.submit({ op: 'hash', password, cost: this.cost });
+    }
+
+    compare(password, hash) {
+        return this.submit({ op: 'compare', password, hash });
+    }
+
+    // Cost factor of an existing bcrypt hash ($2a$10$...)
+    costOf(hash) {
+        const match = /^\$2[abxy]?\$(\d{2})\$/.exec(hash || '');
+        return match ? parseInt(match[1], 10) : null;
+    }
+
+    needsRehash(hash) {
+        return this.costOf(hash) !== this.cost;
+    }
+
+    submit(message) {
+        this.start();
+        if (this.idle.length === 0 && this.queue.length >= this.maxQueue) {
+            this.stats.refused += 1;
+            return Promise.reject(new PasswordHasherBusyError());
+        }
+
+        return new Promise((resolve, reject) => {
+            const job = { id: this.nextId++, message, resolve, reject, queuedAt: Date.now() };
+            this.queue.push(job);
+            this.stats.maxQueueDepth = Math.max(this.stats.maxQueueDepth, this.queue.length);
+            this.dispatch();
+        });
+    }
+
+    // Workers start on first use, so scripts that never hash don't pay
+    // for them. Idle workers are unref'd and don't keep the process alive.
+    start() {
+        while (this.workers.length < this.size) {
+            this.spawn();
+        }
+    }
+
+    spawn() {
+        const worker = new Worker(path.join(__dirname, 'password_worker.js'));
+        worker.unref();
+        worker.job = null;
+
+        worker.on('message', ({ id, result, error }) => {
+            const job = this.jobs.get(id);
+            this.jobs.delete(id);
+            worker.job = null;
+            worker.unref();
+            this.idle.push(worker);
+
+            if (job) {
+                this.stats.runMs += Date.now() - job.startedAt;
+                if (error) {
+                    this.stats.failed += 1;
+                    job.reject(new Error(error));
+                } else {
+                    this.stats.completed += 1;
+                    job.resolve(result);
+                }
+            }
+            this.dispatch();
+        });
+
+        // A dead worker fails its job and is replaced
+        worker.on('error', (error) => this.replace(worker, error));
+        worker.on('exit', (code) => {
+            if (code !== 0) this.replace(worker, new Error(`Password worker exited with code ${code}`));
+        });
+
+        this.workers.push(worker);
+        this.idle.push(worker);
+    }
+
+    replace(worker, error) {
+        if (this.closing || !this.workers.includes(worker)) return;
+        this.workers = this.workers.filter(w => w !== worker);
+        this.idle = this.idle.filter(w => w !== worker);
+
+        if (worker.job) {
+            this.jobs.delete(worker.job.id);
+            this.stats.failed += 1;
+            worker.job.reject(error);
+        }
+        this.spawn();
+        this.dispatch();
+    }
+
+    dispatch() {
+        while (this.idle.length > 0 && this.queue.length > 0) {
+            const worker = this.idle.pop();
+            const job = this.queue.shift();
+            job.startedAt = Date.now();
+            this.stats.waitMs += job.startedAt - job.queuedAt;
+            this.jobs.set(job.id, job);
+            worker.job = job;
+            worker.ref();
+            worker.postMessage({ id: job.id, ...job.message });
+        }
+    }
+
+    getStats() {
+        const done = this.stats.completed + this.stats.failed;
+        return {
+            size: this.size,
+            cost: this.cost,
+            busy: this.workers.length - this.idle.length,
+            queueDepth: this.queue.length,
+            maxQueueDepth: this.stats.maxQueueDepth,
+            completed: this.stats.completed,
+            failed: this.stats.failed,
+            refused: this.stats.refused,
+            avgWaitMs: done > 0 ? Math.round(this.stats.waitMs / done) : 0,
+            avgRunMs: done > 0 ? Math.round(this.stats.runMs / done) : 0
+        };
+    }
+
+    async close() {
+        this.closing = true;
+        await Promise.all(this.workers.map(worker => worker.terminate()));
+        this.workers = [];
+        this.idle = [];
+    }
+}
+
+const passwordHasher = new PasswordHasher();
+
+module.exports = { passwordHasher, PasswordHasher, PasswordHasherBusyError, BCRYPT_COST };
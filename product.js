@@ -17,6 +17,10 @@ module.exports = (sequelize, DataTypes) => {
       type: DataTypes.BIGINT,
       allowNull: true
     },
+    shopify_variant_id: {
+      type: DataTypes.BIGINT,
+      allowNull: true
+    },
     name: {
       type: DataTypes.STRING,
       allowNull: false
@@ -33,10 +37,15 @@ module.exports = (sequelize, DataTypes) => {
       type: DataTypes.INTEGER,
       defaultValue: 0
     },
+    // Units sold and net revenue, maintained from order line items
     sales: {
       type: DataTypes.INTEGER,
       defaultValue: 0
     },
+    revenue: {
+      type: DataTypes.DECIMAL(14, 2),
+      defaultValue: 0.00
+    },
     sku: {
       type: DataTypes.STRING,
       allowNull: true
@@ -64,7 +73,10 @@ module.exports = (sequelize, DataTypes) => {
       { fields: ['tenant_id', 'category'] },
       { fields: ['tenant_id', 'status'] },
       { fields: ['tenant_id', 'sales'] },
-      { unique: true, fields: ['tenant_id', 'shopify_product_id'] }
+      { fields: ['tenant_id', 'revenue'] },
+      // Sales counters are updated by variant (product_sales.js)
+      { fields: ['tenant_id', 'shopify_variant_id'] },
+      { unique: true, fields: ['tenant_id', 'shopify_product_id', 'shopify_variant_id'] }
     ],
     scopes: {
       byTenant: (tenantId) => ({
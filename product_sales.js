@@ -0,0 +1,174 @@
+const { Op } = require('sequelize');
+const { OrderLineItem, Product, sequelize } = require('../models');
+
+// Units and net revenue (in cents, so deltas don't drift) a line item
+// counts towards its variant's sales
+function contribution(item) {
+    return {
+        units: (item.quantity || 0) - (item.refunded_quantity || 0),
+        cents: Math.round(parseFloat(item.net_revenue || 0) * 100)
+    };
+}
+
+function addDelta(deltas, variantId, sign, item) {
+    if (variantId === null || variantId === undefined) return;
+    const { units, cents } = contribution(item);
+    const delta = deltas.get(String(variantId)) || { units: 0, cents: 0 };
+    delta.units += sign * units;
+    delta.cents += sign * cents;
+    deltas.set(String(variantId), delta);
+}
+
+// Add per-variant deltas to products.sales / products.revenue in one
+// UPDATE joined against a derived table of the deltas
+async function applyDeltas(tenantId, deltas, transaction) {
+    const changed = [...deltas.entries()].filter(([, d]) => d.units !== 0 || d.cents !== 0);
+    if (changed.length === 0) return;
+
+    // Variant ids bound as numbers, so the join against the BIGINT column
+    // uses the (tenant_id, shopify_variant_id) index without conversion
+    const replacements = { tenantId };
+    const rows = changed.map(([variantId, delta], i) => {
+        replacements[`v${i}`] = Number(variantId);
+        replacements[`u${i}`] = delta.units;
+        replacements[`r${i}`] = delta.cents / 100;
+        return `SELECT :v${i} AS variant_id, :u${i} AS units, :r${i} AS revenue`;
+    });
+
+    await sequelize.query(`
+        UPDATE products p
+        JOIN (${rows.join(' UNION ALL ')}) d ON p.shopify_variant_id = d.variant_id
+        SET p.sales = p.sales + d.units, p.revenue = p.revenue + d.revenue
+        WHERE p.tenant_id = :tenantId`, {
+        replacements,
+        transaction
+    });
+}
+
+// Replace the stored line items of upserted orders and move each
+// variant's counters by the difference between the old and new items.
+// Refunds and edits arrive as order updates, so they net out here too.
+async function upsertOrderLineItems(tenantId, orders, transaction) {
+    const withItems = orders.filter(order => Array.isArray(order.line_items));
+    if (withItems.length === 0) return;
+
+    const orderIds = withItems.map(order => order.shopify_order_id);
+    const deltas = new Map();
+
+    // Locked so concurrent writers of the same orders (sync and webhooks)
+    // apply their deltas one after another
+    const previous = await OrderLineItem.findAll({
+        attributes: ['shopify_variant_id', 'quantity', 'refunded_quantity', 'net_revenue'],
+        where: { tenant_id: tenantId, shopify_order_id: orderIds },
+        lock: transaction ? transaction.LOCK.UPDATE : undefined,
+        raw: true,
+        transaction
+    });
+    for (const item of previous) {
+        addDelta(deltas, item.shopify_variant_id, -1, item);
+    }
+
+    await OrderLineItem.destroy({
+        where: { tenant_id: tenantId, shopify_order_id: orderIds },
+        transaction
+    });
+
+    const rows = [];
+    for (const order of withItems) {
+        for (const item of order.line_items) {
+            rows.push({ ...item, tenant_id: tenantId, shopify_order_id: order.shopify_order_id });
+            addDelta(deltas, item.shopify_variant_id, 1, item);
+        }
+    }
+    if (rows.length > 0) {
+        await OrderLineItem.bulkCreate(rows, { transaction, validate: false, hooks: false });
+    }
+
+    await applyDeltas(tenantId, deltas, transaction);
+}
+
+// Take deleted orders' line items out of the counters
+async function removeOrderLineItems(tenantId, shopifyOrderIds, transaction) {
+    const ids = shopifyOrderIds.filter(id => id !== null && id !== undefined);
+    if (ids.length === 0) return;
+    await upsertOrderLineItems(tenantId, ids.map(id => ({ shopify_order_id: id, line_items: [] })), transaction);
+}
+
+// Variants synced after their orders start at zero; fill in their counters
+// from the line items already stored. Variants that already have sales
+// are kept current by the order deltas and are skipped.
+async function backfillVariants(tenantId, variantIds, transaction) {
+    const ids = variantIds.filter(id => id !== null && id !== undefined);
+    if (ids.length === 0) return;
+
+    const fresh = await Product.findAll({
+        attributes: ['shopify_variant_id'],
+        where: { tenant_id: tenantId, shopify_variant_id: ids, sales: 0, revenue: 0 },
+        raw: true,
+        transaction
+    });
+    if (fresh.length === 0) return;
+
+    const totals = await OrderLineItem.findAll({
+        attributes: [
+            'shopify_variant_id',
+            [sequelize.literal('SUM(quantity - refunded_quantity)'), 'quantity'],
+            [sequelize.fn('SUM', sequelize.col('net_revenue')), 'net_revenue']
+        ],
+        where: {
+            tenant_id: tenantId,
+            shopify_variant_id: { [Op.in]: fresh.map(row => row.shopify_variant_id) }
+        },
+        group: ['shopify_variant_id'],
+        raw: true,
+        transaction
+    });
+
+    const deltas = new Map();
+    for (const total of totals) {
+        addDelta(deltas, total.shopify_variant_id, 1, total);
+    }
+    await applyDeltas(tenantId, deltas, transaction);
+}
+
+// SyncWriter hook keeping line items and product counters current
+async function salesHook(tenantId, entity, chunk, transaction) {
+    if (entity === 'orders') {
+        await upsertOrderLineItems(tenantId, chunk, transaction);
+    } else if (entity === 'products') {
+        await backfillVariants(tenantId, chunk.map(row => row.shopify_variant_id), transaction);
+    }
+}
+
+// Recompute every product counter of a tenant from its line items
+async function rebuildProductSales(tenantId) {
+    await sequelize.transaction(async (transaction) => {
+        await Product.update(
+            { sales: 0, revenue: 0 },
+            { where: { tenant_id: tenantId }, transaction }
+        );
+
+        await sequelize.query(`
+            UPDATE products p
+            JOIN (
+                SELECT shopify_variant_id,
+                    SUM(quantity - refunded_quantity) AS units,
+                    SUM(net_revenue) AS revenue
+                FROM order_line_items
+                WHERE tenant_id = :tenantId AND shopify_variant_id IS NOT NULL
+                GROUP BY shopify_variant_id
+            ) t ON p.shopify_variant_id = t.shopify_variant_id
+            SET p.sales = t.units, p.revenue = t.revenue
+            WHERE p.tenant_id = :tenantId`, {
+            replacements: { tenantId },
+            transaction
+        });
+    });
+}
+
+module.exports = {
+    salesHook,
+    upsertOrderLineItems,
+    removeOrderLineItems,
+    rebuildProductSales
+};
@@ -1,26 +1,24 @@
 const express = require('express');
 const { Product } = require('../models');
 const { Op } = require('sequelize');
+const { invalidateOnWrite } = require('../services/metrics_cache');
+const { paginate, PaginationError } = require('../services/pagination');
+const searchIndex = require('../services/search');
 const router = express.Router();
 
+// Successful writes invalidate the tenant's cached metrics
+router.use(invalidateOnWrite);
+
 // Get products
 router.get('/', async (req, res) => {
   try {
-    const { limit, offset, sort, category, search, status } = req.query;
+    const { category, search, status } = req.query;
     
     // Build query options
     const queryOptions = {
       where: { tenant_id: req.tenantId }
     };
 
-    // Add search filter
-    if (search) {
-      queryOptions.where[Op.or] = [
-        { name: { [Op.like]: `%${search}%` } },
-        { category: { [Op.like]: `%${search}%` } }
-      ];
-    }
-
     // Add category filter
     if (category) {
       queryOptions.where.category = category;
@@ -31,33 +29,29 @@ router.get('/', async (req, res) => {
       queryOptions.where.status = status;
     }
 
-    // Add pagination
-    if (limit) {
-      queryOptions.limit = parseInt(limit);
-    }
-    if (offset) {
-      queryOptions.offset = parseInt(offset);
-    }
-
-    // Add sorting
-    if (sort) {
-      const [field, direction] = sort.split(':');
-      queryOptions.order = [[field, direction || 'ASC']];
-    } else {
-      queryOptions.order = [['sales', 'DESC']];
+    // Search goes through the token index and is ordered by relevance
+    if (search) {
+      const data = await searchIndex.search(req.tenantId, 'products', search, {
+        where: queryOptions.where,
+        limit: Math.min(parseInt(req.query.limit, 10) || 20, 100)
+      });
+      return res.json({ data, limit: data.length, sort: 'relevance', nextCursor: null, prevCursor: null });
     }
 
-    const products = await Product.findAll(queryOptions);
-    const total = await Product.count({ where: queryOptions.where });
-
-    res.json({
-      data: products,
-      total,
-      page: offset ? Math.floor(offset / (limit || 10)) + 1 : 1,
-      totalPages: limit ? Math.ceil(total / limit) : 1
+    // Cursor pagination over indexed sort keys
+    const result = await paginate(Product, {
+      ...queryOptions,
+      query: req.query,
+      sortable: ['sales'],
+      defaultSort: 'sales:DESC'
     });
 
+    res.json(result);
+
   } catch (error) {
+    if (error instanceof PaginationError) {
+      return res.status(400).json({ error: error.message });
+    }
     console.error('Get products error:', error);
     res.status(500).json({ error: 'Failed to fetch products' });
   }
@@ -93,6 +87,7 @@ router.post('/', async (req, res) => {
     };
 
     const product = await Product.create(productData);
+    await searchIndex.indexRecords(req.tenantId, 'products', [product]);
     res.status(201).json(product);
   } catch (error) {
     console.error('Create product error:', error);
@@ -115,6 +110,7 @@ router.put('/:id', async (req, res) => {
     }
 
     await product.update(req.body);
+    await searchIndex.indexRecords(req.tenantId, 'products', [product]);
     res.json(product);
   } catch (error) {
     console.error('Update product error:', error);
@@ -137,6 +133,7 @@ router.delete('/:id', async (req, res) => {
     }
 
     await product.destroy();
+    await searchIndex.removeRecords(req.tenantId, 'products', [product.id]);
     res.json({ message: 'Product deleted successfully' });
   } catch (error) {
     console.error('Delete product error:', error);
@@ -0,0 +1,271 @@
+const { Op } = require('sequelize');
+const { RateLimitBucket, sequelize } = require('../models');
+const { LruTtlCache } = require('./lru_cache');
+
+const env = (name, fallback) => parseFloat(process.env[name]) || fallback;
+
+// Bucket sizes (burst) and refill rates (tokens/second) per scope
+const LIMITS = {
+    tenant: {
+        capacity: env('RATE_LIMIT_TENANT_CAPACITY', 600),
+        rate: env('RATE_LIMIT_TENANT_RATE', 10)
+    },
+    user: {
+        capacity: env('RATE_LIMIT_USER_CAPACITY', 300),
+        rate: env('RATE_LIMIT_USER_RATE', 5)
+    },
+    ip: {
+        capacity: env('RATE_LIMIT_IP_CAPACITY', 60),
+        rate: env('RATE_LIMIT_IP_RATE', 1)
+    }
+};
+
+// Tokens a request costs, roughly in proportion to the database work
+// behind it. First match wins; paths have the tenant id segment.
+const ROUTE_COSTS = [
+    { method: 'POST', pattern: /^\/api\/shopify\/sync\//, cost: 50 },
+    { method: '*', pattern: /^\/api\/auth\//, cost: 5 },
+    { method: 'GET', pattern: /^\/api\/[^/]+\/metrics\/?$/, cost: 10 },
+    { method: 'GET', pattern: /^\/api\/[^/]+\/metrics\//, cost: 8 },
+    { method: 'GET', pattern: /^\/api\/[^/]+\/(customers|orders|products)\/?$/, cost: 2 }
+];
+const SEARCH_COST = 2;
+const READ_COST = 1;
+const WRITE_COST = 3;
+
+// Full buckets are deleted from the shared table on this interval (a
+// missing row reads as a full bucket)
+const PRUNE_INTERVAL_MS = 10 * 60 * 1000;
+const PRUNE_BATCH_SIZE = 10000;
+
+function requestCost(req) {
+    const path = req.originalUrl.split('?')[0];
+    const route = ROUTE_COSTS.find(r => (r.method === '*' || r.method === req.method) && r.pattern.test(path));
+    const base = route ? route.cost : (req.method === 'GET' ? READ_COST : WRITE_COST);
+    return base + (req.query && req.query.search ? SEARCH_COST : 0);
+}
+
+// Refill a bucket up to now and try to take cost tokens from it, or
+// failing that at least minimum tokens (granted says how many were taken)
+function consume(state, now, cost, { capacity, rate }, minimum = cost) {
+    const elapsed = state ? Math.max(0, now - state.refilledAt) / 1000 : 0;
+    const tokens = state ? Math.min(capacity, state.tokens + elapsed * rate) : capacity;
+    const granted = tokens >= cost ? cost : tokens >= minimum ? minimum : 0;
+    const allowed = granted > 0;
+    const left = tokens - granted;
+
+    return {
+        state: { tokens: left, refilledAt: now },
+        allowed,
+        granted,
+        remaining: Math.floor(left),
+        // Seconds until the bucket is full again / until cost fits
+        resetSec: Math.ceil((capacity - left) / rate),
+        retryAfterSec: allowed ? 0 : Math.ceil((minimum - left) / rate)
+    };
+}
+
+// Buckets in process memory; only correct for a single process
+class MemoryStore {
+    constructor() {
+        this.buckets = new LruTtlCache({ max: 100000, ttlMs: 60 * 60 * 1000 });
+    }
+
+    async take(key, cost, limits, minimum = cost) {
+        const result = consume(this.buckets.get(key), Date.now(), cost, limits, minimum);
+        this.buckets.set(key, result.state);
+        return result;
+    }
+}
+
+// Buckets in the rate_limit_buckets table, shared by every process. Each
+// take is one row-locked read-modify-write; a denied take writes nothing,
+// since the refilled state is implied by the stored one.
+class SqlStore {
+    async take(key, cost, limits, minimum = cost) {
+        return sequelize.transaction(async (transaction) => {
+            const row = await RateLimitBucket.findByPk(key, {
+                lock: transaction.LOCK.UPDATE,
+                raw: true,
+                transaction
+            });
+            const state = row ? { tokens: row.tokens, refilledAt: Number(row.refilled_at) } : null;
+            const result = consume(state, Date.now(), cost, limits, minimum);
+            if (!result.allowed) return result;
+
+            await RateLimitBucket.upsert({
+                bucket_key: key,
+                tokens: result.state.tokens,
+                refilled_at: result.state.refilledAt
+            }, { transaction });
+            return result;
+        });
+    }
+}
+
+// Takes tokens from the shared store in leases of a few percent of the
+// bucket, and serves requests from the local lease until it runs out, so
+// most requests cost no database round trip. The global limit can be
+// exceeded by at most one lease per process.
+class LeasedStore {
+    constructor(store, { leaseFraction = 0.05 } = {}) {
+        this.store = store;
+        this.leaseFraction = leaseFraction;
+        this.leases = new LruTtlCache({ max: 100000, ttlMs: 60 * 1000 });
+    }
+
+    async take(key, cost, limits) {
+        const now = Date.now();
+        const lease = this.leases.get(key);
+        if (lease && lease.tokens >= cost) {
+            lease.tokens -= cost;
+            return { ...lease.last, allowed: true, remaining: lease.last.remaining + Math.floor(lease.tokens) };
+        }
+        // Denied recently: keep denying locally until Retry-After passes
+        if (lease && lease.blockedUntil > now) {
+            return { ...lease.last, retryAfterSec: Math.ceil((lease.blockedUntil - now) / 1000) };
+        }
+
+        // A full lease if the bucket has it, else just this request's cost,
+        // in one round trip
+        const size = Math.max(cost, Math.ceil(limits.capacity * this.leaseFraction));
+        const result = await this.store.take(key, size, limits, cost);
+        if (!result.allowed) {
+            this.leases.set(key, {
+                tokens: lease ? lease.tokens : 0,
+                last: result,
+                blockedUntil: now + result.retryAfterSec * 1000
+            });
+            return result;
+        }
+
+        const leftover = (lease ? lease.tokens : 0) + result.granted - cost;
+        this.leases.set(key, { tokens: leftover, last: result });
+        return { ...result, remaining: result.remaining + Math.floor(leftover) };
+    }
+}
+
+const STORE_KIND = process.env.RATE_LIMIT_STORE
+    || (process.env.NODE_ENV === 'production' ? 'sql' : 'memory');
+
+function createStore(kind = STORE_KIND) {
+    return kind === 'sql' ? new LeasedStore(new SqlStore()) : new MemoryStore();
+}
+
+const store = createStore();
+
+// Delete shared bucket rows that are back to full capacity. A row not
+// refilled for as long as an empty bucket takes to fill is certainly full,
+// which keeps the condition a range scan on refilled_at.
+async function pruneBuckets(now = Date.now()) {
+    let deleted = 0;
+    for (const [scope, { capacity, rate }] of Object.entries(LIMITS)) {
+        const fullBefore = now - Math.ceil((capacity / rate) * 1000);
+        while (true) {
+            const count = await RateLimitBucket.destroy({
+                where: {
+                    bucket_key: { [Op.startsWith]: `${scope}:` },
+                    refilled_at: { [Op.lt]: fullBefore }
+                },
+                limit: PRUNE_BATCH_SIZE
+            });
+            deleted += count;
+            if (count < PRUNE_BATCH_SIZE) break;
+        }
+    }
+    return deleted;
+}
+
+// Periodic pruning; run on the leader only, like the other background jobs
+class BucketPruner {
+    constructor({ interval = PRUNE_INTERVAL_MS } = {}) {
+        this.interval = interval;
+        this.timer = null;
+    }
+
+    start() {
+        if (STORE_KIND !== 'sql') return;
+        this.timer = setInterval(() => {
+            pruneBuckets()
+                .then(deleted => deleted > 0 && console.log(`Pruned ${deleted} full rate limit buckets`))
+                .catch(error => console.error('Rate limit bucket pruning failed:', error.message));
+        }, this.interval);
+        this.timer.unref();
+    }
+
+    stop() {
+        clearInterval(this.timer);
+        this.timer = null;
+    }
+}
+const stats = { allowed: 0, limited: 0, storeErrors: 0 };
+
+// Buckets a request draws from: the tenant's (so one tenant can't starve
+// the others) and the user's, or the client IP's before authentication
+function bucketsFor(req) {
+    const buckets = [];
+    if (req.tenantId) buckets.push({ key: `tenant:${req.tenantId}`, limits: LIMITS.tenant });
+    if (req.user) buckets.push({ key: `user:${req.user.id}`, limits: LIMITS.user });
+    if (buckets.length === 0) buckets.push({ key: `ip:${req.ip}`, limits: LIMITS.ip });
+    return buckets;
+}
+
+// Token-bucket limiter charging each request its route cost. Sets
+// RateLimit-* headers for the tightest bucket; answers 429 with
+// Retry-After when any bucket can't cover the cost. Store failures let
+// the request through.
+async function limitRequests(req, res, next) {
+    const cost = requestCost(req);
+    let results;
+    try {
+        results = await Promise.all(bucketsFor(req).map(async bucket => ({
+            ...bucket,
+            result: await store.take(bucket.key, cost, bucket.limits)
+        })));
+    } catch (error) {
+        stats.storeErrors += 1;
+        console.error('Rate limit store error:', error.message);
+        return next();
+    }
+
+    const denied = results.find(r => !r.result.allowed);
+    const tightest = denied || results.reduce((a, b) => (
+        b.result.remaining / b.limits.capacity < a.result.remaining / a.limits.capacity ? b : a
+    ));
+
+    res.set({
+        'RateLimit-Limit': String(tightest.limits.capacity),
+        'RateLimit-Remaining': String(tightest.result.remaining),
+        'RateLimit-Reset': String(tightest.result.resetSec),
+        'RateLimit-Cost': String(cost)
+    });
+
+    if (denied) {
+        stats.limited += 1;
+        res.set('Retry-After', String(denied.result.retryAfterSec));
+        return res.status(429).json({
+            error: 'Too many requests, please try again later.',
+            retryAfter: denied.result.retryAfterSec
+        });
+    }
+
+    stats.allowed += 1;
+    next();
+}
+
+function getRateLimitStats() {
+    return { store: store.constructor.name, ...stats };
+}
+
+module.exports = {
+    limitRequests,
+    requestCost,
+    consume,
+    MemoryStore,
+    SqlStore,
+    LeasedStore,
+    pruneBuckets,
+    BucketPruner,
+    getRateLimitStats,
+    LIMITS
+};
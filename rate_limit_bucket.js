@@ -0,0 +1,27 @@
+module.exports = (sequelize, DataTypes) => {
+  const RateLimitBucket = sequelize.define('RateLimitBucket', {
+    // e.g. "tenant:acme" or "user:42"
+    bucket_key: {
+      type: DataTypes.STRING(191),
+      primaryKey: true
+    },
+    tokens: {
+      type: DataTypes.DOUBLE,
+      allowNull: false
+    },
+    // Epoch milliseconds of the last refill
+    refilled_at: {
+      type: DataTypes.BIGINT,
+      allowNull: false
+    }
+  }, {
+    tableName: 'rate_limit_buckets',
+    timestamps: false,
+    indexes: [
+      // Pruning of full buckets (services/rate_limit.js)
+      { fields: ['refilled_at'] }
+    ]
+  });
+
+  return RateLimitBucket;
+};
@@ -0,0 +1,27 @@
+// Rebuild daily rollups from the orders and customers tables, and product
+// sales counters from order line items.
+// Usage: node scripts/rebuild_rollups.js [tenantId ...]
+const { sequelize, Tenant } = require('../models');
+const { rebuildRollups } = require('../services/rollups');
+const { rebuildProductSales } = require('../services/product_sales');
+
+(async () => {
+  try {
+    const tenantIds = process.argv.slice(2).length > 0
+      ? process.argv.slice(2)
+      : (await Tenant.findAll({ attributes: ['id'], raw: true })).map(t => t.id);
+
+    for (const tenantId of tenantIds) {
+      const started = Date.now();
+      await rebuildRollups(tenantId);
+      await rebuildProductSales(tenantId);
+      console.log(`Rebuilt rollups for ${tenantId} in ${Date.now() - started}ms`);
+    }
+
+    await sequelize.close();
+    process.exit(0);
+  } catch (err) {
+    console.error(err);
+    process.exit(1);
+  }
+})();
@@ -0,0 +1,24 @@
+// Rebuild the customer and product search index from the base tables.
+// Usage: node scripts/rebuild_search.js [tenantId ...]
+const { sequelize, Tenant } = require('../models');
+const { rebuildSearchIndex } = require('../services/search');
+
+(async () => {
+  try {
+    const tenantIds = process.argv.slice(2).length > 0
+      ? process.argv.slice(2)
+      : (await Tenant.findAll({ attributes: ['id'], raw: true })).map(t => t.id);
+
+    for (const tenantId of tenantIds) {
+      const started = Date.now();
+      const indexed = await rebuildSearchIndex(tenantId);
+      console.log(`Indexed ${indexed} records for ${tenantId} in ${Date.now() - started}ms`);
+    }
+
+    await sequelize.close();
+    process.exit(0);
+  } catch (err) {
+    console.error(err);
+    process.exit(1);
+  }
+})();
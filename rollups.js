@@ -0,0 +1,136 @@
+const moment = require('moment');
+const { DailyRollup, sequelize } = require('../models');
+
+const ORDER_COLUMNS = [
+    'orders_count',
+    'revenue',
+    'fulfilled_count',
+    'processing_count',
+    'pending_count',
+    'cancelled_count'
+];
+
+const ORDER_AGGREGATES = `
+    COUNT(*),
+    COALESCE(SUM(amount), 0),
+    SUM(status = 'Fulfilled'),
+    SUM(status = 'Processing'),
+    SUM(status = 'Pending'),
+    SUM(status = 'Cancelled')`;
+
+// Day key for an order row, formatted the way Sequelize stores DATEONLY
+function orderDay(date) {
+    return moment(date).format('YYYY-MM-DD');
+}
+
+// Recompute the order aggregates of the given days from the orders table.
+// Recomputing (instead of applying deltas) keeps rollups correct when
+// upserts change the amount or status of orders already counted.
+async function refreshOrderDays(tenantId, days, transaction) {
+    const unique = [...new Set(days.filter(Boolean).map(orderDay))];
+    if (unique.length === 0) return;
+
+    // Days whose orders were all deleted or moved produce no group below
+    await DailyRollup.update(
+        Object.fromEntries(ORDER_COLUMNS.map(column => [column, 0])),
+        { where: { tenant_id: tenantId, day: unique }, transaction }
+    );
+
+    await sequelize.query(`
+        INSERT INTO daily_rollups (tenant_id, day, ${ORDER_COLUMNS.join(', ')}, created_at, updated_at)
+        SELECT tenant_id, date, ${ORDER_AGGREGATES}, NOW(), NOW()
+        FROM orders
+        WHERE tenant_id = :tenantId AND date IN (:days)
+        GROUP BY tenant_id, date
+        ON DUPLICATE KEY UPDATE
+            ${ORDER_COLUMNS.map(column => `${column} = VALUES(${column})`).join(', ')},
+            updated_at = NOW()`, {
+        replacements: { tenantId, days: unique },
+        transaction
+    });
+}
+
+// A customer counts as new on the day it was created in Shopify; rows
+// created locally (or synced before shopify_created_at existed) fall back
+// to the row's own created_at
+const CUSTOMER_SINCE = 'COALESCE(shopify_created_at, created_at)';
+
+// Recompute new-customer counts for the given UTC days
+async function refreshCustomerDays(tenantId, days, transaction) {
+    const unique = [...new Set(days.filter(Boolean).map(day => moment.utc(day).format('YYYY-MM-DD')))].sort();
+    if (unique.length === 0) return;
+
+    // Days whose customers were all deleted produce no group below
+    await DailyRollup.update(
+        { new_customers: 0 },
+        { where: { tenant_id: tenantId, day: unique }, transaction }
+    );
+
+    // The ranges keep the scan on the (tenant_id, shopify_created_at) and
+    // (tenant_id, created_at) indexes
+    const start = moment.utc(unique[0]).startOf('day').toDate();
+    const end = moment.utc(unique[unique.length - 1]).startOf('day').add(1, 'day').toDate();
+    await sequelize.query(`
+        INSERT INTO daily_rollups (tenant_id, day, new_customers, created_at, updated_at)
+        SELECT tenant_id, DATE(${CUSTOMER_SINCE}) AS since, COUNT(*), NOW(), NOW()
+        FROM customers
+        WHERE tenant_id = :tenantId
+            AND ((shopify_created_at >= :start AND shopify_created_at < :end)
+                OR (shopify_created_at IS NULL AND created_at >= :start AND created_at < :end))
+            AND DATE(${CUSTOMER_SINCE}) IN (:days)
+        GROUP BY tenant_id, since
+        ON DUPLICATE KEY UPDATE new_customers = VALUES(new_customers), updated_at = NOW()`, {
+        replacements: { tenantId, start, end, days: unique },
+        transaction
+    });
+}
+
+// Day a customer row counts as new on
+function customerDay(customer) {
+    return moment.utc(customer.shopify_created_at || customer.created_at || new Date()).format('YYYY-MM-DD');
+}
+
+// SyncWriter hook keeping rollups current as sync chunks land
+async function rollupHook(tenantId, entity, chunk, transaction) {
+    if (entity === 'orders') {
+        await refreshOrderDays(tenantId, chunk.map(row => row.date), transaction);
+    } else if (entity === 'customers') {
+        await refreshCustomerDays(tenantId, chunk.map(customerDay), transaction);
+    }
+}
+
+// Rebuild every rollup row of a tenant from the base tables
+async function rebuildRollups(tenantId) {
+    await sequelize.transaction(async (transaction) => {
+        await DailyRollup.destroy({ where: { tenant_id: tenantId }, transaction });
+
+        await sequelize.query(`
+            INSERT INTO daily_rollups (tenant_id, day, ${ORDER_COLUMNS.join(', ')}, created_at, updated_at)
+            SELECT tenant_id, date, ${ORDER_AGGREGATES}, NOW(), NOW()
+            FROM orders
+            WHERE tenant_id = :tenantId
+            GROUP BY tenant_id, date`, {
+            replacements: { tenantId },
+            transaction
+        });
+
+        await sequelize.query(`
+            INSERT INTO daily_rollups (tenant_id, day, new_customers, created_at, updated_at)
+            SELECT tenant_id, DATE(${CUSTOMER_SINCE}) AS since, COUNT(*), NOW(), NOW()
+            FROM customers
+            WHERE tenant_id = :tenantId
+            GROUP BY tenant_id, since
+            ON DUPLICATE KEY UPDATE new_customers = VALUES(new_customers), updated_at = NOW()`, {
+            replacements: { tenantId },
+            transaction
+        });
+    });
+}
+
+module.exports = {
+    refreshOrderDays,
+    refreshCustomerDays,
+    customerDay,
+    rollupHook,
+    rebuildRollups
+};
@@ -0,0 +1,243 @@
+const { Op, QueryTypes } = require('sequelize');
+const { Customer, Product, SearchToken, sequelize } = require('../models');
+
+const MAX_TOKEN_LENGTH = 64;
+const MIN_PREFIX_LENGTH = 2;
+const MAX_QUERY_TOKENS = 5;
+const REINDEX_PAGE_SIZE = 2000;
+// Ids fetched from the index before the route's other filters apply;
+// filtered searches fetch further pages, each CANDIDATE_GROWTH times
+// larger, until enough rows pass the filters
+const CANDIDATE_LIMIT = 200;
+const CANDIDATE_GROWTH = 4;
+// Index rows scanned for one query term; matches beyond it are not ranked
+const TERM_ROW_LIMIT = 10000;
+
+// Indexed fields and the natural key sync chunks are written with
+const SEARCH_ENTITIES = {
+    customers: {
+        model: Customer,
+        fields: ['name', 'email'],
+        naturalKey: 'shopify_customer_id'
+    },
+    products: {
+        model: Product,
+        fields: ['name', 'sku', 'category'],
+        naturalKey: 'shopify_variant_id',
+        // "AB-123" is also findable as "ab123"
+        compact: ['sku']
+    }
+};
+
+// Lowercased alphanumeric runs, e.g. "Jane.Doe@Example.com" ->
+// jane, doe, example, com
+function tokenize(text) {
+    if (!text) return [];
+    return String(text)
+        .toLowerCase()
+        .split(/[^\p{L}\p{N}]+/u)
+        .filter(Boolean)
+        .map(token => token.slice(0, MAX_TOKEN_LENGTH));
+}
+
+function recordTokens(entity, record) {
+    const { fields, compact = [] } = SEARCH_ENTITIES[entity];
+    const tokens = new Set();
+
+    for (const field of fields) {
+        const value = record[field];
+        for (const token of tokenize(value)) tokens.add(token);
+        if (compact.includes(field)) {
+            const joined = tokenize(value).join('');
+            if (joined) tokens.add(joined.slice(0, MAX_TOKEN_LENGTH));
+        }
+    }
+    return tokens;
+}
+
+// Replace the tokens of records (which must carry their local id)
+async function indexRecords(tenantId, entity, records, transaction) {
+    if (records.length === 0) return;
+
+    await removeRecords(tenantId, entity, records.map(record => record.id), transaction);
+
+    const rows = [];
+    for (const record of records) {
+        for (const token of recordTokens(entity, record)) {
+            rows.push({ tenant_id: tenantId, entity, token, record_id: record.id });
+        }
+    }
+    if (rows.length > 0) {
+        await SearchToken.bulkCreate(rows, { ignoreDuplicates: true, transaction, hooks: false });
+    }
+}
+
+async function removeRecords(tenantId, entity, recordIds, transaction) {
+    if (recordIds.length === 0) return;
+    await SearchToken.destroy({
+        where: { tenant_id: tenantId, entity, record_id: recordIds },
+        transaction
+    });
+}
+
+// SyncWriter hook: sync rows carry Shopify ids, so look up the local ids
+// of the chunk in one query before indexing
+async function searchHook(tenantId, entity, chunk, transaction) {
+    const config = SEARCH_ENTITIES[entity];
+    if (!config) return;
+
+    const keys = chunk.map(row => row[config.naturalKey]).filter(key => key !== null && key !== undefined);
+    if (keys.length === 0) return;
+
+    const records = await config.model.findAll({
+        attributes: ['id', ...config.fields],
+        where: { tenant_id: tenantId, [config.naturalKey]: keys },
+        raw: true,
+        transaction
+    });
+    await indexRecords(tenantId, entity, records, transaction);
+}
+
+// Index rows a term matches as a prefix (or exactly, for single
+// characters), given the alias of the search_tokens row
+function termCondition(alias, terms, i) {
+    return terms[i].length >= MIN_PREFIX_LENGTH ? `${alias}.token LIKE :p${i}` : `${alias}.token = :t${i}`;
+}
+
+// Index rows matching a term, counted up to TERM_ROW_LIMIT
+async function termRows(tenantId, entity, terms, i, replacements) {
+    const [row] = await sequelize.query(`
+        SELECT COUNT(*) AS total FROM (
+            SELECT 1 FROM search_tokens s
+            WHERE s.tenant_id = :tenantId AND s.entity = :entity AND ${termCondition('s', terms, i)}
+            LIMIT :rowLimit
+        ) matches`, {
+        replacements,
+        type: QueryTypes.SELECT
+    });
+    return Number(row.total);
+}
+
+// Record ids matching every query token as a prefix, most exact-token
+// matches first. The query is driven from the term matching the fewest
+// index rows (a range scan on the (tenant_id, entity, token, record_id)
+// primary key, capped at TERM_ROW_LIMIT rows) and the other terms are
+// checked per candidate through the (tenant_id, entity, record_id) index,
+// so common tokens like "gmail" or "com" never group the whole tenant.
+// Within a prefix range the exact token sorts first, so a capped scan
+// keeps the exact matches.
+async function searchRecords(tenantId, entity, query, limit = 50, offset = 0) {
+    const terms = [...new Set(tokenize(query))].slice(0, MAX_QUERY_TOKENS);
+    if (terms.length === 0) return [];
+
+    const replacements = { tenantId, entity, limit, offset, rowLimit: TERM_ROW_LIMIT };
+    terms.forEach((term, i) => {
+        replacements[`t${i}`] = term;
+        // Tokens are alphanumeric, so there is nothing to escape for LIKE
+        replacements[`p${i}`] = `${term}%`;
+    });
+
+    let driver = 0;
+    if (terms.length > 1) {
+        const counts = [];
+        for (let i = 0; i < terms.length; i++) {
+            counts.push(await termRows(tenantId, entity, terms, i, replacements));
+        }
+        if (counts.includes(0)) return [];
+        driver = counts.indexOf(Math.min(...counts));
+    }
+
+    const others = terms.map((term, i) => i).filter(i => i !== driver);
+    const tokenOf = condition => `
+            SELECT 1 FROM search_tokens o
+            WHERE o.tenant_id = :tenantId AND o.entity = :entity
+              AND o.record_id = d.record_id AND ${condition}`;
+    const exact = [
+        `MAX(d.token = :t${driver})`,
+        ...others.map(i => `EXISTS (${tokenOf(`o.token = :t${i}`)})`)
+    ];
+    const matched = others.map(i => `EXISTS (${tokenOf(termCondition('o', terms, i))})`);
+
+    const rows = await sequelize.query(`
+        SELECT d.record_id, ${exact.join(' + ')} AS exact_matches
+        FROM (
+            SELECT record_id, token FROM search_tokens s
+            WHERE s.tenant_id = :tenantId AND s.entity = :entity AND ${termCondition('s', terms, driver)}
+            ORDER BY token, record_id
+            LIMIT :rowLimit
+        ) d
+        ${matched.length > 0 ? `WHERE ${matched.join(' AND ')}` : ''}
+        GROUP BY d.record_id
+        ORDER BY exact_matches DESC, d.record_id DESC
+        LIMIT :limit OFFSET :offset`, {
+        replacements,
+        type: QueryTypes.SELECT
+    });
+
+    return rows.map(row => row.record_id);
+}
+
+// Search an entity and load the matching records in relevance order,
+// applying any extra filters. With filters, candidate pages are fetched
+// until limit records pass them or the matches run out.
+async function search(tenantId, entity, query, { where = {}, include, limit = 50 } = {}) {
+    const filtered = Reflect.ownKeys(where).some(key => key !== 'tenant_id');
+    const results = [];
+    let pageSize = Math.max(limit, CANDIDATE_LIMIT);
+    let offset = 0;
+
+    while (results.length < limit) {
+        const ids = await searchRecords(tenantId, entity, query, pageSize, offset);
+        if (ids.length === 0) break;
+
+        const records = await SEARCH_ENTITIES[entity].model.findAll({
+            where: { ...where, tenant_id: tenantId, id: { [Op.in]: ids } },
+            include
+        });
+        const rank = new Map(ids.map((id, i) => [String(id), i]));
+        results.push(...records.sort((a, b) => rank.get(String(a.id)) - rank.get(String(b.id))));
+
+        if (!filtered || ids.length < pageSize) break;
+        offset += ids.length;
+        pageSize *= CANDIDATE_GROWTH;
+    }
+
+    return results.slice(0, limit);
+}
+
+// Rebuild a tenant's search index from the base tables
+async function rebuildSearchIndex(tenantId) {
+    let indexed = 0;
+
+    for (const [entity, config] of Object.entries(SEARCH_ENTITIES)) {
+        await SearchToken.destroy({ where: { tenant_id: tenantId, entity } });
+
+        let lastId = 0;
+        while (true) {
+            const records = await config.model.findAll({
+                attributes: ['id', ...config.fields],
+                where: { tenant_id: tenantId, id: { [Op.gt]: lastId } },
+                order: [['id', 'ASC']],
+                limit: REINDEX_PAGE_SIZE,
+                raw: true
+            });
+            if (records.length === 0) break;
+
+            await indexRecords(tenantId, entity, records);
+            indexed += records.length;
+            lastId = records[records.length - 1].id;
+        }
+    }
+
+    return indexed;
+}
+
+module.exports = {
+    tokenize,
+    indexRecords,
+    removeRecords,
+    searchHook,
+    searchRecords,
+    search,
+    rebuildSearchIndex
+};
@@ -0,0 +1,32 @@
+module.exports = (sequelize, DataTypes) => {
+  const SearchToken = sequelize.define('SearchToken', {
+    tenant_id: {
+      type: DataTypes.STRING,
+      primaryKey: true,
+      references: {
+        model: 'tenants',
+        key: 'id'
+      }
+    },
+    entity: {
+      type: DataTypes.ENUM('customers', 'products'),
+      primaryKey: true
+    },
+    token: {
+      type: DataTypes.STRING(64),
+      primaryKey: true
+    },
+    record_id: {
+      type: DataTypes.BIGINT,
+      primaryKey: true
+    }
+  }, {
+    tableName: 'search_tokens',
+    timestamps: false,
+    indexes: [
+      { fields: ['tenant_id', 'entity', 'record_id'] }
+    ]
+  });
+
+  return SearchToken;
+};
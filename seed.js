@@ -1,13 +1,244 @@
-const { sequelize, User, Tenant, Customer, Order, Product } = require('../models');
-const bcrypt = require('bcryptjs');
+// Synthetic data generator. Recreates the schema and fills it with N
+// tenants of deterministic, production-shaped data: tenant sizes follow a
+// power law, customer spend is heavy-tailed (a few repeat buyers place most
+// orders), order dates are seasonal and the financial / fulfillment status
+// mix matches a typical store. Rows go in as multi-row INSERTs with several
+// batches in flight, then the derived tables (rollups, product sales,
+// search index, segments) are rebuilt from them.
+//
+// Usage: node scripts/seed.js [--tenants 3] [--orders 5000] [--seed 1]
+//   [--skew 1] [--batch 2000] [--skip-derived]
+// --orders is the largest tenant's order count; tenant k gets
+// orders / (k + 1)^skew. The same options always produce the same rows.
+const { parseArgs } = require('util');
+const { sequelize, User, Tenant } = require('../models');
+const { rebuildRollups } = require('../services/rollups');
+const { rebuildProductSales } = require('../services/product_sales');
+const { rebuildSearchIndex } = require('../services/search');
+const { segmentCustomers } = require('../services/segments');
+const { storeLayout, customerAt, orderAt, productAt } = require('./synthetic');
+
+const NAMED_TENANTS = [
+  { id: 'fashion-boutique', name: 'Fashion Boutique', industry: 'Fashion & Apparel' },
+  { id: 'tech-gadgets', name: 'Tech Gadgets Pro', industry: 'Electronics' },
+  { id: 'home-essentials', name: 'Home Essentials', industry: 'Home & Garden' }
+];
+const INSERTS_IN_FLIGHT = 4;
+
+// Buffers rows for one table and writes them as multi-row INSERTs, keeping
+// up to INSERTS_IN_FLIGHT statements running while the next batch is built.
+// The first failed insert is rethrown from the next add() or flush().
+class BatchInserter {
+  constructor(table, batchSize) {
+    this.table = table;
+    this.batchSize = batchSize;
+    this.rows = [];
+    this.inFlight = new Set();
+    this.written = 0;
+    this.error = null;
+  }
+
+  async add(row) {
+    this.rows.push(row);
+    if (this.rows.length >= this.batchSize) await this.send();
+  }
+
+  async send() {
+    if (this.error) throw this.error;
+    if (this.rows.length === 0) return;
+    const rows = this.rows;
+    this.rows = [];
+
+    const insert = sequelize.getQueryInterface().bulkInsert(this.table, rows)
+      .then(() => {
+        this.written += rows.length;
+      }, (error) => {
+        this.error = this.error || error;
+      })
+      .finally(() => this.inFlight.delete(insert));
+    this.inFlight.add(insert);
+    if (this.inFlight.size >= INSERTS_IN_FLIGHT) await Promise.race(this.inFlight);
+    if (this.error) throw this.error;
+  }
+
+  async flush() {
+    await this.send();
+    await Promise.all(this.inFlight);
+    if (this.error) throw this.error;
+  }
+}
+
+function tenantSizes(index, { orders, skew }) {
+  const orderCount = Math.max(10, Math.round(orders / Math.pow(index + 1, skew)));
+  return {
+    orders: orderCount,
+    customers: Math.max(5, Math.round(orderCount * 0.35)),
+    products: Math.max(10, Math.round(Math.sqrt(orderCount) * 3))
+  };
+}
+
+function orderStatus(order) {
+  if (order.fulfillment_status === 'fulfilled') return 'Fulfilled';
+  if (order.fulfillment_status === 'partial') return 'Processing';
+  if (order.financial_status === 'pending') return 'Pending';
+  if (order.financial_status === 'voided' || order.financial_status === 'refunded') return 'Cancelled';
+  return 'Processing';
+}
+
+const FINANCIAL_STATUS = {
+  paid: 'paid',
+  partially_refunded: 'paid',
+  pending: 'pending',
+  refunded: 'refunded',
+  voided: 'cancelled'
+};
+
+// Line items with refunds netted out, as ShopifyService.normalizeLineItems
+function lineItemRows(tenantId, order) {
+  const refunded = new Map();
+  for (const refund of order.refunds) {
+    for (const line of refund.refund_line_items) {
+      refunded.set(line.line_item_id, { quantity: line.quantity, amount: parseFloat(line.subtotal) });
+    }
+  }
+  const voided = order.financial_status === 'voided';
+
+  return order.line_items.map((item) => {
+    const price = parseFloat(item.price);
+    const gross = price * item.quantity - parseFloat(item.total_discount);
+    const refund = voided ? { quantity: item.quantity, amount: gross } : refunded.get(item.id);
+    return {
+      tenant_id: tenantId,
+      shopify_order_id: order.id,
+      shopify_line_item_id: item.id,
+      shopify_product_id: item.product_id,
+      shopify_variant_id: item.variant_id,
+      quantity: item.quantity,
+      refunded_quantity: refund ? refund.quantity : 0,
+      price,
+      net_revenue: Math.round(Math.max(0, gross - (refund ? refund.amount : 0)) * 100) / 100
+    };
+  });
+}
+
+async function seedTenant(tenant, layout, { batch, ids }) {
+  const now = new Date();
+  const customers = new BatchInserter('customers', batch);
+  const orders = new BatchInserter('orders', batch);
+  const lineItems = new BatchInserter('order_line_items', batch);
+  const products = new BatchInserter('products', batch);
+
+  // Local ids are assigned here, so orders can reference customers
+  // without reading them back
+  const customerIdBase = ids.customers;
+  ids.customers += layout.customers;
+
+  for (let i = 0; i < layout.customers; i++) {
+    const c = customerAt(layout, i);
+    await customers.add({
+      id: customerIdBase + i + 1,
+      tenant_id: tenant.id,
+      shopify_customer_id: c.id,
+      name: `${c.first_name} ${c.last_name}`,
+      email: c.email,
+      total_spent: 0,
+      orders_count: 0,
+      location: c.default_address ? `${c.default_address.city}, ${c.default_address.country}` : null,
+      segment: 'New',
+      phone: c.phone,
+      tags: c.tags,
+      shopify_created_at: new Date(c.created_at),
+      created_at: new Date(c.created_at),
+      updated_at: now
+    });
+  }
+  await customers.flush();
+
+  for (let i = 0; i < layout.products; i++) {
+    const p = productAt(layout, i);
+    for (const variant of p.variants) {
+      await products.add({
+        tenant_id: tenant.id,
+        shopify_product_id: p.id,
+        shopify_variant_id: variant.id,
+        name: `${p.title}${variant.title !== 'Default Title' ? ` - ${variant.title}` : ''}`,
+        category: p.product_type,
+        price: parseFloat(variant.price),
+        inventory: variant.inventory_quantity,
+        sales: 0,
+        revenue: 0,
+        sku: variant.sku,
+        product_type: p.product_type,
+        status: p.status,
+        created_at: new Date(p.created_at),
+        updated_at: now
+      });
+    }
+  }
+  await products.flush();
+
+  for (let i = 0; i < layout.orders; i++) {
+    const o = orderAt(layout, i);
+    await orders.add({
+      tenant_id: tenant.id,
+      customer_id: o.customer ? customerIdBase + (o.customer.id - layout.ids.customer) + 1 : null,
+      shopify_order_id: o.id,
+      order_number: String(o.order_number),
+      amount: parseFloat(o.total_price),
+      subtotal: parseFloat(o.total_price),
+      tax_amount: 0,
+      status: orderStatus(o),
+      financial_status: FINANCIAL_STATUS[o.financial_status],
+      fulfillment_status: o.fulfillment_status || 'unfulfilled',
+      currency: o.currency,
+      customer_name: o.customer ? `${o.customer.first_name} ${o.customer.last_name}` : 'Guest',
+      date: o.created_at.slice(0, 10),
+      created_at: new Date(o.created_at),
+      updated_at: new Date(o.updated_at)
+    });
+    for (const row of lineItemRows(tenant.id, o)) {
+      await lineItems.add(row);
+    }
+  }
+  await Promise.all([orders.flush(), lineItems.flush()]);
+
+  // Customer totals follow from the orders actually generated
+  await sequelize.query(`
+    UPDATE customers c
+    JOIN (
+      SELECT customer_id, COUNT(*) AS orders_count, SUM(amount) AS total_spent
+      FROM orders
+      WHERE tenant_id = :tenantId AND customer_id IS NOT NULL AND status <> 'Cancelled'
+      GROUP BY customer_id
+    ) t ON t.customer_id = c.id
+    SET c.orders_count = t.orders_count, c.total_spent = t.total_spent
+    WHERE c.tenant_id = :tenantId`, {
+    replacements: { tenantId: tenant.id }
+  });
+
+  return {
+    customers: customers.written,
+    products: products.written,
+    orders: orders.written,
+    lineItems: lineItems.written
+  };
+}
+
+async function seedDatabase(options = {}) {
+  const settings = {
+    tenants: 3,
+    orders: 5000,
+    seed: 1,
+    skew: 1,
+    batch: 2000,
+    skipDerived: false,
+    ...options
+  };
 
-async function seedDatabase() {
   try {
-    // Sync database
     console.log('Syncing database...');
     await sequelize.sync({ force: true });
 
-    // Create demo user
     console.log('Creating demo user...');
     const demoUser = await User.create({
       email: 'demo@xeno.com',
@@ -17,191 +248,47 @@ async function seedDatabase() {
       role: 'admin'
     });
 
-    // Create tenants
-    console.log('Creating tenants...');
-    const tenants = [
-      {
-        id: 'fashion-boutique',
-        name: 'Fashion Boutique',
-        domain: 'fashion-boutique.myshopify.com',
-        industry: 'Fashion & Apparel',
-        currency: 'USD',
-        status: 'active'
-      },
-      {
-        id: 'tech-gadgets',
-        name: 'Tech Gadgets Pro',
-        domain: 'tech-gadgets.myshopify.com',
-        industry: 'Electronics',
-        currency: 'USD',
-        status: 'active'
-      },
-      {
-        id: 'home-essentials',
-        name: 'Home Essentials',
-        domain: 'home-essentials.myshopify.com',
-        industry: 'Home & Garden',
-        currency: 'USD',
-        status: 'active'
-      }
-    ];
+    const tenants = await Tenant.bulkCreate(Array.from({ length: settings.tenants }, (_, k) => {
+      const named = NAMED_TENANTS[k] || { id: `store-${k + 1}`, name: `Store ${k + 1}`, industry: 'General' };
+      return { ...named, domain: `${named.id}.myshopify.com`, currency: 'USD', status: 'active' };
+    }));
+    await demoUser.addTenants(tenants);
 
-    const createdTenants = [];
-    for (const tenantData of tenants) {
-      const tenant = await Tenant.create(tenantData);
-      await demoUser.addTenant(tenant);
-      createdTenants.push(tenant);
-    }
+    const ids = { customers: 0 };
+    const totals = { customers: 0, products: 0, orders: 0, lineItems: 0 };
+    const started = Date.now();
 
-    // Create customers for each tenant
-    console.log('Creating customers...');
-    const customersData = {
-      'fashion-boutique': [
-        { name: 'Sarah Johnson', email: 'sarah@example.com', total_spent: 2450.00, orders_count: 12, location: 'New York, NY', segment: 'VIP' },
-        { name: 'Mike Chen', email: 'mike@example.com', total_spent: 1890.75, orders_count: 8, location: 'Los Angeles, CA', segment: 'Regular' },
-        { name: 'Emma Wilson', email: 'emma@example.com', total_spent: 3200.25, orders_count: 15, location: 'Chicago, IL', segment: 'VIP' },
-        { name: 'David Brown', email: 'david@example.com', total_spent: 890.50, orders_count: 4, location: 'Houston, TX', segment: 'New' },
-        { name: 'Lisa Anderson', email: 'lisa@example.com', total_spent: 1567.89, orders_count: 9, location: 'Phoenix, AZ', segment: 'Regular' }
-      ],
-      'tech-gadgets': [
-        { name: 'Alex Rodriguez', email: 'alex@example.com', total_spent: 3450.00, orders_count: 8, location: 'Seattle, WA', segment: 'VIP' },
-        { name: 'Jessica Park', email: 'jessica@example.com', total_spent: 2890.75, orders_count: 6, location: 'Austin, TX', segment: 'Regular' },
-        { name: 'Robert Kim', email: 'robert@example.com', total_spent: 4200.25, orders_count: 11, location: 'San Francisco, CA', segment: 'VIP' },
-        { name: 'Amanda Lee', email: 'amanda@example.com', total_spent: 1590.50, orders_count: 4, location: 'Denver, CO', segment: 'Regular' },
-        { name: 'James Wilson', email: 'james@example.com', total_spent: 2567.89, orders_count: 7, location: 'Boston, MA', segment: 'Regular' }
-      ],
-      'home-essentials': [
-        { name: 'Maria Garcia', email: 'maria@example.com', total_spent: 850.00, orders_count: 18, location: 'Miami, FL', segment: 'Regular' },
-        { name: 'John Smith', email: 'john@example.com', total_spent: 1240.75, orders_count: 22, location: 'Atlanta, GA', segment: 'VIP' },
-        { name: 'Kate Johnson', email: 'kate@example.com', total_spent: 690.25, orders_count: 12, location: 'Nashville, TN', segment: 'Regular' },
-        { name: 'Tom Williams', email: 'tom@example.com', total_spent: 1890.50, orders_count: 28, location: 'Charlotte, NC', segment: 'VIP' },
-        { name: 'Susan Davis', email: 'susan@example.com', total_spent: 567.89, orders_count: 9, location: 'Jacksonville, FL', segment: 'New' }
-      ]
-    };
+    for (const [k, tenant] of tenants.entries()) {
+      const layout = storeLayout({ seed: settings.seed * 1000 + k, ...tenantSizes(k, settings) });
+      const tenantStarted = Date.now();
+      const counts = await seedTenant(tenant, layout, { batch: settings.batch, ids });
 
-    const createdCustomers = {};
-    for (const tenant of createdTenants) {
-      createdCustomers[tenant.id] = [];
-      const customersList = customersData[tenant.id];
-      
-      for (const customerData of customersList) {
-        const customer = await Customer.create({
-          ...customerData,
-          tenant_id: tenant.id
-        });
-        createdCustomers[tenant.id].push(customer);
+      if (!settings.skipDerived) {
+        await rebuildRollups(tenant.id);
+        await rebuildProductSales(tenant.id);
+        await rebuildSearchIndex(tenant.id);
+        await segmentCustomers(tenant.id, { full: true });
       }
-    }
 
-    // Create orders for each tenant
-    console.log('Creating orders...');
-    const ordersData = {
-      'fashion-boutique': [
-        { order_number: 'ORD-3891', customer_name: 'Sarah Johnson', date: '2024-09-10', amount: 234.50, status: 'Fulfilled' },
-        { order_number: 'ORD-3890', customer_name: 'Mike Chen', date: '2024-09-10', amount: 156.75, status: 'Processing' },
-        { order_number: 'ORD-3889', customer_name: 'Emma Wilson', date: '2024-09-09', amount: 445.20, status: 'Fulfilled' },
-        { order_number: 'ORD-3888', customer_name: 'David Brown', date: '2024-09-09', amount: 89.99, status: 'Pending' },
-        { order_number: 'ORD-3887', customer_name: 'Lisa Anderson', date: '2024-09-08', amount: 267.30, status: 'Fulfilled' }
-      ],
-      'tech-gadgets': [
-        { order_number: 'ORD-2156', customer_name: 'Alex Rodriguez', date: '2024-09-10', amount: 649.99, status: 'Fulfilled' },
-        { order_number: 'ORD-2155', customer_name: 'Jessica Park', date: '2024-09-10', amount: 399.50, status: 'Processing' },
-        { order_number: 'ORD-2154', customer_name: 'Robert Kim', date: '2024-09-09', amount: 899.00, status: 'Fulfilled' },
-        { order_number: 'ORD-2153', customer_name: 'Amanda Lee', date: '2024-09-09', amount: 299.99, status: 'Processing' },
-        { order_number: 'ORD-2152', customer_name: 'James Wilson', date: '2024-09-08', amount: 549.75, status: 'Fulfilled' }
-      ],
-      'home-essentials': [
-        { order_number: 'ORD-4782', customer_name: 'Maria Garcia', date: '2024-09-10', amount: 67.50, status: 'Fulfilled' },
-        { order_number: 'ORD-4781', customer_name: 'John Smith', date: '2024-09-10', amount: 89.25, status: 'Processing' },
-        { order_number: 'ORD-4780', customer_name: 'Kate Johnson', date: '2024-09-09', amount: 45.99, status: 'Fulfilled' },
-        { order_number: 'ORD-4779', customer_name: 'Tom Williams', date: '2024-09-09', amount: 123.40, status: 'Fulfilled' },
-        { order_number: 'ORD-4778', customer_name: 'Susan Davis', date: '2024-09-08', amount: 78.60, status: 'Processing' }
-      ]
-    };
-
-    for (const tenant of createdTenants) {
-      const ordersList = ordersData[tenant.id];
-      const tenantCustomers = createdCustomers[tenant.id];
-      
-      for (const orderData of ordersList) {
-        // Find matching customer
-        const customer = tenantCustomers.find(c => c.name === orderData.customer_name);
-        
-        await Order.create({
-          ...orderData,
-          tenant_id: tenant.id,
-          customer_id: customer ? customer.id : null
-        });
-      }
-
-      // Create additional historical orders for metrics
-      for (let i = 0; i < 50; i++) {
-        const randomCustomer = tenantCustomers[Math.floor(Math.random() * tenantCustomers.length)];
-        const randomDate = new Date(2024, Math.floor(Math.random() * 9), Math.floor(Math.random() * 28) + 1);
-        const randomAmount = Math.floor(Math.random() * 500) + 50;
-        const statuses = ['Fulfilled', 'Processing', 'Pending', 'Cancelled'];
-        const randomStatus = statuses[Math.floor(Math.random() * statuses.length)];
-
-        await Order.create({
-          order_number: `ORD-${Date.now()}-${i}`,
-          customer_name: randomCustomer.name,
-          customer_id: randomCustomer.id,
-          tenant_id: tenant.id,
-          date: randomDate.toISOString().split('T')[0],
-          amount: randomAmount,
-          status: randomStatus
-        });
-      }
+      for (const key of Object.keys(totals)) totals[key] += counts[key];
+      console.log(`${tenant.id}: ${counts.customers} customers, ${counts.orders} orders, `
+        + `${counts.lineItems} line items, ${counts.products} products in ${Date.now() - tenantStarted}ms`);
     }
 
-    // Create products for each tenant
-    console.log('Creating products...');
-    const productsData = {
-      'fashion-boutique': [
-        { name: 'Designer Silk Dress', price: 249.99, category: 'Dresses', inventory: 45, sales: 127 },
-        { name: 'Leather Handbag', price: 189.50, category: 'Accessories', inventory: 23, sales: 89 },
-        { name: 'Cashmere Sweater', price: 159.99, category: 'Tops', inventory: 67, sales: 156 },
-        { name: 'Premium Jeans', price: 129.00, category: 'Bottoms', inventory: 89, sales: 234 },
-        { name: 'Statement Necklace', price: 79.99, category: 'Jewelry', inventory: 34, sales: 67 }
-      ],
-      'tech-gadgets': [
-        { name: 'Wireless Headphones', price: 199.99, category: 'Audio', inventory: 125, sales: 567 },
-        { name: 'Smartphone Case', price: 29.99, category: 'Accessories', inventory: 456, sales: 890 },
-        { name: 'Portable Charger', price: 49.99, category: 'Power', inventory: 234, sales: 456 },
-        { name: 'Bluetooth Speaker', price: 89.99, category: 'Audio', inventory: 89, sales: 234 },
-        { name: 'Smart Watch', price: 299.99, category: 'Wearables', inventory: 67, sales: 123 }
-      ],
-      'home-essentials': [
-        { name: 'Organic Cotton Towels', price: 34.99, category: 'Bath', inventory: 156, sales: 456 },
-        { name: 'Kitchen Utensil Set', price: 45.50, category: 'Kitchen', inventory: 89, sales: 234 },
-        { name: 'Scented Candles 3-Pack', price: 24.99, category: 'Decor', inventory: 234, sales: 567 },
-        { name: 'Storage Baskets', price: 39.99, category: 'Organization', inventory: 67, sales: 189 },
-        { name: 'Throw Pillow Set', price: 29.99, category: 'Decor', inventory: 123, sales: 345 }
-      ]
-    };
-
-    for (const tenant of createdTenants) {
-      const productsList = productsData[tenant.id];
-      
-      for (const productData of productsList) {
-        await Product.create({
-          ...productData,
-          tenant_id: tenant.id
-        });
-      }
-    }
-
-    console.log('✅ Database seeded successfully!');
+    const seconds = (Date.now() - started) / 1000;
+    const rows = Object.values(totals).reduce((sum, n) => sum + n, 0);
+    console.log(`✅ Database seeded: ${rows} rows in ${seconds.toFixed(1)}s (${Math.round(rows / seconds)} rows/sec)`);
     console.log('\n📋 Demo Credentials:');
     console.log('Email: demo@xeno.com');
     console.log('Password: demo123');
     console.log('\n🏪 Available Tenants:');
-    createdTenants.forEach(tenant => {
+    tenants.forEach(tenant => {
       console.log(`- ${tenant.name} (${tenant.id})`);
     });
-
+    return totals;
   } catch (error) {
     console.error('❌ Error seeding database:', error);
+    throw error;
   } finally {
     await sequelize.close();
   }
@@ -209,7 +296,25 @@ async function seedDatabase() {
 
 // Run the seed function
 if (require.main === module) {
-  seedDatabase();
+  const { values } = parseArgs({
+    options: {
+      tenants: { type: 'string', default: '3' },
+      orders: { type: 'string', default: '5000' },
+      seed: { type: 'string', default: '1' },
+      skew: { type: 'string', default: '1' },
+      batch: { type: 'string', default: '2000' },
+      'skip-derived': { type: 'boolean', default: false }
+    }
+  });
+
+  seedDatabase({
+    tenants: parseInt(values.tenants, 10),
+    orders: parseInt(values.orders, 10),
+    seed: parseInt(values.seed, 10),
+    skew: parseFloat(values.skew),
+    batch: parseInt(values.batch, 10),
+    skipDerived: values['skip-derived']
+  }).then(() => process.exit(0), () => process.exit(1));
 }
 
-module.exports = seedDatabase;
\ No newline at end of file
+module.exports = seedDatabase;
@@ -0,0 +1,23 @@
+// Recompute RFM segments for every customer.
+// Usage: node scripts/segment_customers.js [tenantId ...]
+const { sequelize, Tenant } = require('../models');
+const { segmentCustomers } = require('../services/segments');
+
+(async () => {
+  try {
+    const tenantIds = process.argv.slice(2).length > 0
+      ? process.argv.slice(2)
+      : (await Tenant.findAll({ attributes: ['id'], raw: true })).map(t => t.id);
+
+    for (const tenantId of tenantIds) {
+      const result = await segmentCustomers(tenantId, { full: true });
+      console.log(`Segmented ${result.scored} customers for ${tenantId} in ${result.durationMs}ms`);
+    }
+
+    await sequelize.close();
+    process.exit(0);
+  } catch (err) {
+    console.error(err);
+    process.exit(1);
+  }
+})();
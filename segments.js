@@ -0,0 +1,246 @@
+const { QueryTypes } = require('sequelize');
+const { sequelize } = require('../models');
+const { bumpDataVersion } = require('./metrics_cache');
+const { getCheckpoint, saveCheckpoint } = require('./checkpoints');
+
+const CHECKPOINT_ENTITY = 'segments';
+const SCAN_PAGE_SIZE = 20000;
+const WRITE_BATCH_SIZE = 1000;
+// Recency drifts as days pass, so quantiles and every score are
+// recomputed at least this often
+const FULL_RUN_INTERVAL_MS = 24 * 60 * 60 * 1000;
+// Beyond this many touched customers a full pass is as cheap
+const MAX_INCREMENTAL = 50000;
+const QUANTILES = [0.2, 0.4, 0.6, 0.8];
+
+// Per-customer recency (days since last order), frequency (orders) and
+// monetary (net spend) over non-cancelled orders. Pages by customer_id on
+// the (tenant_id, customer_id) index; ids restricts the pass to touched
+// customers.
+async function* customerAggregates(tenantId, ids = null) {
+    let lastId = 0;
+    while (true) {
+        const rows = await sequelize.query(`
+            SELECT customer_id, MAX(date) AS last_order_date,
+                DATEDIFF(CURDATE(), MAX(date)) AS recency,
+                COUNT(*) AS frequency, COALESCE(SUM(amount), 0) AS monetary
+            FROM orders
+            WHERE tenant_id = :tenantId AND customer_id > :lastId
+                AND status <> 'Cancelled'
+                ${ids ? 'AND customer_id IN (:ids)' : ''}
+            GROUP BY customer_id
+            ORDER BY customer_id
+            LIMIT :limit`, {
+            replacements: { tenantId, lastId, ids, limit: SCAN_PAGE_SIZE },
+            type: QueryTypes.SELECT
+        });
+        if (rows.length === 0) return;
+
+        yield rows.map(row => ({
+            id: row.customer_id,
+            lastOrderDate: row.last_order_date,
+            recency: Math.max(0, Number(row.recency) || 0),
+            frequency: Number(row.frequency) || 0,
+            monetary: parseFloat(row.monetary) || 0
+        }));
+
+        if (rows.length < SCAN_PAGE_SIZE) return;
+        lastId = rows[rows.length - 1].customer_id;
+    }
+}
+
+// Quintile cut points of recency, frequency and monetary over all of the
+// tenant's customers, computed in the database: the value at 0-based rank
+// floor(q * n) of each ordering, so no pass holds every aggregate in memory
+async function quintileCuts(tenantId) {
+    const [{ n }] = await sequelize.query(`
+        SELECT COUNT(DISTINCT customer_id) AS n
+        FROM orders
+        WHERE tenant_id = :tenantId AND customer_id IS NOT NULL AND status <> 'Cancelled'`, {
+        replacements: { tenantId },
+        type: QueryTypes.SELECT
+    });
+    const count = Number(n) || 0;
+    if (count === 0) {
+        const zeros = QUANTILES.map(() => 0);
+        return { recency: zeros, frequency: zeros, monetary: zeros };
+    }
+
+    const positions = QUANTILES.map(q => Math.min(count - 1, Math.floor(q * count)) + 1);
+    const rows = await sequelize.query(`
+        WITH aggregates AS (
+            SELECT GREATEST(DATEDIFF(CURDATE(), MAX(date)), 0) AS recency,
+                COUNT(*) AS frequency, COALESCE(SUM(amount), 0) AS monetary
+            FROM orders
+            WHERE tenant_id = :tenantId AND customer_id IS NOT NULL AND status <> 'Cancelled'
+            GROUP BY customer_id
+        ), ranked AS (
+            SELECT recency, frequency, monetary,
+                ROW_NUMBER() OVER (ORDER BY recency) AS recency_rank,
+                ROW_NUMBER() OVER (ORDER BY frequency) AS frequency_rank,
+                ROW_NUMBER() OVER (ORDER BY monetary) AS monetary_rank
+            FROM aggregates
+        )
+        SELECT recency, frequency, monetary, recency_rank, frequency_rank, monetary_rank
+        FROM ranked
+        WHERE recency_rank IN (:positions) OR frequency_rank IN (:positions) OR monetary_rank IN (:positions)`, {
+        replacements: { tenantId, positions },
+        type: QueryTypes.SELECT
+    });
+
+    const cutAt = (field) => positions.map((position) => {
+        const row = rows.find(r => Number(r[`${field}_rank`]) === position);
+        return row ? parseFloat(row[field]) || 0 : 0;
+    });
+    return { recency: cutAt('recency'), frequency: cutAt('frequency'), monetary: cutAt('monetary') };
+}
+
+// 1..5, higher is better. Recency is better when lower.
+function score(value, cuts, lowerIsBetter = false) {
+    let above = 0;
+    for (const cut of cuts) {
+        if (value > cut) above++;
+    }
+    return lowerIsBetter ? 5 - above : 1 + above;
+}
+
+function segmentFor(r, f, m) {
+    if (r >= 4 && f >= 4 && m >= 4) return 'VIP';
+    if (r <= 2 && (f >= 3 || m >= 3)) return 'At Risk';
+    if (r === 1) return 'Lost';
+    if (r >= 4 && f === 1) return 'New';
+    return 'Regular';
+}
+
+function scoreCustomer(aggregate, cuts) {
+    const r = score(aggregate.recency, cuts.recency, true);
+    const f = score(aggregate.frequency, cuts.frequency);
+    const m = score(aggregate.monetary, cuts.monetary);
+    return {
+        id: aggregate.id,
+        recency_score: r,
+        frequency_score: f,
+        monetary_score: m,
+        last_order_date: aggregate.lastOrderDate,
+        segment: segmentFor(r, f, m)
+    };
+}
+
+// Write scores back with one UPDATE per batch, joined against a derived
+// table of the new values. Leaves updated_at alone so segmentation does
+// not mark customers as touched.
+async function writeScores(tenantId, scored, runAt) {
+    for (let i = 0; i < scored.length; i += WRITE_BATCH_SIZE) {
+        const batch = scored.slice(i, i + WRITE_BATCH_SIZE);
+        const replacements = { tenantId, runAt };
+        const rows = batch.map((row, j) => {
+            replacements[`i${j}`] = row.id;
+            replacements[`r${j}`] = row.recency_score;
+            replacements[`f${j}`] = row.frequency_score;
+            replacements[`m${j}`] = row.monetary_score;
+            replacements[`d${j}`] = row.last_order_date;
+            replacements[`s${j}`] = row.segment;
+            return `SELECT :i${j} AS id, :r${j} AS r, :f${j} AS f, :m${j} AS m, :d${j} AS d, :s${j} AS s`;
+        });
+
+        await sequelize.query(`
+            UPDATE customers c
+            JOIN (${rows.join(' UNION ALL ')}) v ON c.id = v.id
+            SET c.recency_score = v.r, c.frequency_score = v.f, c.monetary_score = v.m,
+                c.last_order_date = v.d, c.segment = v.s, c.segmented_at = :runAt
+            WHERE c.tenant_id = :tenantId`, {
+            replacements
+        });
+    }
+}
+
+// Customers the pass didn't score have no (remaining) orders
+async function resetUnscored(tenantId, runAt, ids = null) {
+    await sequelize.query(`
+        UPDATE customers
+        SET segment = 'New', recency_score = NULL, frequency_score = NULL,
+            monetary_score = NULL, last_order_date = NULL, segmented_at = :runAt
+        WHERE tenant_id = :tenantId
+            AND (segmented_at IS NULL OR segmented_at < :runAt)
+            ${ids ? 'AND id IN (:ids)' : ''}`, {
+        replacements: { tenantId, runAt, ids }
+    });
+}
+
+// Refresh the tenant's quantiles, then score every customer page by page
+async function fullRun(tenantId, runAt) {
+    const cuts = await quintileCuts(tenantId);
+
+    let scored = 0;
+    for await (const page of customerAggregates(tenantId)) {
+        await writeScores(tenantId, page.map(a => scoreCustomer(a, cuts)), runAt);
+        scored += page.length;
+    }
+    await resetUnscored(tenantId, runAt);
+    return { cuts, scored };
+}
+
+// Re-score customers with orders changed since the last run, against the
+// stored quantiles
+async function incrementalRun(tenantId, since, cuts, runAt) {
+    const touched = (await sequelize.query(`
+        SELECT DISTINCT customer_id
+        FROM orders
+        WHERE tenant_id = :tenantId AND updated_at >= :since AND customer_id IS NOT NULL`, {
+        replacements: { tenantId, since },
+        type: QueryTypes.SELECT
+    })).map(row => row.customer_id);
+
+    if (touched.length > MAX_INCREMENTAL) return null;
+    if (touched.length === 0) return { cuts, scored: 0 };
+
+    const scored = [];
+    for await (const page of customerAggregates(tenantId, touched)) {
+        for (const row of page) scored.push(scoreCustomer(row, cuts));
+    }
+    await writeScores(tenantId, scored, runAt);
+    await resetUnscored(tenantId, runAt, touched);
+    return { cuts, scored: scored.length };
+}
+
+// RFM segmentation for a tenant. Scores are quintiles (1-5) of recency,
+// frequency and monetary value among the tenant's customers. Runs after
+// every sync: only customers whose orders changed since the last run are
+// re-scored, and the quantiles (and everyone's scores) are refreshed once
+// a day or on { full: true }.
+async function segmentCustomers(tenantId, { full = false } = {}) {
+    const started = Date.now();
+    // Whole seconds, as stored in segmented_at
+    const runAt = new Date(Math.floor(started / 1000) * 1000);
+    const checkpoint = await getCheckpoint(tenantId, CHECKPOINT_ENTITY);
+    const state = checkpoint?.state || null;
+
+    const stale = !state?.cuts
+        || !checkpoint.last_full_sync
+        || runAt - new Date(checkpoint.last_full_sync) > FULL_RUN_INTERVAL_MS;
+
+    let result = null;
+    let ranFull = false;
+    if (!full && !stale && checkpoint.high_water_mark) {
+        result = await incrementalRun(tenantId, checkpoint.high_water_mark, state.cuts, runAt);
+    }
+    if (!result) {
+        result = await fullRun(tenantId, runAt);
+        ranFull = true;
+    }
+
+    await saveCheckpoint(tenantId, CHECKPOINT_ENTITY, {
+        highWaterMark: runAt,
+        full: ranFull,
+        state: { cuts: result.cuts, computedAt: ranFull ? runAt : state.computedAt }
+    });
+    if (result.scored > 0 || ranFull) await bumpDataVersion(tenantId);
+
+    return {
+        mode: ranFull ? 'full' : 'incremental',
+        scored: result.scored,
+        durationMs: Date.now() - started
+    };
+}
+
+module.exports = { segmentCustomers, segmentFor };
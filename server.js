@@ -1,16 +1,84 @@
 
 const express = require('express');
 const path = require('path');
+const cluster = require('cluster');
 const cors = require('cors');
 const helmet = require('helmet');
 const compression = require('compression');
-const rateLimit = require('express-rate-limit');
 const { sequelize } = require('./models');
-const { ShopifySyncScheduler } = require('./services/shopify_service');
+const { ShopifySyncScheduler } = require('./services/sync_scheduler');
+const { SyncJobWorker } = require('./services/sync_jobs');
+const { getCacheStats } = require('./services/metrics_cache');
+const { getWebhookStats, flushWebhooks } = require('./services/webhook_ingest');
+const { passwordHasher } = require('./services/password_hasher');
+const { LeaderElector } = require('./services/leader');
+const { limitRequests, getRateLimitStats, BucketPruner } = require('./services/rate_limit');
+const { instrumentRequests, snapshot, renderMetrics, flushAccessLog } = require('./services/telemetry');
 require('dotenv').config();
 
 const app = express();
 const PORT = process.env.PORT || 3001;
+const HEALTH_REPORT_INTERVAL_MS = 5000;
+
+// Background work (sync scheduler, sync job worker, rate limit bucket
+// pruning) runs on the one process holding the leader lock, not on every
+// web process
+const leader = new LeaderElector();
+let background = null;
+
+// Latest per-worker health and merged telemetry relayed by the cluster
+// primary (cluster.js)
+let clusterHealth = null;
+let clusterTelemetry = null;
+
+function processHealth() {
+  const memory = process.memoryUsage();
+  return {
+    pid: process.pid,
+    worker: cluster.isWorker ? cluster.worker.id : null,
+    leader: leader.isLeader,
+    uptime: Math.round(process.uptime()),
+    rss: memory.rss,
+    heapUsed: memory.heapUsed
+  };
+}
+
+function startBackground() {
+  background = {};
+
+  // Initialize Shopify sync scheduler (tenant configs come from the Tenant table)
+  if (process.env.NODE_ENV === 'production') {
+    background.scheduler = ShopifySyncScheduler.scheduleSync();
+    console.log('🔄 Shopify sync scheduler initialized');
+  }
+
+  // Run queued sync jobs in-process unless a separate worker handles them
+  if (process.env.SYNC_WORKER !== 'external') {
+    background.worker = new SyncJobWorker();
+    background.worker.start();
+  }
+
+  // Delete full rate limit buckets from the shared table
+  background.pruner = new BucketPruner();
+  background.pruner.start();
+}
+
+function stopBackground() {
+  if (!background) return;
+  background.scheduler?.stop();
+  background.worker?.stop();
+  background.pruner?.stop();
+  background = null;
+}
+
+leader.on('elected', () => {
+  console.log(`👑 Process ${process.pid} is running background jobs`);
+  startBackground();
+});
+leader.on('deposed', () => {
+  console.log(`Process ${process.pid} lost the leader lock, stopping background jobs`);
+  stopBackground();
+});
 
 // Import routes
 const authRoutes = require('./routes/auth');
@@ -22,9 +90,12 @@ const metricsRoutes = require('./routes/metrics');
 const webhookRoutes = require('./routes/webhook');
 const shopifyRoutes = require('./routes/shopify');
 
-// Import middleware
-const { authenticateToken } = require('./middleware/auth');
-const { tenantContext } = require('./middleware/tenant');
+// Import middleware (verified tokens and tenant memberships are cached)
+const { authenticate, tenantContext, getAuthCacheStats } = require('./middleware/auth_context');
+
+// Latency histograms and the sampled access log; first, so every other
+// middleware is inside the measured time
+app.use(instrumentRequests);
 
 // Security middleware
 app.use(helmet({
@@ -49,27 +120,14 @@ app.use(cors({
   methods: ['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS']
 }));
 
-// Rate limiting
-const limiter = rateLimit({
-  windowMs: 15 * 60 * 1000, // 15 minutes
-  max: process.env.NODE_ENV === 'production' ? 100 : 1000,
-  message: {
-    error: 'Too many requests from this IP, please try again later.'
-  }
-});
-app.use('/api/', limiter);
+// Webhook routes (no auth required for Shopify webhooks). Mounted before
+// the body parsers because HMAC verification needs the raw body.
+app.use('/webhooks', webhookRoutes);
 
 // Body parsing
 app.use(express.json({ limit: '10mb' }));
 app.use(express.urlencoded({ extended: true }));
 
-// Request logging middleware
-app.use((req, res, next) => {
-  const timestamp = new Date().toISOString();
-  console.log(`${timestamp} - ${req.method} ${req.path} - IP: ${req.ip}`);
-  next();
-});
-
 
 app.use(express.static(path.join(__dirname, 'client')));
 app.get('/', (req, res) => {
@@ -82,23 +140,42 @@ app.get('/health', (req, res) => {
     status: 'ok', 
     timestamp: new Date().toISOString(),
     version: process.env.npm_package_version || '1.0.0',
-    node_version: process.version
+    node_version: process.version,
+    metricsCache: getCacheStats(),
+    webhooks: getWebhookStats(),
+    auth: getAuthCacheStats(),
+    passwordHasher: passwordHasher.getStats(),
+    rateLimit: getRateLimitStats(),
+    process: processHealth(),
+    cluster: clusterHealth
   });
 });
 
-// API routes
-app.use('/api/auth', authRoutes);
-app.use('/api/tenants', authenticateToken, tenantRoutes);
-app.use('/api/shopify', authenticateToken, shopifyRoutes);
+// Telemetry in Prometheus text format: the whole cluster (as of the last
+// health broadcast), or only the answering process with ?scope=process.
+// Needs METRICS_TOKEN as a bearer token when set; without it the endpoint
+// is only served outside production.
+app.get('/metrics', (req, res) => {
+  const token = process.env.METRICS_TOKEN;
+  if (token ? req.headers.authorization !== `Bearer ${token}` : process.env.NODE_ENV === 'production') {
+    return res.status(404).end();
+  }
 
-// Tenant-specific routes
-app.use('/api/:tenantId/customers', authenticateToken, tenantContext, customerRoutes);
-app.use('/api/:tenantId/orders', authenticateToken, tenantContext, orderRoutes);
-app.use('/api/:tenantId/products', authenticateToken, tenantContext, productRoutes);
-app.use('/api/:tenantId/metrics', authenticateToken, tenantContext, metricsRoutes);
+  const snap = clusterTelemetry && req.query.scope !== 'process' ? clusterTelemetry : snapshot();
+  res.type('text/plain; version=0.0.4').send(renderMetrics(snap));
+});
 
-// Webhook routes (no auth required for Shopify webhooks)
-app.use('/webhooks', webhookRoutes);
+// API routes. Rate limiting charges each request its route cost against
+// the tenant and user buckets (client IP before authentication).
+app.use('/api/auth', limitRequests, authRoutes);
+app.use('/api/tenants', authenticate, limitRequests, tenantRoutes);
+app.use('/api/shopify', authenticate, limitRequests, shopifyRoutes);
+
+// Tenant-specific routes
+app.use('/api/:tenantId/customers', authenticate, tenantContext, limitRequests, customerRoutes);
+app.use('/api/:tenantId/orders', authenticate, tenantContext, limitRequests, orderRoutes);
+app.use('/api/:tenantId/products', authenticate, tenantContext, limitRequests, productRoutes);
+app.use('/api/:tenantId/metrics', authenticate, tenantContext, limitRequests, metricsRoutes);
 
 
 // Serve React static files in production
@@ -159,18 +236,51 @@ app.use((error, req, res, next) => {
   });
 });
 
-// Graceful shutdown
-process.on('SIGTERM', async () => {
-  console.log('SIGTERM received, shutting down gracefully');
+// Graceful shutdown: stop background work, stop accepting connections,
+// write buffered webhooks, then close the database pool
+let server = null;
+let shuttingDown = false;
+
+const shutdown = async (reason) => {
+  if (shuttingDown) return;
+  shuttingDown = true;
+  console.log(`${reason}, shutting down gracefully`);
   try {
+    await leader.stop();
+    stopBackground();
+    if (server && server.listening) {
+      await new Promise(resolve => server.close(resolve));
+    }
+    await flushWebhooks();
     await sequelize.close();
     console.log('Database connection closed');
+    flushAccessLog();
     process.exit(0);
   } catch (error) {
     console.error('Error during shutdown:', error);
     process.exit(1);
   }
-});
+};
+
+process.on('SIGTERM', () => shutdown('SIGTERM received'));
+
+if (cluster.isWorker) {
+  // The primary disconnects a worker to stop or replace it
+  cluster.worker.on('disconnect', () => shutdown('Disconnected from cluster primary'));
+
+  process.on('message', (message) => {
+    if (message && message.type === 'cluster-health') {
+      clusterHealth = message.cluster;
+      clusterTelemetry = message.telemetry;
+    }
+  });
+
+  setInterval(() => {
+    if (process.connected) {
+      process.send({ type: 'health', health: processHealth(), telemetry: snapshot() });
+    }
+  }, HEALTH_REPORT_INTERVAL_MS).unref();
+}
 
 // Start server
 const startServer = async () => {
@@ -185,15 +295,11 @@ const startServer = async () => {
       console.log('📋 Database models synchronized');
     }
 
-    // Initialize Shopify sync scheduler
-    if (process.env.NODE_ENV === 'production') {
-      // In production, you would get tenant configs from database
-      // For now, we'll just initialize the scheduler
-      console.log('🔄 Shopify sync scheduler initialized');
-    }
+    // Compete for the leader lock; the winner starts background jobs
+    leader.start();
 
     // Start listening
-    const server = app.listen(PORT, () => {
+    server = app.listen(PORT, () => {
       console.log(`🚀 Server running on port ${PORT}`);
       console.log(`📊 Environment: ${process.env.NODE_ENV || 'development'}`);
       console.log(`🔗 Health check: http://localhost:${PORT}/health`);
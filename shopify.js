@@ -1,5 +1,6 @@
 const express = require('express');
-const { ShopifyService } = require('../services/shopify_service');
+const { enqueueSync, latestJob, describeJob } = require('../services/sync_jobs');
+const { recentRuns, describeRun, summarizeRuns } = require('../services/sync_runs');
 const { Tenant } = require('../models');
 const router = express.Router();
 
@@ -13,26 +14,32 @@ router.post('/sync/:tenantId', async (req, res) => {
       return res.status(404).json({ error: 'Tenant not found' });
     }
 
-    const shopifyConfig = {
-      storeDomain: tenant.shopify_domain,
-      accessToken: tenant.shopify_access_token
-    };
+    if (!tenant.shopify_domain || !tenant.shopify_access_token) {
+      return res.status(400).json({ error: 'Tenant is not connected to Shopify' });
+    }
 
-    const service = new ShopifyService(tenantId, shopifyConfig);
-    const result = await service.fullSync();
+    // ?full=true ignores checkpoints and re-downloads everything;
+    // ?mode=bulk backfills through Shopify bulk operations
+    const full = req.query.full === 'true' || req.body?.full === true;
+    const bulk = req.query.mode === 'bulk' || req.body?.mode === 'bulk';
 
-    res.json({
+    // The sync runs on a job worker; poll /status/:tenantId for progress
+    const { job, coalesced } = await enqueueSync(tenantId, { full, bulk });
+
+    res.status(202).json({
       success: true,
-      message: 'Sync completed successfully',
-      data: result
+      message: coalesced ? 'Sync already in progress' : 'Sync queued',
+      jobId: job.id,
+      job: describeJob(job)
     });
   } catch (error) {
     console.error('Manual sync error:', error);
-    res.status(500).json({ error: 'Sync failed', message: error.message });
+    res.status(500).json({ error: 'Failed to queue sync', message: error.message });
   }
 });
 
-// Get sync status
+// Get sync status, with the latest runs (?runs=N, default 10, max 100)
+// and a summary of their durations, throughput and throttling
 router.get('/status/:tenantId', async (req, res) => {
   try {
     const { tenantId } = req.params;
@@ -42,10 +49,18 @@ router.get('/status/:tenantId', async (req, res) => {
       return res.status(404).json({ error: 'Tenant not found' });
     }
 
+    const [job, runs] = await Promise.all([
+      latestJob(tenantId),
+      recentRuns(tenantId, parseInt(req.query.runs, 10) || 10)
+    ]);
+
     res.json({
       lastSync: tenant.last_sync,
       syncStatus: tenant.sync_status,
-      isConnected: !!tenant.shopify_access_token
+      isConnected: !!tenant.shopify_access_token,
+      job: describeJob(job),
+      runs: runs.map(describeRun),
+      runSummary: summarizeRuns(runs)
     });
   } catch (error) {
     console.error('Sync status error:', error);
@@ -0,0 +1,174 @@
+const Shopify = require('shopify-api-node');
+
+const API_VERSION = '2024-07';
+const DEFAULT_HEADROOM = 0.9;
+const DEFAULT_MAX_RETRIES = 5;
+const BASE_BACKOFF_MS = 500;
+const MAX_BACKOFF_MS = 30000;
+
+// Client-side model of Shopify's leaky-bucket REST call limit for one shop.
+// The bucket drains at max / 20 calls per second (2/s for the standard
+// 40-call bucket, 20/s for Plus) and is re-synced from the
+// X-Shopify-Shop-Api-Call-Limit header after every response.
+class CallLimitBucket {
+    constructor(max = 40, headroom = DEFAULT_HEADROOM) {
+        this.max = max;
+        this.headroom = headroom;
+        this.level = 0;
+        this.updatedAt = Date.now();
+    }
+
+    get leakRate() {
+        return this.max / 20;
+    }
+
+    drain() {
+        const now = Date.now();
+        this.level = Math.max(0, this.level - ((now - this.updatedAt) / 1000) * this.leakRate);
+        this.updatedAt = now;
+    }
+
+    // Wait until one more call fits under max * headroom, then reserve it.
+    // Returns the time spent waiting in ms.
+    async acquire() {
+        let waited = 0;
+        while (true) {
+            this.drain();
+            const ceiling = Math.max(1, Math.floor(this.max * this.headroom));
+            if (this.level + 1 <= ceiling) {
+                this.level += 1;
+                return waited;
+            }
+            const waitMs = Math.ceil(((this.level + 1 - ceiling) / this.leakRate) * 1000);
+            await sleep(waitMs);
+            waited += waitMs;
+        }
+    }
+
+    update({ current, max }) {
+        if (!max) return;
+        this.drain();
+        this.max = max;
+        // The header lags our own in-flight reservations, never lower the
+        // level below what the server reported
+        this.level = Math.max(this.level, current);
+    }
+
+    // Shopify rejected a call: treat the bucket as full
+    saturate() {
+        this.drain();
+        this.level = this.max;
+    }
+}
+
+// One bucket per shop so concurrent syncs against the same store pace
+// against a shared budget
+const buckets = new Map();
+
+function bucketFor(shopName) {
+    if (!buckets.has(shopName)) {
+        buckets.set(shopName, new CallLimitBucket());
+    }
+    return buckets.get(shopName);
+}
+
+// Rate-limit-aware wrapper around shopify-api-node: paces calls under the
+// shop's call limit and retries 429/5xx with jittered exponential backoff
+class ShopifyClient {
+    constructor(shopifyConfig, options = {}) {
+        const shopName = shopifyConfig.storeDomain.replace('.myshopify.com', '');
+
+        this.shopify = new Shopify({
+            shopName,
+            accessToken: shopifyConfig.accessToken,
+            apiVersion: API_VERSION
+        });
+        // Send requests somewhere other than <shop>.myshopify.com, e.g. the
+        // mock Admin API in scripts/mock_shopify.js
+        const apiBaseUrl = shopifyConfig.apiBaseUrl || process.env.SHOPIFY_API_BASE_URL;
+        if (apiBaseUrl) {
+            const url = new URL(apiBaseUrl);
+            Object.assign(this.shopify.baseUrl, {
+                protocol: url.protocol,
+                hostname: url.hostname,
+                port: Number(url.port) || (url.protocol === 'https:' ? 443 : 80)
+            });
+        }
+        this.bucket = bucketFor(shopName);
+        this.maxRetries = options.maxRetries ?? DEFAULT_MAX_RETRIES;
+        if (options.headroom) {
+            this.bucket.headroom = options.headroom;
+        }
+        this.stats = {
+            calls: 0,
+            retries: 0,
+            throttleWaitMs: 0,
+            backoffWaitMs: 0,
+            // The same counters per REST resource ('graphql' for GraphQL)
+            byResource: {}
+        };
+
+        this.shopify.on('callLimits', limits => this.bucket.update(limits));
+    }
+
+    async request(fn, resource = 'other') {
+        const stats = this.stats.byResource[resource]
+            || (this.stats.byResource[resource] = { calls: 0, retries: 0, throttleWaitMs: 0, backoffWaitMs: 0 });
+
+        for (let attempt = 0; ; attempt++) {
+            const waited = await this.bucket.acquire();
+            this.stats.throttleWaitMs += waited;
+            stats.throttleWaitMs += waited;
+            this.stats.calls += 1;
+            stats.calls += 1;
+
+            try {
+                return await fn(this.shopify);
+            } catch (error) {
+                const status = error.response?.statusCode;
+                const retryable = status === 429 || status >= 500;
+                if (!retryable || attempt >= this.maxRetries) {
+                    throw error;
+                }
+
+                if (status === 429) {
+                    this.bucket.saturate();
+                }
+                const delay = backoffDelay(attempt, error.response?.headers?.['retry-after']);
+                this.stats.retries += 1;
+                this.stats.backoffWaitMs += delay;
+                stats.retries += 1;
+                stats.backoffWaitMs += delay;
+                await sleep(delay);
+            }
+        }
+    }
+
+    list(resource, params) {
+        return this.request(shopify => shopify[resource].list(params), resource);
+    }
+
+    count(resource, params) {
+        return this.request(shopify => shopify[resource].count(params), resource);
+    }
+
+    graphql(query, variables) {
+        return this.request(shopify => shopify.graphql(query, variables), 'graphql');
+    }
+}
+
+// Retry-After when Shopify sends it, otherwise full-jitter exponential backoff
+function backoffDelay(attempt, retryAfter) {
+    const seconds = parseFloat(retryAfter);
+    if (seconds > 0) {
+        return Math.ceil(seconds * 1000);
+    }
+    const cap = Math.min(MAX_BACKOFF_MS, BASE_BACKOFF_MS * 2 ** attempt);
+    return Math.ceil(Math.random() * cap);
+}
+
+function sleep(ms) {
+    return new Promise(resolve => setTimeout(resolve, ms));
+}
+
+module.exports = { ShopifyClient, CallLimitBucket, API_VERSION };
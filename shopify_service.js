@@ -1,58 +1,66 @@
 
-const Shopify = require('shopify-api-node');
-const { Customer, Order, Product } = require('../models');
-const cron = require('node-cron');
+const { Tenant } = require('../models');
+const { ShopifyClient } = require('./shopify_client');
+const { SyncWriter } = require('./sync_writer');
+const { CustomerIndex } = require('./customer_index');
+const { paginate, runPipeline } = require('./sync_pipeline');
+const { getCheckpoint, saveCheckpoint } = require('./checkpoints');
+const { BulkIngestor } = require('./bulk_ingest');
+const { rollupHook } = require('./rollups');
+const { searchHook } = require('./search');
+const { salesHook } = require('./product_sales');
+const { segmentCustomers } = require('./segments');
+const { startRun, finishRun } = require('./sync_runs');
+const { performance } = require('perf_hooks');
+
+// A pass's checkpoint is its start time minus this margin, to cover clock
+// skew between Shopify and us
+const CHECKPOINT_SKEW_MS = 5 * 60 * 1000;
 
 class ShopifyService {
     constructor(tenantId, shopifyConfig) {
         this.tenantId = tenantId;
-        this.shopify = new Shopify({
-            shopName: shopifyConfig.storeDomain.replace('.myshopify.com', ''),
-            accessToken: shopifyConfig.accessToken,
-            apiVersion: '2024-07'
+        this.client = new ShopifyClient(shopifyConfig);
+        this.prefetchDepth = shopifyConfig.prefetchDepth || 1;
+        this.writer = new SyncWriter(tenantId, { batchSize: shopifyConfig.batchSize });
+        this.customerIndex = new CustomerIndex(tenantId);
+        this.passStarts = {};
+        this.progress = {};
+        this.stages = {};
+        this.stageStarts = {};
+        this.writer.addHook(async (entity, chunk, transaction) => {
+            if (entity === 'customers') {
+                await this.customerIndex.addWritten(chunk, transaction);
+            }
         });
+        this.writer.addHook((entity, chunk, transaction) => rollupHook(tenantId, entity, chunk, transaction));
+        this.writer.addHook((entity, chunk, transaction) => searchHook(tenantId, entity, chunk, transaction));
+        this.writer.addHook((entity, chunk, transaction) => salesHook(tenantId, entity, chunk, transaction));
     }
 
     // Sync customers from Shopify
-    async syncCustomers() {
+    async syncCustomers(options = {}) {
         try {
             console.log(`Syncing customers for tenant: ${this.tenantId}`);
-            let customers = [];
-            let hasNextPage = true;
-            let pageInfo = {};
-
-            while (hasNextPage) {
-                const response = await this.shopify.customer.list({
-                    limit: 250,
-                    ...pageInfo
-                });
-
-                customers = customers.concat(response);
-                hasNextPage = response.length === 250;
-
-                if (hasNextPage) {
-                    pageInfo = { since_id: response[response.length - 1].id };
-                }
-            }
+            const timings = this.startStage('customers');
+            const window = await this.changedSince('customers', options);
+            await this.beginStage('customers', 'customer', window);
 
-            for (const shopifyCustomer of customers) {
-                await Customer.upsert({
-                    tenant_id: this.tenantId,
-                    shopify_customer_id: shopifyCustomer.id,
-                    name: `${shopifyCustomer.first_name || ''} ${shopifyCustomer.last_name || ''}`.trim() || 'Unknown',
-                    email: shopifyCustomer.email || '',
-                    total_spent: parseFloat(shopifyCustomer.total_spent) || 0,
-                    orders_count: shopifyCustomer.orders_count || 0,
-                    location: shopifyCustomer.default_address ? 
-                        `${shopifyCustomer.default_address.city}, ${shopifyCustomer.default_address.country}` : null,
-                    segment: this.calculateCustomerSegment(shopifyCustomer.total_spent),
-                    phone: shopifyCustomer.phone,
-                    tags: shopifyCustomer.tags
-                });
-            }
+            const count = await runPipeline({
+                source: this.pages('customer', window),
+                transform: page => page.map(c => this.normalizeCustomer(c)),
+                write: rows => this.writer.write('customers', rows),
+                depth: this.prefetchDepth,
+                onPage: processed => this.reportProgress('customers', { processed }),
+                timings
+            });
+            await this.commitCheckpoint('customers', window);
+            this.reportProgress('customers', { done: true });
+            this.finishStage('customers', count, this.client.stats.byResource.customer);
 
-            console.log(`Synced ${customers.length} customers for tenant: ${this.tenantId}`);
-            return { success: true, count: customers.length };
+            const stats = this.writer.report('customers');
+            console.log(`Synced ${count} customers for tenant: ${this.tenantId} (${stats.rowsPerSec} rows/sec)`);
+            return { success: true, count, write: stats };
         } catch (error) {
             console.error(`Customer sync error for tenant ${this.tenantId}:`, error);
             throw error;
@@ -60,53 +68,40 @@ class ShopifyService {
     }
 
     // Sync orders from Shopify
-    async syncOrders() {
+    async syncOrders(options = {}) {
         try {
             console.log(`Syncing orders for tenant: ${this.tenantId}`);
-            let orders = [];
-            let hasNextPage = true;
-            let pageInfo = {};
-
-            while (hasNextPage) {
-                const response = await this.shopify.order.list({
-                    limit: 250,
-                    status: 'any',
-                    ...pageInfo
-                });
-
-                orders = orders.concat(response);
-                hasNextPage = response.length === 250;
-
-                if (hasNextPage) {
-                    pageInfo = { since_id: response[response.length - 1].id };
-                }
+            const timings = this.startStage('orders');
+            const window = await this.changedSince('orders', options);
+            await this.beginStage('orders', 'order', { status: 'any', ...window });
+
+            // A full pass touches most customers, so scan them all once;
+            // an incremental pass only resolves the ids each page needs
+            const incremental = !!window.updated_at_min;
+            if (!incremental) {
+                await this.customerIndex.load();
             }
 
-            for (const shopifyOrder of orders) {
-                const customer = await Customer.findOne({
-                    where: {
-                        tenant_id: this.tenantId,
-                        shopify_customer_id: shopifyOrder.customer?.id
+            const count = await runPipeline({
+                source: this.pages('order', { status: 'any', ...window }),
+                transform: async (page) => {
+                    if (incremental) {
+                        await this.customerIndex.ensure(page.map(o => o.customer?.id));
                     }
-                });
-
-                await Order.upsert({
-                    tenant_id: this.tenantId,
-                    shopify_order_id: shopifyOrder.id,
-                    order_number: shopifyOrder.order_number,
-                    customer_id: customer?.id,
-                    customer_name: shopifyOrder.customer ? 
-                        `${shopifyOrder.customer.first_name} ${shopifyOrder.customer.last_name}` : 'Guest',
-                    amount: parseFloat(shopifyOrder.total_price) || 0,
-                    status: this.mapOrderStatus(shopifyOrder.fulfillment_status, shopifyOrder.financial_status),
-                    date: shopifyOrder.created_at,
-                    items_count: shopifyOrder.line_items?.length || 0,
-                    currency: shopifyOrder.currency || 'USD'
-                });
-            }
+                    return page.map(o => this.normalizeOrder(o, this.customerIndex.get(o.customer?.id)));
+                },
+                write: rows => this.writer.write('orders', rows),
+                depth: this.prefetchDepth,
+                onPage: processed => this.reportProgress('orders', { processed }),
+                timings
+            });
+            await this.commitCheckpoint('orders', window);
+            this.reportProgress('orders', { done: true });
+            this.finishStage('orders', count, this.client.stats.byResource.order);
 
-            console.log(`Synced ${orders.length} orders for tenant: ${this.tenantId}`);
-            return { success: true, count: orders.length };
+            const stats = this.writer.report('orders');
+            console.log(`Synced ${count} orders for tenant: ${this.tenantId} (${stats.rowsPerSec} rows/sec)`);
+            return { success: true, count, write: stats };
         } catch (error) {
             console.error(`Order sync error for tenant ${this.tenantId}:`, error);
             throw error;
@@ -114,81 +109,311 @@ class ShopifyService {
     }
 
     // Sync products from Shopify
-    async syncProducts() {
+    async syncProducts(options = {}) {
         try {
             console.log(`Syncing products for tenant: ${this.tenantId}`);
-            let products = [];
-            let hasNextPage = true;
-            let pageInfo = {};
-
-            while (hasNextPage) {
-                const response = await this.shopify.product.list({
-                    limit: 250,
-                    ...pageInfo
-                });
-
-                products = products.concat(response);
-                hasNextPage = response.length === 250;
-
-                if (hasNextPage) {
-                    pageInfo = { since_id: response[response.length - 1].id };
-                }
-            }
+            const timings = this.startStage('products');
+            const window = await this.changedSince('products', options);
+            await this.beginStage('products', 'product', window);
 
-            for (const shopifyProduct of products) {
-                for (const variant of shopifyProduct.variants) {
-                    await Product.upsert({
-                        tenant_id: this.tenantId,
-                        shopify_product_id: shopifyProduct.id,
-                        shopify_variant_id: variant.id,
-                        name: `${shopifyProduct.title}${variant.title !== 'Default Title' ? ` - ${variant.title}` : ''}`,
-                        price: parseFloat(variant.price) || 0,
-                        category: shopifyProduct.product_type || 'Uncategorized',
-                        inventory: variant.inventory_quantity || 0,
-                        sales: 0, // This would need to be calculated from orders
-                        sku: variant.sku,
-                        status: shopifyProduct.status === 'active' ? 'Active' : 'Inactive'
-                    });
-                }
-            }
+            const count = await runPipeline({
+                source: this.pages('product', window),
+                transform: page => page.flatMap(p => this.normalizeProductVariants(p)),
+                write: rows => this.writer.write('products', rows),
+                depth: this.prefetchDepth,
+                onPage: processed => this.reportProgress('products', { processed }),
+                timings
+            });
+            await this.commitCheckpoint('products', window);
+            this.reportProgress('products', { done: true });
+            this.finishStage('products', count, this.client.stats.byResource.product);
 
-            console.log(`Synced ${products.length} products for tenant: ${this.tenantId}`);
-            return { success: true, count: products.length };
+            const stats = this.writer.report('products');
+            console.log(`Synced ${count} products for tenant: ${this.tenantId} (${stats.rowsPerSec} rows/sec)`);
+            return { success: true, count, write: stats };
         } catch (error) {
             console.error(`Product sync error for tenant ${this.tenantId}:`, error);
             throw error;
         }
     }
 
-    // Full sync of all data
-    async fullSync() {
+    // Page-by-page iterator over a Shopify REST resource
+    pages(resource, params = {}) {
+        return paginate(pageParams => this.client.list(resource, pageParams), params);
+    }
+
+    // Progress reporting for sync jobs. Totals cost one count call per
+    // entity, so they are only fetched when a listener is attached.
+    async beginStage(entity, resource, params) {
+        if (!this.onProgress) return;
+        const total = await this.client.count(resource, params).catch(() => null);
+        this.progress[entity] = { processed: 0, total, done: false };
+        this.onProgress(this.progress);
+    }
+
+    reportProgress(entity, update) {
+        if (!this.onProgress) return;
+        this.progress[entity] = { ...this.progress[entity], ...update };
+        this.onProgress(this.progress);
+    }
+
+    // Per-entity timings for the run history: wall time, and time waiting
+    // on fetches, transforming and writing (see runPipeline)
+    startStage(entity) {
+        this.stageStarts[entity] = performance.now();
+        this.passStarts[entity] = Date.now();
+        this.stages[entity] = { count: 0, ms: 0, fetchMs: 0, transformMs: 0, writeMs: 0 };
+        return this.stages[entity];
+    }
+
+    finishStage(entity, count, api) {
+        const stage = this.stages[entity];
+        stage.ms = performance.now() - this.stageStarts[entity];
+        for (const key of ['ms', 'fetchMs', 'transformMs', 'writeMs', 'exportMs']) {
+            if (stage[key] !== undefined) stage[key] = Math.round(stage[key]);
+        }
+        stage.count = count;
+        stage.recordsPerSec = stage.ms > 0 ? Math.round(count / (stage.ms / 1000)) : count;
+        if (api) stage.api = { ...api };
+    }
+
+    // Query params limiting a sync to records changed since the entity's
+    // checkpoint. Empty for the first run or when options.full is set.
+    async changedSince(entity, options = {}) {
+        if (options.full) return {};
+
+        const checkpoint = await getCheckpoint(this.tenantId, entity);
+        if (!checkpoint?.high_water_mark) return {};
+
+        // updated_at_min is inclusive, so boundary records are re-fetched
+        // and re-upserted rather than missed
+        return { updated_at_min: new Date(checkpoint.high_water_mark).toISOString() };
+    }
+
+    // Called once a pass has completed. The mark is when the pass started,
+    // not the largest updated_at it saw: pages come in id order, so a
+    // record fetched early and updated mid-pass can be older than records
+    // on later pages, and would be skipped by the next run.
+    async commitCheckpoint(entity, window) {
+        await saveCheckpoint(this.tenantId, entity, {
+            highWaterMark: new Date(this.passStarts[entity] - CHECKPOINT_SKEW_MS),
+            full: !window.updated_at_min
+        });
+    }
+
+    async restSync(options) {
+        // Orders resolve customer ids through the index, so they run
+        // after customers; on a full resync the index scan overlaps
+        // the customer fetch. The load is awaited before orders run, so a
+        // failed scan fails the sync rather than going unhandled.
+        const indexLoad = options.full ? this.customerIndex.load() : null;
+        if (indexLoad) indexLoad.catch(() => {});
+        const [[customers, orders], products] = await Promise.all([
+            this.syncCustomers(options).then(async (customers) => {
+                await indexLoad;
+                return [customers, await this.syncOrders(options)];
+            }),
+            this.syncProducts(options)
+        ]);
+        return { customers, orders, products };
+    }
+
+    // Initial backfill through Shopify bulk operations (JSONL exports)
+    // instead of REST paging. options.sources may map an entity to a local
+    // JSONL file or URL in place of running an export. Entities run one at
+    // a time: a shop allows a single bulk query at once, and orders need
+    // customers in place.
+    async backfill(options = {}) {
+        const ingestor = new BulkIngestor(this);
+        const results = {};
+
+        for (const entity of ['customers', 'orders', 'products']) {
+            console.log(`Bulk ingesting ${entity} for tenant: ${this.tenantId}`);
+            this.progress[entity] = { processed: 0, total: null, done: false };
+            const timings = this.startStage(entity);
+
+            const exportStart = performance.now();
+            const stream = await ingestor.open(entity, options.sources);
+            timings.exportMs = performance.now() - exportStart;
+            const { count, recordsPerSec } = stream
+                ? await ingestor.ingest(entity, stream, timings)
+                : { count: 0, recordsPerSec: 0 };
+            await this.commitCheckpoint(entity, {});
+            this.reportProgress(entity, { done: true });
+            this.finishStage(entity, count);
+
+            console.log(`Bulk ingested ${count} ${entity} for tenant: ${this.tenantId} (${recordsPerSec} records/sec)`);
+            results[entity] = { success: true, count, write: this.writer.report(entity) };
+        }
+
+        return results;
+    }
+
+    // Sync all data. Incremental by default; pass { full: true } to ignore
+    // checkpoints and re-download everything, or { bulk: true } to backfill
+    // through bulk operations. options.onProgress receives
+    // per-entity { processed, total, done } as pages are written. Every
+    // run is recorded in sync_runs; options.trigger ('job', 'schedule',
+    // default 'manual') and options.jobId say what started it.
+    async fullSync(options = {}) {
+        const mode = options.bulk ? 'bulk' : options.full ? 'full' : 'incremental';
+        const run = await startRun(this.tenantId, {
+            trigger: options.trigger || 'manual',
+            mode,
+            jobId: options.jobId
+        });
+
         try {
-            const results = await Promise.all([
-                this.syncCustomers(),
-                this.syncOrders(),
-                this.syncProducts()
-            ]);
+            this.onProgress = options.onProgress;
+            await Tenant.update({ sync_status: 'syncing' }, { where: { id: this.tenantId } });
+
+            const { customers, orders, products } = options.bulk
+                ? await this.backfill(options)
+                : await this.restSync(options);
+
+            // Re-score customers whose orders changed in this run
+            const segmentStart = performance.now();
+            const segments = await segmentCustomers(this.tenantId, { full: options.full || options.bulk });
+            this.stages.segments = { ms: Math.round(performance.now() - segmentStart) };
+
+            const timestamp = new Date();
+            await Tenant.update(
+                { sync_status: 'completed', last_sync: timestamp },
+                { where: { id: this.tenantId } }
+            );
+            await finishRun(run, { stages: this.stages, api: this.client.stats });
 
             return {
                 success: true,
-                customers: results[0].count,
-                orders: results[1].count,
-                products: results[2].count,
-                timestamp: new Date()
+                runId: run ? run.id : null,
+                mode,
+                customers: customers.count,
+                orders: orders.count,
+                products: products.count,
+                write: {
+                    customers: customers.write,
+                    orders: orders.write,
+                    products: products.write
+                },
+                segments,
+                stages: this.stages,
+                api: { ...this.client.stats },
+                timestamp
             };
         } catch (error) {
             console.error(`Full sync error for tenant ${this.tenantId}:`, error);
+            await Tenant.update({ sync_status: 'failed' }, { where: { id: this.tenantId } })
+                .catch(() => {});
+            await finishRun(run, { stages: this.stages, api: this.client.stats, error });
             throw error;
         }
     }
 
-    // Helper methods
-    calculateCustomerSegment(totalSpent) {
-        if (totalSpent >= 1000) return 'VIP';
-        if (totalSpent >= 100) return 'Regular';
-        return 'New';
+    // Normalizers: map Shopify REST payloads to local rows
+    normalize(entity, records) {
+        switch (entity) {
+            case 'customers':
+                return records.map(c => this.normalizeCustomer(c));
+            case 'orders':
+                return records.map(o => this.normalizeOrder(o, this.customerIndex.get(o.customer?.id)));
+            case 'products':
+                return records.flatMap(p => this.normalizeProductVariants(p));
+            default:
+                throw new Error(`Unknown sync entity: ${entity}`);
+        }
     }
 
+    normalizeCustomer(shopifyCustomer) {
+        return {
+            tenant_id: this.tenantId,
+            shopify_customer_id: shopifyCustomer.id,
+            name: `${shopifyCustomer.first_name || ''} ${shopifyCustomer.last_name || ''}`.trim() || 'Unknown',
+            email: shopifyCustomer.email || '',
+            total_spent: parseFloat(shopifyCustomer.total_spent) || 0,
+            orders_count: shopifyCustomer.orders_count || 0,
+            location: shopifyCustomer.default_address ?
+                `${shopifyCustomer.default_address.city}, ${shopifyCustomer.default_address.country}` : null,
+            phone: shopifyCustomer.phone,
+            tags: shopifyCustomer.tags,
+            shopify_created_at: shopifyCustomer.created_at ? new Date(shopifyCustomer.created_at) : null
+        };
+    }
+
+    normalizeOrder(shopifyOrder, customerId) {
+        return {
+            tenant_id: this.tenantId,
+            shopify_order_id: shopifyOrder.id,
+            order_number: String(shopifyOrder.order_number),
+            customer_id: customerId || null,
+            customer_name: shopifyOrder.customer ?
+                `${shopifyOrder.customer.first_name} ${shopifyOrder.customer.last_name}` : 'Guest',
+            amount: parseFloat(shopifyOrder.total_price) || 0,
+            status: this.mapOrderStatus(shopifyOrder.fulfillment_status, shopifyOrder.financial_status),
+            date: shopifyOrder.created_at,
+            currency: shopifyOrder.currency || 'USD',
+            line_items: this.normalizeLineItems(shopifyOrder)
+        };
+    }
+
+    // Line items with refunds netted out. REST payloads carry refunds;
+    // bulk exports only carry current_quantity, so refunded units are
+    // derived from it and valued at the unit price.
+    normalizeLineItems(shopifyOrder) {
+        const refunded = new Map();
+        for (const refund of shopifyOrder.refunds || []) {
+            for (const line of refund.refund_line_items || []) {
+                const entry = refunded.get(line.line_item_id) || { quantity: 0, amount: 0 };
+                entry.quantity += line.quantity || 0;
+                entry.amount += parseFloat(line.subtotal) || 0;
+                refunded.set(line.line_item_id, entry);
+            }
+        }
+        // Voided orders were never charged
+        const voided = shopifyOrder.financial_status === 'voided';
+
+        return (shopifyOrder.line_items || []).map((item) => {
+            const quantity = item.quantity || 0;
+            const price = parseFloat(item.price) || 0;
+            const gross = price * quantity - (parseFloat(item.total_discount) || 0);
+
+            let refund = refunded.get(item.id);
+            if (!refund && item.current_quantity !== undefined && item.current_quantity !== null) {
+                const units = Math.max(0, quantity - item.current_quantity);
+                refund = { quantity: units, amount: price * units };
+            }
+            if (voided) {
+                refund = { quantity, amount: gross };
+            }
+
+            const refundedQuantity = Math.min(quantity, refund ? refund.quantity : 0);
+            const netRevenue = Math.max(0, gross - (refund ? refund.amount : 0));
+            return {
+                shopify_line_item_id: item.id,
+                shopify_product_id: item.product_id || null,
+                shopify_variant_id: item.variant_id || null,
+                quantity,
+                refunded_quantity: refundedQuantity,
+                price,
+                net_revenue: Math.round(netRevenue * 100) / 100
+            };
+        });
+    }
+
+    normalizeProductVariants(shopifyProduct) {
+        return (shopifyProduct.variants || []).map(variant => ({
+            tenant_id: this.tenantId,
+            shopify_product_id: shopifyProduct.id,
+            shopify_variant_id: variant.id,
+            name: `${shopifyProduct.title}${variant.title !== 'Default Title' ? ` - ${variant.title}` : ''}`,
+            price: parseFloat(variant.price) || 0,
+            category: shopifyProduct.product_type || 'Uncategorized',
+            inventory: variant.inventory_quantity || 0,
+            sku: variant.sku,
+            status: ['active', 'archived', 'draft'].includes(shopifyProduct.status) ? shopifyProduct.status : 'active'
+        }));
+    }
+
+    // Helper methods
     mapOrderStatus(fulfillmentStatus, financialStatus) {
         if (fulfillmentStatus === 'fulfilled') return 'Fulfilled';
         if (fulfillmentStatus === 'partial') return 'Processing';
@@ -198,25 +423,4 @@ class ShopifyService {
     }
 }
 
-// Scheduler for automatic syncing
-class ShopifySyncScheduler {
-    static scheduleSync(tenantConfigs) {
-        // Run sync every hour
-        cron.schedule('0 * * * *', async () => {
-            console.log('Running scheduled Shopify sync...');
-
-            for (const config of tenantConfigs) {
-                try {
-                    const service = new ShopifyService(config.tenantId, config.shopifyConfig);
-                    await service.fullSync();
-                } catch (error) {
-                    console.error(`Scheduled sync failed for tenant ${config.tenantId}:`, error);
-                }
-            }
-        });
-
-        console.log('Shopify sync scheduler initialized - running every hour');
-    }
-}
-
-module.exports = { ShopifyService, ShopifySyncScheduler };
+module.exports = { ShopifyService };
@@ -0,0 +1,41 @@
+module.exports = (sequelize, DataTypes) => {
+  const SyncCheckpoint = sequelize.define('SyncCheckpoint', {
+    id: {
+      type: DataTypes.BIGINT,
+      autoIncrement: true,
+      primaryKey: true
+    },
+    tenant_id: {
+      type: DataTypes.STRING,
+      allowNull: false,
+      references: {
+        model: 'tenants',
+        key: 'id'
+      }
+    },
+    entity: {
+      type: DataTypes.STRING(32),
+      allowNull: false
+    },
+    high_water_mark: {
+      type: DataTypes.DATE,
+      allowNull: true
+    },
+    last_full_sync: {
+      type: DataTypes.DATE,
+      allowNull: true
+    },
+    // Job-specific state carried between runs
+    state: {
+      type: DataTypes.JSON,
+      allowNull: true
+    }
+  }, {
+    tableName: 'sync_checkpoints',
+    indexes: [
+      { unique: true, fields: ['tenant_id', 'entity'] }
+    ]
+  });
+
+  return SyncCheckpoint;
+};
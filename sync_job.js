@@ -0,0 +1,83 @@
+module.exports = (sequelize, DataTypes) => {
+  const SyncJob = sequelize.define('SyncJob', {
+    id: {
+      type: DataTypes.BIGINT,
+      autoIncrement: true,
+      primaryKey: true
+    },
+    tenant_id: {
+      type: DataTypes.STRING,
+      allowNull: false,
+      references: {
+        model: 'tenants',
+        key: 'id'
+      }
+    },
+    status: {
+      type: DataTypes.ENUM('queued', 'running', 'completed', 'failed'),
+      defaultValue: 'queued'
+    },
+    full: {
+      type: DataTypes.BOOLEAN,
+      defaultValue: false
+    },
+    bulk: {
+      type: DataTypes.BOOLEAN,
+      defaultValue: false
+    },
+    // 'job' for syncs enqueued through the API, 'schedule' for the scheduler
+    trigger: {
+      type: DataTypes.STRING(16),
+      allowNull: false,
+      defaultValue: 'job'
+    },
+    stage: {
+      type: DataTypes.STRING,
+      allowNull: true
+    },
+    records_processed: {
+      type: DataTypes.INTEGER,
+      defaultValue: 0
+    },
+    records_total: {
+      type: DataTypes.INTEGER,
+      allowNull: true
+    },
+    progress: {
+      type: DataTypes.JSON,
+      allowNull: true
+    },
+    result: {
+      type: DataTypes.JSON,
+      allowNull: true
+    },
+    error: {
+      type: DataTypes.TEXT,
+      allowNull: true
+    },
+    worker_id: {
+      type: DataTypes.STRING,
+      allowNull: true
+    },
+    started_at: {
+      type: DataTypes.DATE,
+      allowNull: true
+    },
+    heartbeat_at: {
+      type: DataTypes.DATE,
+      allowNull: true
+    },
+    finished_at: {
+      type: DataTypes.DATE,
+      allowNull: true
+    }
+  }, {
+    tableName: 'sync_jobs',
+    indexes: [
+      { fields: ['tenant_id', 'status'] },
+      { fields: ['status', 'created_at'] }
+    ]
+  });
+
+  return SyncJob;
+};
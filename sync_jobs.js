@@ -0,0 +1,255 @@
+const os = require('os');
+const { SyncJob, Tenant, sequelize } = require('../models');
+const { Op } = require('sequelize');
+const { ShopifyService } = require('./shopify_service');
+
+const POLL_INTERVAL_MS = 2000;
+const PROGRESS_INTERVAL_MS = 2000;
+// Running jobs without a heartbeat for this long are assumed orphaned by a
+// crashed worker and requeued
+const STALE_JOB_MS = 10 * 60 * 1000;
+// Running jobs refresh heartbeat_at on this interval for their whole
+// lifetime, including phases that write no progress (bulk export polling,
+// index scans, segmentation, long throttled stretches)
+const HEARTBEAT_INTERVAL_MS = 30 * 1000;
+
+// Enqueue a sync for a tenant. A queued or running job for the same tenant
+// is returned instead of creating a duplicate; a full or bulk request
+// upgrades a still-queued incremental job.
+async function enqueueSync(tenantId, { full = false, bulk = false } = {}) {
+    return sequelize.transaction(async (transaction) => {
+        const active = await lockActiveJob(tenantId, transaction);
+
+        if (active) {
+            if (active.status === 'queued' && ((full && !active.full) || (bulk && !active.bulk))) {
+                await active.update({ full: active.full || full, bulk: active.bulk || bulk }, { transaction });
+            }
+            return { job: active, coalesced: true };
+        }
+
+        const job = await SyncJob.create({ tenant_id: tenantId, full, bulk }, { transaction });
+        return { job, coalesced: false };
+    });
+}
+
+// The tenant's queued or running job, if any. Enqueues and scheduled
+// claims for the tenant are serialized on its row lock, so at most one
+// such job exists.
+async function lockActiveJob(tenantId, transaction) {
+    await Tenant.findByPk(tenantId, { lock: transaction.LOCK.UPDATE, transaction });
+
+    return SyncJob.findOne({
+        where: {
+            tenant_id: tenantId,
+            status: { [Op.in]: ['queued', 'running'] }
+        },
+        order: [['created_at', 'DESC']],
+        transaction
+    });
+}
+
+async function latestJob(tenantId) {
+    return SyncJob.findOne({
+        where: { tenant_id: tenantId },
+        order: [['created_at', 'DESC']]
+    });
+}
+
+// Public view of a job with an ETA extrapolated from throughput so far
+function describeJob(job) {
+    if (!job) return null;
+
+    let etaSeconds = null;
+    if (job.status === 'running' && job.started_at && job.records_total) {
+        const elapsed = (Date.now() - new Date(job.started_at).getTime()) / 1000;
+        const rate = job.records_processed / elapsed;
+        if (rate > 0) {
+            etaSeconds = Math.max(0, Math.round((job.records_total - job.records_processed) / rate));
+        }
+    }
+
+    return {
+        id: job.id,
+        status: job.status,
+        full: job.full,
+        bulk: job.bulk,
+        trigger: job.trigger,
+        stage: job.stage,
+        recordsProcessed: job.records_processed,
+        recordsTotal: job.records_total,
+        progress: job.progress,
+        etaSeconds,
+        queuedAt: job.created_at,
+        startedAt: job.started_at,
+        finishedAt: job.finished_at,
+        result: job.result,
+        error: job.error
+    };
+}
+
+// Polls sync_jobs and runs claimed jobs. Any number of workers, in the web
+// process or a separate one, can share the table: a job is claimed with a
+// conditional UPDATE so only one worker wins it.
+class SyncJobWorker {
+    constructor(options = {}) {
+        this.concurrency = options.concurrency || 1;
+        this.pollInterval = options.pollInterval || POLL_INTERVAL_MS;
+        this.workerId = `${os.hostname()}:${process.pid}`;
+        this.active = 0;
+        this.timer = null;
+    }
+
+    start() {
+        this.timer = setInterval(() => {
+            this.poll().catch(error => console.error('Sync job poll failed:', error));
+        }, this.pollInterval);
+        console.log(`Sync job worker ${this.workerId} started`);
+    }
+
+    stop() {
+        clearInterval(this.timer);
+        this.timer = null;
+    }
+
+    async poll() {
+        await this.requeueStale();
+
+        while (this.active < this.concurrency) {
+            const job = await this.claim();
+            if (!job) return;
+
+            this.active += 1;
+            this.run(job).finally(() => {
+                this.active -= 1;
+            });
+        }
+    }
+
+    async claim() {
+        const candidate = await SyncJob.findOne({
+            where: { status: 'queued' },
+            order: [['created_at', 'ASC']]
+        });
+        if (!candidate) return null;
+
+        const now = new Date();
+        const [claimed] = await SyncJob.update(
+            { status: 'running', worker_id: this.workerId, started_at: now, heartbeat_at: now },
+            { where: { id: candidate.id, status: 'queued' } }
+        );
+        // Another worker got there first; try again on the next loop
+        if (claimed !== 1) return this.claim();
+
+        return candidate.reload();
+    }
+
+    // Claim a tenant directly, as a job created already running, unless it
+    // has a queued or running job. The scheduler runs through this so the
+    // job table is the single per-tenant lock.
+    async claimTenant(tenantId, { trigger = 'job' } = {}) {
+        return sequelize.transaction(async (transaction) => {
+            if (await lockActiveJob(tenantId, transaction)) return null;
+
+            const now = new Date();
+            return SyncJob.create({
+                tenant_id: tenantId,
+                trigger,
+                status: 'running',
+                worker_id: this.workerId,
+                started_at: now,
+                heartbeat_at: now
+            }, { transaction });
+        });
+    }
+
+    async requeueStale() {
+        await SyncJob.update(
+            { status: 'queued', worker_id: null },
+            {
+                where: {
+                    status: 'running',
+                    heartbeat_at: { [Op.lt]: new Date(Date.now() - STALE_JOB_MS) }
+                }
+            }
+        );
+    }
+
+    // Updates the job only while this worker still owns it; a job requeued
+    // as stale and claimed elsewhere belongs to the new run
+    async updateOwned(job, values) {
+        const [updated] = await SyncJob.update(values, {
+            where: { id: job.id, worker_id: this.workerId, status: 'running' }
+        });
+        if (updated !== 1 && values.status) {
+            console.warn(`Sync job ${job.id} was taken over by another worker; not recording ${values.status}`);
+        }
+        return updated === 1;
+    }
+
+    // shopifyConfig overrides the credentials stored on the tenant
+    async run(job, shopifyConfig = null) {
+        let lastWrite = 0;
+        let writing = Promise.resolve();
+        const heartbeat = setInterval(() => {
+            this.updateOwned(job, { heartbeat_at: new Date() })
+                .catch(error => console.error(`Sync job ${job.id} heartbeat failed:`, error));
+        }, HEARTBEAT_INTERVAL_MS);
+
+        const onProgress = (progress) => {
+            const now = Date.now();
+            if (now - lastWrite < PROGRESS_INTERVAL_MS) return;
+            lastWrite = now;
+
+            const entities = Object.entries(progress);
+            writing = writing.then(() => this.updateOwned(job, {
+                stage: entities.filter(([, p]) => !p.done).map(([entity]) => entity).join(',') || 'finishing',
+                records_processed: entities.reduce((sum, [, p]) => sum + (p.processed || 0), 0),
+                records_total: entities.every(([, p]) => p.total !== null && p.total !== undefined)
+                    ? entities.reduce((sum, [, p]) => sum + p.total, 0)
+                    : null,
+                progress,
+                heartbeat_at: new Date()
+            })).catch(error => console.error(`Sync job ${job.id} progress update failed:`, error));
+        };
+
+        try {
+            const tenant = await Tenant.findByPk(job.tenant_id);
+            if (!tenant) {
+                throw new Error(`Tenant ${job.tenant_id} not found`);
+            }
+
+            const service = new ShopifyService(tenant.id, shopifyConfig || {
+                storeDomain: tenant.shopify_domain,
+                accessToken: tenant.shopify_access_token
+            });
+            const result = await service.fullSync({
+                full: job.full,
+                bulk: job.bulk,
+                onProgress,
+                trigger: job.trigger,
+                jobId: job.id
+            });
+
+            await writing;
+            await this.updateOwned(job, {
+                status: 'completed',
+                stage: 'done',
+                records_processed: result.customers + result.orders + result.products,
+                result,
+                finished_at: new Date()
+            });
+        } catch (error) {
+            console.error(`Sync job ${job.id} failed:`, error);
+            await writing;
+            await this.updateOwned(job, {
+                status: 'failed',
+                error: error.message,
+                finished_at: new Date()
+            }).catch(() => {});
+        } finally {
+            clearInterval(heartbeat);
+        }
+    }
+}
+
+module.exports = { enqueueSync, latestJob, describeJob, SyncJobWorker };
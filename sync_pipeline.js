@@ -0,0 +1,86 @@
+const { performance } = require('perf_hooks');
+
+const PAGE_SIZE = 250;
+
+// Async iterator over a Shopify REST collection, one page at a time,
+// using since_id paging
+async function* paginate(fetchPage, params = {}) {
+    let pageInfo = {};
+
+    while (true) {
+        const page = await fetchPage({
+            limit: PAGE_SIZE,
+            ...params,
+            ...pageInfo
+        });
+
+        if (page.length > 0) {
+            yield page;
+        }
+        if (page.length < PAGE_SIZE) return;
+
+        pageInfo = { since_id: page[page.length - 1].id };
+    }
+}
+
+// Keep up to `depth` pages requested ahead of the consumer so the fetch of
+// page N+1 overlaps the processing of page N. At most depth + 1 pages are
+// held in memory at once; the consumer's pace provides backpressure.
+async function* prefetch(source, depth = 1) {
+    const iterator = source[Symbol.asyncIterator]();
+    const pending = [];
+
+    const fill = () => {
+        while (pending.length < depth) {
+            const next = iterator.next();
+            // Rejections surface when the promise is awaited below
+            next.catch(() => {});
+            pending.push(next);
+        }
+    };
+
+    try {
+        while (true) {
+            fill();
+            const result = await pending.shift();
+            if (result.done) return;
+            fill();
+            yield result.value;
+        }
+    } finally {
+        if (iterator.return) {
+            await iterator.return();
+        }
+    }
+}
+
+// fetch -> transform -> write, page by page. onPage(count) is called
+// after each page is written. When given, timings accumulates the ms spent
+// waiting for pages (fetch time not hidden by prefetching), transforming
+// and writing.
+async function runPipeline({ source, transform, write, depth = 1, onPage, timings }) {
+    let count = 0;
+    const stage = timings || { fetchMs: 0, transformMs: 0, writeMs: 0 };
+    let mark = performance.now();
+
+    for await (const page of prefetch(source, depth)) {
+        const fetched = performance.now();
+        const rows = await transform(page);
+        const transformed = performance.now();
+        await write(rows);
+        const written = performance.now();
+
+        stage.fetchMs += fetched - mark;
+        stage.transformMs += transformed - fetched;
+        stage.writeMs += written - transformed;
+        mark = written;
+
+        count += page.length;
+        if (onPage) onPage(count);
+    }
+    stage.fetchMs += performance.now() - mark;
+
+    return count;
+}
+
+module.exports = { paginate, prefetch, runPipeline, PAGE_SIZE };
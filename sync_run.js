@@ -0,0 +1,89 @@
+module.exports = (sequelize, DataTypes) => {
+  // One row per sync run, with its timings and Shopify API usage
+  const SyncRun = sequelize.define('SyncRun', {
+    id: {
+      type: DataTypes.BIGINT,
+      autoIncrement: true,
+      primaryKey: true
+    },
+    tenant_id: {
+      type: DataTypes.STRING,
+      allowNull: false,
+      references: {
+        model: 'tenants',
+        key: 'id'
+      }
+    },
+    sync_job_id: {
+      type: DataTypes.BIGINT,
+      allowNull: true
+    },
+    // What started the run: 'job' (sync_jobs), 'schedule' or 'manual'
+    trigger: {
+      type: DataTypes.STRING(16),
+      allowNull: false
+    },
+    mode: {
+      type: DataTypes.STRING(16),
+      allowNull: false
+    },
+    status: {
+      type: DataTypes.ENUM('running', 'completed', 'failed'),
+      defaultValue: 'running'
+    },
+    started_at: {
+      type: DataTypes.DATE,
+      allowNull: false
+    },
+    finished_at: {
+      type: DataTypes.DATE,
+      allowNull: true
+    },
+    duration_ms: {
+      type: DataTypes.INTEGER,
+      allowNull: true
+    },
+    records: {
+      type: DataTypes.INTEGER,
+      defaultValue: 0
+    },
+    records_per_sec: {
+      type: DataTypes.INTEGER,
+      defaultValue: 0
+    },
+    api_calls: {
+      type: DataTypes.INTEGER,
+      defaultValue: 0
+    },
+    api_retries: {
+      type: DataTypes.INTEGER,
+      defaultValue: 0
+    },
+    throttle_wait_ms: {
+      type: DataTypes.INTEGER,
+      defaultValue: 0
+    },
+    backoff_wait_ms: {
+      type: DataTypes.INTEGER,
+      defaultValue: 0
+    },
+    // Per entity: count, duration, fetch/transform/write time, API usage
+    stages: {
+      type: DataTypes.JSON,
+      allowNull: true
+    },
+    error: {
+      type: DataTypes.TEXT,
+      allowNull: true
+    }
+  }, {
+    tableName: 'sync_runs',
+    timestamps: false,
+    indexes: [
+      { fields: ['tenant_id', 'started_at'] },
+      { fields: ['status', 'started_at'] }
+    ]
+  });
+
+  return SyncRun;
+};
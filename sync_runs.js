@@ -0,0 +1,141 @@
+const { SyncRun, sequelize } = require('../models');
+const { Op, QueryTypes } = require('sequelize');
+
+// Runs older than this are pruned from the tenant's history
+const RETENTION_DAYS = parseInt(process.env.SYNC_RUN_RETENTION_DAYS, 10) || 90;
+const MAX_LISTED_RUNS = 100;
+
+// Recording a run must never fail the sync itself
+async function startRun(tenantId, { trigger, mode, jobId = null }) {
+    try {
+        return await SyncRun.create({
+            tenant_id: tenantId,
+            sync_job_id: jobId,
+            trigger,
+            mode,
+            started_at: new Date()
+        });
+    } catch (error) {
+        console.error(`Failed to record sync run for tenant ${tenantId}:`, error.message);
+        return null;
+    }
+}
+
+// Close a run with its outcome. stages maps entity -> { count, ms,
+// fetchMs, transformMs, writeMs, api }; api is the client's call stats.
+async function finishRun(run, { stages = {}, api = {}, error = null }) {
+    if (!run) return;
+
+    const finishedAt = new Date();
+    const durationMs = finishedAt - run.started_at;
+    const records = Object.values(stages).reduce((sum, stage) => sum + (stage.count || 0), 0);
+
+    try {
+        await run.update({
+            status: error ? 'failed' : 'completed',
+            finished_at: finishedAt,
+            duration_ms: durationMs,
+            records,
+            records_per_sec: durationMs > 0 ? Math.round(records / (durationMs / 1000)) : records,
+            api_calls: api.calls || 0,
+            api_retries: api.retries || 0,
+            throttle_wait_ms: Math.round(api.throttleWaitMs || 0),
+            backoff_wait_ms: Math.round(api.backoffWaitMs || 0),
+            stages,
+            error: error ? error.message : null
+        });
+
+        await SyncRun.destroy({
+            where: {
+                tenant_id: run.tenant_id,
+                started_at: { [Op.lt]: new Date(Date.now() - RETENTION_DAYS * 24 * 60 * 60 * 1000) }
+            }
+        });
+    } catch (updateError) {
+        console.error(`Failed to record sync run ${run.id}:`, updateError.message);
+    }
+}
+
+async function recentRuns(tenantId, limit = 10) {
+    return SyncRun.findAll({
+        where: { tenant_id: tenantId },
+        order: [['started_at', 'DESC']],
+        limit: Math.min(Math.max(1, limit), MAX_LISTED_RUNS)
+    });
+}
+
+function describeRun(run) {
+    return {
+        id: run.id,
+        jobId: run.sync_job_id,
+        trigger: run.trigger,
+        mode: run.mode,
+        status: run.status,
+        startedAt: run.started_at,
+        finishedAt: run.finished_at,
+        durationMs: run.duration_ms,
+        records: run.records,
+        recordsPerSec: run.records_per_sec,
+        api: {
+            calls: run.api_calls,
+            retries: run.api_retries,
+            throttleWaitMs: run.throttle_wait_ms,
+            backoffWaitMs: run.backoff_wait_ms
+        },
+        stages: run.stages,
+        error: run.error
+    };
+}
+
+function percentile(sorted, p) {
+    if (sorted.length === 0) return null;
+    return sorted[Math.min(sorted.length - 1, Math.floor(p * sorted.length))];
+}
+
+// Aggregate over finished runs: how long syncs take and how much of that
+// is spent waiting on Shopify's call limit
+function summarizeRuns(runs) {
+    const finished = runs.filter(run => run.status !== 'running');
+    const completed = finished.filter(run => run.status === 'completed');
+    const durations = completed.map(run => run.duration_ms).sort((a, b) => a - b);
+    const totalMs = completed.reduce((sum, run) => sum + run.duration_ms, 0);
+    const throttleMs = completed.reduce((sum, run) => sum + run.throttle_wait_ms, 0);
+
+    return {
+        runs: finished.length,
+        failed: finished.length - completed.length,
+        p50DurationMs: percentile(durations, 0.5),
+        p95DurationMs: percentile(durations, 0.95),
+        avgRecordsPerSec: completed.length
+            ? Math.round(completed.reduce((sum, run) => sum + run.records_per_sec, 0) / completed.length)
+            : null,
+        // Share of run time spent waiting for call-limit headroom
+        throttleShare: totalMs > 0 ? Math.round((throttleMs / totalMs) * 1000) / 1000 : null
+    };
+}
+
+// Duration of each tenant's latest completed run, by tenant id
+async function lastRunDurations() {
+    const rows = await sequelize.query(`
+        SELECT r.tenant_id, r.duration_ms
+        FROM sync_runs r
+        JOIN (
+            SELECT tenant_id, MAX(started_at) AS started_at
+            FROM sync_runs
+            WHERE status = 'completed'
+            GROUP BY tenant_id
+        ) latest ON latest.tenant_id = r.tenant_id AND latest.started_at = r.started_at
+        WHERE r.status = 'completed'
+    `, { type: QueryTypes.SELECT });
+
+    return new Map(rows.map(row => [row.tenant_id, row.duration_ms]));
+}
+
+module.exports = {
+    startRun,
+    finishRun,
+    recentRuns,
+    describeRun,
+    summarizeRuns,
+    lastRunDurations
+};
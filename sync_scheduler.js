@@ -0,0 +1,151 @@
+const { Tenant } = require('../models');
+const { Op } = require('sequelize');
+const { SyncJobWorker } = require('./sync_jobs');
+const { lastRunDurations } = require('./sync_runs');
+const cron = require('node-cron');
+
+const SYNC_CONCURRENCY = parseInt(process.env.SYNC_CONCURRENCY, 10) || 4;
+// Tenants whose last run took longer than this count as heavy
+const HEAVY_SYNC_MS = 5 * 60 * 1000;
+
+// Scheduler for automatic syncing. Every tenant gets a stable minute of the
+// hour (plus up to a minute of jitter) so load is spread across the hour
+// instead of landing at minute zero. Runs go through a bounded pool that
+// never starts a second run for a tenant that is still queued or running,
+// and heavy tenants may hold at most concurrency - 1 slots so small
+// tenants always have one to use. Each run is a sync_jobs row created
+// already running, so a job enqueued during it coalesces into it instead
+// of being claimed by a worker at the same time.
+class ShopifySyncScheduler {
+    constructor(tenantConfigs = null, options = {}) {
+        this.tenantConfigs = tenantConfigs;
+        this.concurrency = options.concurrency || SYNC_CONCURRENCY;
+        this.maxHeavy = Math.max(1, this.concurrency - 1);
+        this.queue = [];
+        this.pending = new Set();
+        this.running = new Map();
+        this.lastDurations = new Map();
+        this.worker = new SyncJobWorker();
+    }
+
+    // Start the hourly schedule. Without tenantConfigs, connected tenants
+    // are loaded from the Tenant table on every tick.
+    static scheduleSync(tenantConfigs = null, options = {}) {
+        const scheduler = new ShopifySyncScheduler(tenantConfigs, options);
+        scheduler.start();
+        return scheduler;
+    }
+
+    start() {
+        // Seed heavy-tenant detection from the run history, so it holds
+        // across restarts and leader changes
+        lastRunDurations()
+            .then((durations) => {
+                for (const [tenantId, ms] of durations) {
+                    if (!this.lastDurations.has(tenantId)) this.lastDurations.set(tenantId, ms);
+                }
+            })
+            .catch(error => console.error('Failed to load sync run durations:', error.message));
+
+        this.task = cron.schedule('* * * * *', () => {
+            this.tick().catch(error => console.error('Scheduled sync tick failed:', error));
+        });
+        console.log(`Shopify sync scheduler initialized - ticking every minute, each tenant hourly at its hashed minute slot (concurrency ${this.concurrency})`);
+    }
+
+    stop() {
+        if (this.task) this.task.stop();
+    }
+
+    async tick() {
+        const minute = new Date().getMinutes();
+        const configs = await this.loadTenantConfigs();
+
+        for (const config of configs) {
+            if (slotMinute(config.tenantId) !== minute) continue;
+            setTimeout(() => this.enqueue(config), Math.random() * 60 * 1000);
+        }
+    }
+
+    async loadTenantConfigs() {
+        if (this.tenantConfigs) return this.tenantConfigs;
+
+        const tenants = await Tenant.findAll({
+            attributes: ['id', 'shopify_domain', 'shopify_access_token'],
+            where: {
+                status: 'active',
+                shopify_domain: { [Op.ne]: null },
+                shopify_access_token: { [Op.ne]: null }
+            },
+            raw: true
+        });
+
+        return tenants.map(tenant => ({
+            tenantId: tenant.id,
+            shopifyConfig: {
+                storeDomain: tenant.shopify_domain,
+                accessToken: tenant.shopify_access_token
+            }
+        }));
+    }
+
+    enqueue(config) {
+        const { tenantId } = config;
+        if (this.pending.has(tenantId) || this.running.has(tenantId)) {
+            console.log(`Skipping scheduled sync for tenant ${tenantId}: previous run not finished`);
+            return;
+        }
+        this.pending.add(tenantId);
+        this.queue.push(config);
+        this.drain();
+    }
+
+    isHeavy(tenantId) {
+        return (this.lastDurations.get(tenantId) || 0) > HEAVY_SYNC_MS;
+    }
+
+    drain() {
+        while (this.running.size < this.concurrency) {
+            const heavyRunning = [...this.running.values()].filter(Boolean).length;
+            const index = this.queue.findIndex(config =>
+                !this.isHeavy(config.tenantId) || heavyRunning < this.maxHeavy);
+            if (index === -1) return;
+
+            const [config] = this.queue.splice(index, 1);
+            this.pending.delete(config.tenantId);
+            this.run(config);
+        }
+    }
+
+    async run(config) {
+        const { tenantId } = config;
+        this.running.set(tenantId, this.isHeavy(tenantId));
+        const started = Date.now();
+
+        try {
+            const job = await this.worker.claimTenant(tenantId, { trigger: 'schedule' });
+            if (!job) {
+                console.log(`Skipping scheduled sync for tenant ${tenantId}: a sync job is already queued or running`);
+                return;
+            }
+            await this.worker.run(job, config.shopifyConfig);
+        } catch (error) {
+            console.error(`Scheduled sync failed for tenant ${tenantId}:`, error);
+        } finally {
+            this.lastDurations.set(tenantId, Date.now() - started);
+            this.running.delete(tenantId);
+            this.drain();
+        }
+    }
+}
+
+// Stable minute of the hour for a tenant
+function slotMinute(tenantId) {
+    let hash = 0;
+    for (const char of String(tenantId)) {
+        hash = (hash * 31 + char.charCodeAt(0)) >>> 0;
+    }
+    return hash % 60;
+}
+
+module.exports = { ShopifySyncScheduler };
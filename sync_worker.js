@@ -0,0 +1,25 @@
+// Standalone sync job worker: node scripts/sync_worker.js
+// Run alongside web processes started with SYNC_WORKER=external.
+require('dotenv').config();
+const { sequelize } = require('../models');
+const { SyncJobWorker } = require('../services/sync_jobs');
+
+(async () => {
+  try {
+    await sequelize.authenticate();
+
+    const worker = new SyncJobWorker({
+      concurrency: parseInt(process.env.SYNC_WORKER_CONCURRENCY, 10) || 2
+    });
+    worker.start();
+
+    process.on('SIGTERM', async () => {
+      worker.stop();
+      await sequelize.close();
+      process.exit(0);
+    });
+  } catch (err) {
+    console.error(err);
+    process.exit(1);
+  }
+})();
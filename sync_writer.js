@@ -0,0 +1,101 @@
+const { Customer, Order, Product, sequelize } = require('../models');
+const { bumpDataVersion } = require('./metrics_cache');
+
+const DEFAULT_BATCH_SIZE = 500;
+
+// Natural keys backed by the (tenant_id, shopify_*_id) unique indexes.
+// Every other normalized column is overwritten on duplicate. Child fields
+// (e.g. an order's line items) are not columns; they are left out of the
+// INSERT and reach the hooks on the chunk rows.
+const ENTITIES = {
+    customers: {
+        model: Customer,
+        keys: ['tenant_id', 'shopify_customer_id']
+    },
+    orders: {
+        model: Order,
+        keys: ['tenant_id', 'shopify_order_id'],
+        children: ['line_items']
+    },
+    products: {
+        model: Product,
+        keys: ['tenant_id', 'shopify_product_id', 'shopify_variant_id']
+    }
+};
+
+// Batched write stage for Shopify sync: groups normalized rows into chunks
+// and writes each chunk as one multi-row INSERT ... ON DUPLICATE KEY UPDATE.
+class SyncWriter {
+    constructor(tenantId, options = {}) {
+        this.tenantId = tenantId;
+        this.batchSize = options.batchSize
+            || parseInt(process.env.SYNC_BATCH_SIZE, 10)
+            || DEFAULT_BATCH_SIZE;
+        this.stats = {};
+        this.hooks = [];
+    }
+
+    // Register fn(entity, chunk, transaction), run after each chunk is
+    // written and inside the same transaction
+    addHook(fn) {
+        this.hooks.push(fn);
+    }
+
+    // Write rows for an entity, one statement per chunk of batchSize rows
+    async write(entity, rows) {
+        for (let i = 0; i < rows.length; i += this.batchSize) {
+            await this.writeChunk(entity, rows.slice(i, i + this.batchSize));
+        }
+        return rows.length;
+    }
+
+    async writeChunk(entity, chunk) {
+        if (chunk.length === 0) return;
+
+        const { model, keys, children = [] } = ENTITIES[entity];
+        const records = children.length > 0 ? chunk.map(row => withoutFields(row, children)) : chunk;
+        const updateOnDuplicate = Object.keys(records[0])
+            .filter(field => !keys.includes(field))
+            .concat('updated_at');
+
+        const started = process.hrtime.bigint();
+        await sequelize.transaction(async (transaction) => {
+            await model.bulkCreate(records, {
+                updateOnDuplicate,
+                transaction,
+                validate: false,
+                hooks: false
+            });
+            for (const hook of this.hooks) {
+                await hook(entity, chunk, transaction);
+            }
+        });
+        const elapsedMs = Number(process.hrtime.bigint() - started) / 1e6;
+        // After commit, so no request caches pre-commit data at the new version
+        await bumpDataVersion(this.tenantId);
+
+        const stats = this.stats[entity] || (this.stats[entity] = { rows: 0, statements: 0, ms: 0 });
+        stats.rows += chunk.length;
+        stats.statements += 1;
+        stats.ms += elapsedMs;
+    }
+
+    // Rows/sec of DB write time for an entity
+    report(entity) {
+        const stats = this.stats[entity] || { rows: 0, statements: 0, ms: 0 };
+        return {
+            rows: stats.rows,
+            statements: stats.statements,
+            writeMs: Math.round(stats.ms),
+            rowsPerSec: stats.ms > 0 ? Math.round(stats.rows / (stats.ms / 1000)) : 0
+        };
+    }
+}
+
+function withoutFields(row, fields) {
+    const copy = { ...row };
+    for (const field of fields) delete copy[field];
+    return copy;
+}
+
+module.exports = { SyncWriter, ENTITIES, DEFAULT_BATCH_SIZE };
@@ -0,0 +1,236 @@
+// Deterministic synthetic store data. Every record is a pure function of
+// (seed, index), so any slice of a million-record store can be produced
+// without generating (or holding) the records before it.
+
+const FIRST_NAMES = ['Sarah', 'Mike', 'Emma', 'David', 'Lisa', 'Alex', 'Jessica', 'Robert', 'Amanda', 'James',
+  'Maria', 'John', 'Kate', 'Tom', 'Susan', 'Priya', 'Wei', 'Carlos', 'Fatima', 'Noah'];
+const LAST_NAMES = ['Johnson', 'Chen', 'Wilson', 'Brown', 'Anderson', 'Rodriguez', 'Park', 'Kim', 'Lee', 'Garcia',
+  'Smith', 'Williams', 'Davis', 'Patel', 'Nguyen', 'Martin', 'Khan', 'Silva', 'Muller', 'Rossi'];
+const CITIES = [['New York', 'United States'], ['Los Angeles', 'United States'], ['Chicago', 'United States'],
+  ['Toronto', 'Canada'], ['London', 'United Kingdom'], ['Berlin', 'Germany'], ['Sydney', 'Australia'],
+  ['Mumbai', 'India'], ['Paris', 'France'], ['Austin', 'United States']];
+const CATEGORIES = ['Apparel', 'Electronics', 'Home & Garden', 'Beauty', 'Sports', 'Toys', 'Books', 'Accessories'];
+const ADJECTIVES = ['Classic', 'Premium', 'Eco', 'Smart', 'Vintage', 'Essential', 'Deluxe', 'Compact'];
+const NOUNS = ['T-Shirt', 'Headphones', 'Lamp', 'Serum', 'Water Bottle', 'Backpack', 'Notebook', 'Sneakers',
+  'Charger', 'Candle', 'Jacket', 'Mug'];
+const SIZES = ['S', 'M', 'L', 'XL'];
+
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+// Uniform [0, 1) from a seed and integer keys (murmur3-style finalizer)
+function random(seed, ...keys) {
+  let h = seed >>> 0;
+  for (const key of keys) {
+    h = Math.imul(h ^ (key >>> 0), 0x85ebca6b);
+    h = Math.imul(h ^ Math.floor(key / 4294967296), 0xc2b2ae35);
+    h ^= h >>> 13;
+  }
+  h = Math.imul(h ^ (h >>> 16), 0x85ebca6b);
+  h = Math.imul(h ^ (h >>> 13), 0xc2b2ae35);
+  h ^= h >>> 16;
+  return (h >>> 0) / 4294967296;
+}
+
+function pick(list, r) {
+  return list[Math.floor(r * list.length)];
+}
+
+// Pareto-distributed value >= min; smaller alpha gives a heavier tail
+function pareto(r, min, alpha) {
+  return min / Math.pow(1 - r, 1 / alpha);
+}
+
+// Index in [0, n) skewed toward 0 (a few records get most of the picks)
+function skewedIndex(r, n, exponent = 2) {
+  return Math.min(n - 1, Math.floor(Math.pow(r, exponent) * n));
+}
+
+// Weighted choice from [[value, weight], ...] with weights summing to 1
+function weighted(choices, r) {
+  let acc = 0;
+  for (const [value, weight] of choices) {
+    acc += weight;
+    if (r < acc) return value;
+  }
+  return choices[choices.length - 1][0];
+}
+
+// Order time within [start, end]: volume grows over the span, with a
+// weekly cycle and a November-December peak. Sampled by rejection against
+// the seasonal weight, deterministically per index.
+function seasonalTime(seed, index, start, end) {
+  for (let attempt = 0; ; attempt++) {
+    const t = start + random(seed, index, 7, attempt) * (end - start);
+    const date = new Date(t);
+    const month = date.getUTCMonth();
+    const weight = (0.6 + 0.4 * ((t - start) / (end - start)))
+      * (month === 10 || month === 11 ? 1.8 : 1)
+      * (date.getUTCDay() === 0 || date.getUTCDay() === 6 ? 1.2 : 1);
+    if (random(seed, index, 8, attempt) * 2.16 < weight || attempt > 20) return t;
+  }
+}
+
+const FINANCIAL_STATUSES = [['paid', 0.85], ['pending', 0.05], ['partially_refunded', 0.04],
+  ['refunded', 0.03], ['voided', 0.03]];
+const FULFILLMENT_STATUSES = [['fulfilled', 0.7], ['partial', 0.05], [null, 0.25]];
+
+// Shape of a store: record counts, id ranges and the time span covered
+function storeLayout({ seed = 1, records = 10000, customers, orders, products, end = Date.UTC(2025, 0, 1), days = 730 }) {
+  const customerCount = customers ?? Math.max(1, Math.round(records * 0.25));
+  const productCount = products ?? Math.max(1, Math.round(records * 0.05));
+  const orderCount = orders ?? Math.max(0, records - customerCount - productCount);
+  return {
+    seed,
+    customers: customerCount,
+    orders: orderCount,
+    products: productCount,
+    start: end - days * DAY_MS,
+    end,
+    ids: {
+      customer: 1000000000,
+      order: 2000000000,
+      product: 3000000000,
+      variant: 4000000000,
+      lineItem: 5000000000
+    }
+  };
+}
+
+function variantCount(layout, productIndex) {
+  return 1 + Math.floor(random(layout.seed, productIndex, 31) * 3);
+}
+
+function variantPrice(layout, productIndex) {
+  return Math.round(pareto(random(layout.seed, productIndex, 32), 8, 1.6) * 100) / 100;
+}
+
+// REST payloads, as the Admin API returns them
+
+function customerAt(layout, index) {
+  const { seed } = layout;
+  const createdAt = layout.start + (index / layout.customers) * (layout.end - layout.start) * 0.9;
+  const updatedAt = createdAt + random(seed, index, 3) * (layout.end - createdAt);
+  const [city, country] = pick(CITIES, random(seed, index, 4));
+  // Spend and order count follow a power law: most customers buy once,
+  // a few account for a large share of revenue
+  const ordersCount = Math.max(1, Math.floor(pareto(random(seed, index, 5), 1, 1.3)));
+  const totalSpent = ordersCount * pareto(random(seed, index, 6), 20, 2.2);
+
+  return {
+    id: layout.ids.customer + index,
+    first_name: pick(FIRST_NAMES, random(seed, index, 1)),
+    last_name: pick(LAST_NAMES, random(seed, index, 2)),
+    email: `customer${index}@example.com`,
+    phone: random(seed, index, 9) < 0.6 ? `+1555${String(index % 10000000).padStart(7, '0')}` : null,
+    tags: random(seed, index, 10) < 0.1 ? 'wholesale' : '',
+    orders_count: ordersCount,
+    total_spent: totalSpent.toFixed(2),
+    default_address: random(seed, index, 11) < 0.9 ? { city, country } : null,
+    created_at: new Date(createdAt).toISOString(),
+    updated_at: new Date(updatedAt).toISOString()
+  };
+}
+
+function productAt(layout, index) {
+  const { seed } = layout;
+  const count = variantCount(layout, index);
+  const price = variantPrice(layout, index);
+  const createdAt = layout.start + random(seed, index, 33) * (layout.end - layout.start) * 0.5;
+  const updatedAt = createdAt + random(seed, index, 34) * (layout.end - createdAt);
+
+  return {
+    id: layout.ids.product + index,
+    title: `${pick(ADJECTIVES, random(seed, index, 35))} ${pick(NOUNS, random(seed, index, 36))} ${index}`,
+    product_type: pick(CATEGORIES, random(seed, index, 37)),
+    status: weighted([['active', 0.9], ['draft', 0.05], ['archived', 0.05]], random(seed, index, 38)),
+    created_at: new Date(createdAt).toISOString(),
+    updated_at: new Date(updatedAt).toISOString(),
+    variants: Array.from({ length: count }, (_, v) => ({
+      id: layout.ids.variant + index * 4 + v,
+      product_id: layout.ids.product + index,
+      title: count === 1 ? 'Default Title' : SIZES[v],
+      price: price.toFixed(2),
+      sku: `SKU-${index}-${v}`,
+      inventory_quantity: Math.floor(random(seed, index, 40 + v) * 500)
+    }))
+  };
+}
+
+function orderAt(layout, index) {
+  const { seed } = layout;
+  const createdAt = seasonalTime(seed, index, layout.start, layout.end);
+  const updatedAt = createdAt + random(seed, index, 12) * Math.min(30 * DAY_MS, layout.end - createdAt);
+  // Repeat buyers: low customer indexes place most orders; 3% are guests
+  const guest = random(seed, index, 13) < 0.03;
+  const customerIndex = skewedIndex(random(seed, index, 14), layout.customers, 2.5);
+  const financialStatus = weighted(FINANCIAL_STATUSES, random(seed, index, 15));
+  const fulfillmentStatus = weighted(FULFILLMENT_STATUSES, random(seed, index, 16));
+
+  const lineCount = Math.floor(pareto(random(seed, index, 17), 1, 2.5));
+  const lineItems = Array.from({ length: Math.min(8, lineCount) }, (_, k) => {
+    const productIndex = skewedIndex(random(seed, index, 20 + k), layout.products, 2);
+    const variant = Math.floor(random(seed, index, 30 + k) * variantCount(layout, productIndex));
+    const price = variantPrice(layout, productIndex);
+    const quantity = Math.floor(pareto(random(seed, index, 40 + k), 1, 3));
+    const discount = random(seed, index, 50 + k) < 0.15 ? price * quantity * 0.1 : 0;
+    return {
+      id: layout.ids.lineItem + index * 8 + k,
+      product_id: layout.ids.product + productIndex,
+      variant_id: layout.ids.variant + productIndex * 4 + variant,
+      sku: `SKU-${productIndex}-${variant}`,
+      quantity,
+      price: price.toFixed(2),
+      total_discount: discount.toFixed(2)
+    };
+  });
+
+  const refunds = [];
+  if (financialStatus === 'refunded' || financialStatus === 'partially_refunded') {
+    const refunded = financialStatus === 'refunded' ? lineItems : lineItems.slice(0, 1);
+    refunds.push({
+      refund_line_items: refunded.map(item => ({
+        line_item_id: item.id,
+        quantity: item.quantity,
+        subtotal: (parseFloat(item.price) * item.quantity - parseFloat(item.total_discount)).toFixed(2)
+      }))
+    });
+  }
+
+  const total = lineItems.reduce((sum, item) =>
+    sum + parseFloat(item.price) * item.quantity - parseFloat(item.total_discount), 0);
+  const customer = guest ? null : customerAt(layout, customerIndex);
+
+  return {
+    id: layout.ids.order + index,
+    order_number: 1001 + index,
+    created_at: new Date(createdAt).toISOString(),
+    updated_at: new Date(updatedAt).toISOString(),
+    currency: 'USD',
+    total_price: total.toFixed(2),
+    financial_status: financialStatus,
+    fulfillment_status: fulfillmentStatus,
+    customer: customer && { id: customer.id, first_name: customer.first_name, last_name: customer.last_name },
+    line_items: lineItems,
+    refunds
+  };
+}
+
+module.exports = {
+  random,
+  pick,
+  pareto,
+  skewedIndex,
+  weighted,
+  seasonalTime,
+  storeLayout,
+  customerAt,
+  orderAt,
+  productAt,
+  FIRST_NAMES,
+  LAST_NAMES,
+  CITIES,
+  CATEGORIES,
+  FINANCIAL_STATUSES,
+  FULFILLMENT_STATUSES,
+  DAY_MS
+};
@@ -0,0 +1,463 @@
+const { AsyncLocalStorage } = require('async_hooks');
+const { monitorEventLoopDelay, performance } = require('perf_hooks');
+const cluster = require('cluster');
+
+// Upper bounds (seconds) of the latency histogram buckets
+const BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10];
+const QUANTILES = [0.5, 0.95, 0.99];
+// Quantiles are reported over the last one to two windows
+const WINDOW_MS = parseInt(process.env.TELEMETRY_WINDOW_MS, 10) || 60 * 1000;
+// Caps on distinct series; the rest are counted under 'other'
+const MAX_ROUTES = 200;
+const MAX_QUERY_GROUPS = parseInt(process.env.TELEMETRY_MAX_QUERIES, 10) || 200;
+// Only the head of long statements (bulk inserts) is normalized
+const SQL_SAMPLE_CHARS = 2000;
+
+const ACCESS_LOG_SAMPLE_RATE = parseFloat(process.env.ACCESS_LOG_SAMPLE_RATE
+    || (process.env.NODE_ENV === 'production' ? '0.01' : '1'));
+const ACCESS_LOG_SLOW_MS = parseInt(process.env.ACCESS_LOG_SLOW_MS, 10) || 1000;
+const ACCESS_LOG_FLUSH_MS = 1000;
+const ACCESS_LOG_MAX_LINES = 200;
+
+// Fixed-bucket histogram: O(buckets) to record, mergeable across
+// processes, quantiles interpolated within a bucket
+class Histogram {
+    constructor(json) {
+        this.counts = json ? [...json.counts] : new Array(BUCKETS.length + 1).fill(0);
+        this.sum = json ? json.sum : 0;
+        this.count = json ? json.count : 0;
+        this.max = json ? json.max : 0;
+    }
+
+    observe(seconds) {
+        let i = 0;
+        while (i < BUCKETS.length && seconds > BUCKETS[i]) i++;
+        this.counts[i] += 1;
+        this.sum += seconds;
+        this.count += 1;
+        if (seconds > this.max) this.max = seconds;
+    }
+
+    merge(other) {
+        for (let i = 0; i < this.counts.length; i++) this.counts[i] += other.counts[i];
+        this.sum += other.sum;
+        this.count += other.count;
+        this.max = Math.max(this.max, other.max);
+        return this;
+    }
+
+    quantile(q) {
+        if (this.count === 0) return 0;
+        const rank = q * this.count;
+        let seen = 0;
+        for (let i = 0; i < this.counts.length; i++) {
+            if (this.counts[i] > 0 && seen + this.counts[i] >= rank) {
+                const lower = i === 0 ? 0 : BUCKETS[i - 1];
+                const upper = i < BUCKETS.length ? BUCKETS[i] : this.max;
+                return Math.min(this.max, lower + (upper - lower) * ((rank - seen) / this.counts[i]));
+            }
+            seen += this.counts[i];
+        }
+        return this.max;
+    }
+
+    toJSON() {
+        return { counts: this.counts, sum: this.sum, count: this.count, max: this.max };
+    }
+}
+
+// Cumulative histogram (exported as buckets) plus the current and previous
+// window, which the quantiles are computed from
+class Series {
+    constructor() {
+        this.total = new Histogram();
+        this.current = new Histogram();
+        this.previous = new Histogram();
+    }
+
+    observe(seconds) {
+        this.total.observe(seconds);
+        this.current.observe(seconds);
+    }
+
+    rotate() {
+        this.previous = this.current;
+        this.current = new Histogram();
+    }
+
+    toJSON() {
+        return {
+            total: this.total.toJSON(),
+            recent: new Histogram(this.previous).merge(this.current).toJSON()
+        };
+    }
+}
+
+// Series keyed by label values, capped at max distinct keys
+class SeriesMap {
+    constructor(max, create) {
+        this.max = max;
+        this.create = create;
+        this.entries = new Map();
+    }
+
+    get(key, labels) {
+        let entry = this.entries.get(key);
+        if (!entry) {
+            if (this.entries.size >= this.max && key !== 'other') {
+                return this.get('other', { ...labels, overflow: true });
+            }
+            entry = this.create(labels);
+            this.entries.set(key, entry);
+        }
+        return entry;
+    }
+
+    values() {
+        return this.entries.values();
+    }
+}
+
+const routes = new SeriesMap(MAX_ROUTES, labels => ({
+    method: labels.method,
+    route: labels.overflow ? 'other' : labels.route,
+    statuses: {},
+    duration: new Series(),
+    db: new Series()
+}));
+const queries = new SeriesMap(MAX_QUERY_GROUPS, labels => ({
+    sql: labels.overflow ? 'other' : labels.sql,
+    duration: new Series()
+}));
+const poolWait = new Series();
+
+const eventLoopDelay = monitorEventLoopDelay({ resolution: 10 });
+eventLoopDelay.enable();
+let eventLoop = { p50: 0, p99: 0, max: 0, utilization: 0 };
+let lastUtilization = performance.eventLoopUtilization();
+
+// Request context, so query time can be charged to the request running it
+const requestContext = new AsyncLocalStorage();
+
+let sequelizeInstance = null;
+
+setInterval(() => {
+    for (const route of routes.values()) {
+        route.duration.rotate();
+        route.db.rotate();
+    }
+    for (const query of queries.values()) query.duration.rotate();
+    poolWait.rotate();
+
+    const utilization = performance.eventLoopUtilization(lastUtilization);
+    lastUtilization = performance.eventLoopUtilization();
+    eventLoop = {
+        p50: eventLoopDelay.percentile(50) / 1e9,
+        p99: eventLoopDelay.percentile(99) / 1e9,
+        max: eventLoopDelay.max / 1e9,
+        utilization: utilization.utilization
+    };
+    eventLoopDelay.reset();
+}, WINDOW_MS).unref();
+
+// Literals become ?, IN lists and VALUES rows collapse, so statements
+// differing only in their values share a group
+function normalizeSql(sql) {
+    return sql.slice(0, SQL_SAMPLE_CHARS)
+        .replace(/^Execut(?:ed|ing) \([^)]*\): /, '')
+        .replace(/'(?:[^'\\]|\\.)*'/g, '?')
+        .replace(/\b\d+(?:\.\d+)?\b/g, '?')
+        .replace(/\(\s*(?:\?|NULL)(?:\s*,\s*(?:\?|NULL))*\s*\)/gi, '(?+)')
+        .replace(/\(\?\+\)(?:\s*,\s*\(\?\+\))+/g, '(?+), ...')
+        .replace(/\s+/g, ' ')
+        .trim();
+}
+
+function recordQuery(sql, ms) {
+    const seconds = ms / 1000;
+    const key = normalizeSql(sql);
+    queries.get(key, { sql: key }).duration.observe(seconds);
+
+    const context = requestContext.getStore();
+    if (context) {
+        context.dbSeconds += seconds;
+        context.queries += 1;
+    }
+}
+
+// Time every query (Sequelize's benchmark option passes the duration to the
+// logging callback; any configured logger still runs) and the wait for a
+// pooled connection
+function instrumentSequelize(sequelize) {
+    const log = sequelize.options.logging;
+    sequelize.options.benchmark = true;
+    sequelize.options.logging = (sql, ms) => {
+        if (typeof ms === 'number') recordQuery(sql, ms);
+        if (typeof log === 'function') log(sql, ms);
+    };
+
+    const manager = sequelize.connectionManager;
+    const getConnection = manager.getConnection.bind(manager);
+    manager.getConnection = async (options) => {
+        const start = process.hrtime.bigint();
+        try {
+            return await getConnection(options);
+        } finally {
+            poolWait.observe(Number(process.hrtime.bigint() - start) / 1e9);
+        }
+    };
+
+    sequelizeInstance = sequelize;
+}
+
+// Label for the route a request matched, built from the mount pattern so
+// tenants share series: the tenant segment becomes :tenantId (req.tenantId
+// once tenantContext ran, else the app-level :tenantId param, e.g. on a
+// 401) and numeric and uuid-like segments become :id
+function routeName(req) {
+    let tenantId = req.tenantId || (req.params && req.params.tenantId);
+    const base = (req.baseUrl || '').split('/').map((segment) => {
+        if (tenantId !== undefined && segment !== '' && safeDecode(segment) === String(tenantId)) {
+            tenantId = undefined;
+            return ':tenantId';
+        }
+        return /^(?:\d+|[0-9a-f-]{16,})$/i.test(segment) ? ':id' : segment;
+    }).join('/');
+    if (req.route) return base + req.route.path;
+    return base ? `${base}/*` : 'other';
+}
+
+function safeDecode(segment) {
+    try {
+        return decodeURIComponent(segment);
+    } catch (error) {
+        return segment;
+    }
+}
+
+class AccessLog {
+    constructor() {
+        this.lines = [];
+        setInterval(() => this.flush(), ACCESS_LOG_FLUSH_MS).unref();
+    }
+
+    push(line) {
+        this.lines.push(line);
+        if (this.lines.length >= ACCESS_LOG_MAX_LINES) this.flush();
+    }
+
+    // One write per batch instead of a console.log per request
+    flush() {
+        if (this.lines.length === 0) return;
+        process.stdout.write(`${this.lines.join('\n')}\n`);
+        this.lines = [];
+    }
+}
+
+const accessLog = new AccessLog();
+
+// Times each request into its route's histogram, with the time spent in
+// queries alongside. The access log keeps a sample of requests, plus every
+// server error and slow request.
+function instrumentRequests(req, res, next) {
+    const start = process.hrtime.bigint();
+    const context = { dbSeconds: 0, queries: 0 };
+
+    res.once('close', () => {
+        const seconds = Number(process.hrtime.bigint() - start) / 1e9;
+        const status = res.writableFinished ? `${Math.floor(res.statusCode / 100)}xx` : 'aborted';
+        const route = routeName(req);
+        const series = routes.get(`${req.method} ${route}`, { method: req.method, route });
+        series.statuses[status] = (series.statuses[status] || 0) + 1;
+        series.duration.observe(seconds);
+        series.db.observe(context.dbSeconds);
+
+        const ms = seconds * 1000;
+        if (res.statusCode >= 500 || ms >= ACCESS_LOG_SLOW_MS || Math.random() < ACCESS_LOG_SAMPLE_RATE) {
+            accessLog.push(`${new Date().toISOString()} - ${req.method} ${req.originalUrl.split('?')[0]} `
+                + `${res.writableFinished ? res.statusCode : 'aborted'} ${ms.toFixed(1)}ms `
+                + `db=${(context.dbSeconds * 1000).toFixed(1)}ms/${context.queries}q - IP: ${req.ip}`);
+        }
+    });
+
+    requestContext.run(context, next);
+}
+
+function poolState() {
+    const pool = sequelizeInstance && sequelizeInstance.connectionManager.pool;
+    if (!pool || typeof pool.size !== 'number') return null;
+    return { size: pool.size, available: pool.available, using: pool.using, waiting: pool.waiting };
+}
+
+// Everything this process has recorded, as plain JSON; snapshots of all
+// cluster workers can be combined with mergeSnapshots
+function snapshot() {
+    const memory = process.memoryUsage();
+    return {
+        routes: [...routes.values()].map(r => ({
+            method: r.method,
+            route: r.route,
+            statuses: { ...r.statuses },
+            duration: r.duration.toJSON(),
+            db: r.db.toJSON()
+        })),
+        queries: [...queries.values()].map(q => ({ sql: q.sql, duration: q.duration.toJSON() })),
+        poolWait: poolWait.toJSON(),
+        processes: [{
+            worker: cluster.isWorker ? cluster.worker.id : 0,
+            pid: process.pid,
+            eventLoop,
+            pool: poolState(),
+            rss: memory.rss,
+            heapUsed: memory.heapUsed
+        }]
+    };
+}
+
+function mergeSeries(a, b) {
+    return {
+        total: new Histogram(a.total).merge(b.total).toJSON(),
+        recent: new Histogram(a.recent).merge(b.recent).toJSON()
+    };
+}
+
+function mergeSnapshots(snapshots) {
+    const routeMap = new Map();
+    const queryMap = new Map();
+    const merged = { routes: [], queries: [], poolWait: null, processes: [] };
+
+    for (const snap of snapshots) {
+        for (const r of snap.routes) {
+            const key = `${r.method} ${r.route}`;
+            const existing = routeMap.get(key);
+            if (!existing) {
+                routeMap.set(key, { ...r, statuses: { ...r.statuses } });
+                continue;
+            }
+            for (const [status, count] of Object.entries(r.statuses)) {
+                existing.statuses[status] = (existing.statuses[status] || 0) + count;
+            }
+            existing.duration = mergeSeries(existing.duration, r.duration);
+            existing.db = mergeSeries(existing.db, r.db);
+        }
+        for (const q of snap.queries) {
+            const existing = queryMap.get(q.sql);
+            queryMap.set(q.sql, existing ? { sql: q.sql, duration: mergeSeries(existing.duration, q.duration) } : q);
+        }
+        merged.poolWait = merged.poolWait ? mergeSeries(merged.poolWait, snap.poolWait) : snap.poolWait;
+        merged.processes.push(...snap.processes);
+    }
+
+    merged.routes = [...routeMap.values()];
+    merged.queries = [...queryMap.values()];
+    merged.poolWait = merged.poolWait || new Series().toJSON();
+    return merged;
+}
+
+// name{label="value",...}, with label values escaped
+function sample(name, labels) {
+    const pairs = Object.entries(labels)
+        .map(([label, value]) => `${label}="${String(value).replace(/\\/g, '\\\\').replace(/"/g, '\\"').replace(/\n/g, '\\n')}"`);
+    return pairs.length ? `${name}{${pairs.join(',')}}` : name;
+}
+
+// Prometheus text exposition of a snapshot
+function renderMetrics(snap) {
+    const lines = [];
+    const histogram = (name, labels, series) => {
+        const hist = series.total;
+        let cumulative = 0;
+        BUCKETS.forEach((bound, i) => {
+            cumulative += hist.counts[i];
+            lines.push(`${sample(`${name}_bucket`, { ...labels, le: bound })} ${cumulative}`);
+        });
+        lines.push(`${sample(`${name}_bucket`, { ...labels, le: '+Inf' })} ${hist.count}`);
+        lines.push(`${sample(`${name}_sum`, labels)} ${hist.sum}`);
+        lines.push(`${sample(`${name}_count`, labels)} ${hist.count}`);
+    };
+    const quantiles = (name, labels, series) => {
+        const recent = new Histogram(series.recent);
+        for (const q of QUANTILES) {
+            lines.push(`${sample(name, { ...labels, quantile: q })} ${recent.quantile(q)}`);
+        }
+    };
+
+    lines.push('# HELP http_request_duration_seconds Request latency by route.');
+    lines.push('# TYPE http_request_duration_seconds histogram');
+    for (const r of snap.routes) histogram('http_request_duration_seconds', { method: r.method, route: r.route }, r.duration);
+
+    lines.push('# HELP http_request_duration_recent_seconds Request latency quantiles over the last window.');
+    lines.push('# TYPE http_request_duration_recent_seconds gauge');
+    for (const r of snap.routes) quantiles('http_request_duration_recent_seconds', { method: r.method, route: r.route }, r.duration);
+
+    lines.push('# HELP http_request_db_seconds Time spent in database queries per request, by route.');
+    lines.push('# TYPE http_request_db_seconds histogram');
+    for (const r of snap.routes) histogram('http_request_db_seconds', { method: r.method, route: r.route }, r.db);
+
+    lines.push('# HELP http_requests_total Requests by route and status class.');
+    lines.push('# TYPE http_requests_total counter');
+    for (const r of snap.routes) {
+        for (const [status, count] of Object.entries(r.statuses)) {
+            lines.push(`${sample('http_requests_total', { method: r.method, route: r.route, status })} ${count}`);
+        }
+    }
+
+    lines.push('# HELP db_query_duration_seconds Query time by normalized SQL.');
+    lines.push('# TYPE db_query_duration_seconds summary');
+    for (const q of snap.queries) {
+        quantiles('db_query_duration_seconds', { sql: q.sql }, q.duration);
+        lines.push(`${sample('db_query_duration_seconds_sum', { sql: q.sql })} ${q.duration.total.sum}`);
+        lines.push(`${sample('db_query_duration_seconds_count', { sql: q.sql })} ${q.duration.total.count}`);
+    }
+
+    lines.push('# HELP db_pool_wait_seconds Time waiting to acquire a pooled connection.');
+    lines.push('# TYPE db_pool_wait_seconds histogram');
+    histogram('db_pool_wait_seconds', {}, snap.poolWait);
+
+    lines.push('# HELP db_pool_connections Pool connections by state.');
+    lines.push('# TYPE db_pool_connections gauge');
+    for (const p of snap.processes) {
+        if (!p.pool) continue;
+        for (const [state, count] of Object.entries(p.pool)) {
+            lines.push(`${sample('db_pool_connections', { worker: p.worker, state })} ${count}`);
+        }
+    }
+
+    lines.push('# HELP nodejs_eventloop_lag_seconds Event loop delay over the last window.');
+    lines.push('# TYPE nodejs_eventloop_lag_seconds gauge');
+    for (const p of snap.processes) {
+        lines.push(`${sample('nodejs_eventloop_lag_seconds', { worker: p.worker, quantile: 0.5 })} ${p.eventLoop.p50}`);
+        lines.push(`${sample('nodejs_eventloop_lag_seconds', { worker: p.worker, quantile: 0.99 })} ${p.eventLoop.p99}`);
+        lines.push(`${sample('nodejs_eventloop_lag_seconds', { worker: p.worker, quantile: 1 })} ${p.eventLoop.max}`);
+    }
+
+    lines.push('# HELP nodejs_eventloop_utilization Fraction of the last window the event loop was busy.');
+    lines.push('# TYPE nodejs_eventloop_utilization gauge');
+    for (const p of snap.processes) {
+        lines.push(`${sample('nodejs_eventloop_utilization', { worker: p.worker })} ${p.eventLoop.utilization}`);
+    }
+
+    lines.push('# HELP process_resident_memory_bytes Resident memory size.');
+    lines.push('# TYPE process_resident_memory_bytes gauge');
+    for (const p of snap.processes) {
+        lines.push(`${sample('process_resident_memory_bytes', { worker: p.worker })} ${p.rss}`);
+    }
+
+    return `${lines.join('\n')}\n`;
+}
+
+function flushAccessLog() {
+    accessLog.flush();
+}
+
+module.exports = {
+    Histogram,
+    instrumentRequests,
+    instrumentSequelize,
+    normalizeSql,
+    snapshot,
+    mergeSnapshots,
+    renderMetrics,
+    routeName,
+    flushAccessLog
+};
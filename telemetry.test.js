@@ -0,0 +1,61 @@
+const { routeName } = require('./telemetry');
+
+describe('routeName', () => {
+    test('replaces the tenant segment with the mount parameter', () => {
+        expect(routeName({
+            baseUrl: '/api/fashion-boutique/metrics',
+            tenantId: 'fashion-boutique',
+            route: { path: '/' }
+        })).toBe('/api/:tenantId/metrics/');
+        expect(routeName({
+            baseUrl: '/api/store-1/orders',
+            tenantId: 'store-1',
+            route: { path: '/:id' }
+        })).toBe('/api/:tenantId/orders/:id');
+    });
+
+    test('gives every tenant the same label', () => {
+        const labels = new Set(['store-1', 'store-2', 'tech-gadgets'].map(tenantId => routeName({
+            baseUrl: `/api/${tenantId}/customers`,
+            tenantId,
+            route: { path: '/' }
+        })));
+        expect([...labels]).toEqual(['/api/:tenantId/customers/']);
+    });
+
+    test('uses the app-level param before tenantContext has run', () => {
+        expect(routeName({
+            baseUrl: '/api/store-7/products',
+            params: { tenantId: 'store-7' }
+        })).toBe('/api/:tenantId/products/*');
+    });
+
+    test('matches percent-encoded tenant segments', () => {
+        expect(routeName({
+            baseUrl: '/api/caf%C3%A9/metrics',
+            tenantId: 'café',
+            route: { path: '/revenue' }
+        })).toBe('/api/:tenantId/metrics/revenue');
+    });
+
+    test('only replaces the tenant segment once', () => {
+        expect(routeName({
+            baseUrl: '/api/metrics/metrics',
+            tenantId: 'metrics',
+            route: { path: '/' }
+        })).toBe('/api/:tenantId/metrics/');
+    });
+
+    test('collapses numeric and uuid-like segments', () => {
+        expect(routeName({ baseUrl: '/api/42/customers', route: { path: '/' } }))
+            .toBe('/api/:id/customers/');
+        expect(routeName({ baseUrl: '/api/3f2c9a1e-8b7d-4c6a-9e1f-0a2b3c4d5e6f/orders', route: { path: '/' } }))
+            .toBe('/api/:id/orders/');
+    });
+
+    test('labels unmatched requests', () => {
+        expect(routeName({ baseUrl: '' })).toBe('other');
+        expect(routeName({ baseUrl: '/api/shopify' })).toBe('/api/shopify/*');
+        expect(routeName({ baseUrl: '', route: { path: '/health' } })).toBe('/health');
+    });
+});
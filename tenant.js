@@ -37,12 +37,28 @@ module.exports = (sequelize, DataTypes) => {
     webhook_secret: {
       type: DataTypes.STRING,
       allowNull: true
+    },
+    last_sync: {
+      type: DataTypes.DATE,
+      allowNull: true
+    },
+    sync_status: {
+      type: DataTypes.ENUM('idle', 'syncing', 'completed', 'failed'),
+      defaultValue: 'idle'
+    },
+    // Bumped by every write that can change metrics; cached metrics
+    // responses are only served at the version they were computed at
+    data_version: {
+      type: DataTypes.INTEGER,
+      allowNull: false,
+      defaultValue: 0
     }
   }, {
     tableName: 'tenants',
     indexes: [
       { fields: ['domain'] },
-      { fields: ['status'] }
+      { fields: ['status'] },
+      { fields: ['shopify_domain'] }
     ]
   });
 
@@ -1,7 +1,17 @@
 const express = require('express');
 const { Tenant } = require('../models');
+const { forgetShop } = require('../services/webhook_ingest');
+const { hasTenantAccess, invalidateUser, invalidateTenant } = require('../middleware/auth_context');
 const router = express.Router();
 
+// Tenant by id if the user is a member (membership comes from the cache)
+async function findUserTenant(user, tenantId) {
+  if (!await hasTenantAccess(user, tenantId)) {
+    return null;
+  }
+  return Tenant.findByPk(tenantId);
+}
+
 // Get user's tenants
 router.get('/', async (req, res) => {
   try {
@@ -40,6 +50,7 @@ router.post('/', async (req, res) => {
 
     // Associate with user
     await req.user.addTenant(tenant);
+    invalidateUser(req.user.id);
 
     res.status(201).json(tenant);
   } catch (error) {
@@ -54,8 +65,7 @@ router.get('/:id', async (req, res) => {
     const tenantId = req.params.id;
     
     // Check if user has access
-    const userTenants = await req.user.getTenants();
-    const tenant = userTenants.find(t => t.id === tenantId);
+    const tenant = await findUserTenant(req.user, tenantId);
     
     if (!tenant) {
       return res.status(404).json({ error: 'Tenant not found' });
@@ -75,14 +85,18 @@ router.put('/:id', async (req, res) => {
     const updates = req.body;
 
     // Check if user has access
-    const userTenants = await req.user.getTenants();
-    const tenant = userTenants.find(t => t.id === tenantId);
+    const tenant = await findUserTenant(req.user, tenantId);
     
     if (!tenant) {
       return res.status(404).json({ error: 'Tenant not found' });
     }
 
+    const previousShop = tenant.shopify_domain;
     await tenant.update(updates);
+    // Status, webhook secret or shop changes apply to the next request
+    invalidateTenant(tenantId);
+    forgetShop(previousShop);
+    forgetShop(tenant.shopify_domain);
     res.json(tenant);
   } catch (error) {
     console.error('Update tenant error:', error);
@@ -96,14 +110,15 @@ router.delete('/:id', async (req, res) => {
     const tenantId = req.params.id;
 
     // Check if user has access
-    const userTenants = await req.user.getTenants();
-    const tenant = userTenants.find(t => t.id === tenantId);
+    const tenant = await findUserTenant(req.user, tenantId);
     
     if (!tenant) {
       return res.status(404).json({ error: 'Tenant not found' });
     }
 
     await tenant.destroy();
+    invalidateTenant(tenantId);
+    forgetShop(tenant.shopify_domain);
     res.json({ message: 'Tenant deleted successfully' });
   } catch (error) {
     console.error('Delete tenant error:', error);
@@ -0,0 +1,139 @@
+const moment = require('moment');
+const { Op } = require('sequelize');
+const { DailyRollup } = require('../models');
+
+const GRANULARITIES = ['day', 'week', 'month'];
+const MAX_BUCKETS = 1000;
+
+// Dashboard date filters -> lookback window and default bucket size
+const PERIODS = {
+    '7days': { amount: 7, unit: 'days', granularity: 'day' },
+    '1month': { amount: 1, unit: 'month', granularity: 'day' },
+    '3months': { amount: 3, unit: 'months', granularity: 'week' },
+    '6months': { amount: 6, unit: 'months', granularity: 'month' },
+    '1year': { amount: 12, unit: 'months', granularity: 'month' }
+};
+const DEFAULT_PERIOD = '6months';
+
+class TimeSeriesError extends Error {
+    constructor(message) {
+        super(message);
+        this.name = 'TimeSeriesError';
+        this.status = 400;
+    }
+}
+
+// Bucket start (isoWeek starts on Monday)
+function bucketStart(date, granularity) {
+    return moment(date).startOf(granularity === 'week' ? 'isoWeek' : granularity);
+}
+
+// Resolve query params (period, from, to, granularity) into a concrete
+// range, aligned to whole buckets
+function resolveRange({ period, from, to, granularity } = {}) {
+    const preset = PERIODS[period || DEFAULT_PERIOD];
+    if (!preset && !from) {
+        throw new TimeSeriesError(`Unsupported period: ${period}`);
+    }
+
+    const size = granularity || preset?.granularity || 'day';
+    if (!GRANULARITIES.includes(size)) {
+        throw new TimeSeriesError(`Unsupported granularity: ${granularity}`);
+    }
+
+    const end = to ? moment(to, 'YYYY-MM-DD', true) : moment();
+    const start = from
+        ? moment(from, 'YYYY-MM-DD', true)
+        : end.clone().subtract(preset.amount, preset.unit).add(1, 'day');
+    if (!start.isValid() || !end.isValid() || start.isAfter(end)) {
+        throw new TimeSeriesError('Invalid date range');
+    }
+
+    const first = bucketStart(start, size);
+    const last = bucketStart(end, size);
+    const count = last.diff(first, size === 'week' ? 'weeks' : `${size}s`) + 1;
+    if (count > MAX_BUCKETS) {
+        throw new TimeSeriesError(`Range spans ${count} ${size} buckets; the limit is ${MAX_BUCKETS}`);
+    }
+
+    return { from: first, to: end, granularity: size, count };
+}
+
+function bucketLabel(start, granularity, multiYear) {
+    if (granularity === 'month') return start.format(multiYear ? 'MMM YYYY' : 'MMM');
+    return start.format(multiYear ? 'MMM D, YYYY' : 'MMM D');
+}
+
+// Revenue and order counts per bucket for a tenant. Reads the tenant's
+// daily rollups for the range in one scan of the (tenant_id, day) index,
+// so cost grows with the number of days, not the number of orders.
+// Buckets without orders are zero-filled.
+async function revenueSeries(tenantId, params = {}) {
+    const { from, to, granularity, count } = resolveRange(params);
+
+    const buckets = new Array(count);
+    const labels = new Array(count);
+    const revenue = new Float64Array(count);
+    const orders = new Uint32Array(count);
+    const multiYear = from.year() !== to.year();
+    const unit = granularity === 'week' ? 'weeks' : `${granularity}s`;
+
+    const cursor = from.clone();
+    for (let i = 0; i < count; i++) {
+        buckets[i] = cursor.format('YYYY-MM-DD');
+        labels[i] = bucketLabel(cursor, granularity, multiYear);
+        cursor.add(1, unit);
+    }
+
+    const rows = await DailyRollup.findAll({
+        attributes: ['day', 'orders_count', 'revenue'],
+        where: {
+            tenant_id: tenantId,
+            day: {
+                [Op.gte]: from.format('YYYY-MM-DD'),
+                [Op.lte]: to.format('YYYY-MM-DD')
+            }
+        },
+        order: [['day', 'ASC']],
+        raw: true
+    });
+
+    for (const row of rows) {
+        const index = bucketStart(row.day, granularity).diff(from, unit);
+        if (index < 0 || index >= count) continue;
+        revenue[index] += parseFloat(row.revenue) || 0;
+        orders[index] += row.orders_count || 0;
+    }
+
+    for (let i = 0; i < count; i++) {
+        revenue[i] = Math.round(revenue[i] * 100) / 100;
+    }
+
+    return {
+        granularity,
+        from: from.format('YYYY-MM-DD'),
+        to: to.format('YYYY-MM-DD'),
+        buckets,
+        labels,
+        revenue,
+        orders
+    };
+}
+
+// JSON-friendly copy of a series (typed arrays serialize as objects)
+function seriesToJSON(series) {
+    return {
+        ...series,
+        revenue: Array.from(series.revenue),
+        orders: Array.from(series.orders)
+    };
+}
+
+module.exports = {
+    revenueSeries,
+    seriesToJSON,
+    resolveRange,
+    TimeSeriesError,
+    PERIODS,
+    GRANULARITIES
+};
@@ -1,4 +1,4 @@
-const bcrypt = require('bcryptjs');
+const { passwordHasher } = require('../services/password_hasher');
 
 module.exports = (sequelize, DataTypes) => {
   const User = sequelize.define('User', {
@@ -61,20 +61,20 @@ module.exports = (sequelize, DataTypes) => {
     hooks: {
       beforeCreate: async (user) => {
         if (user.password) {
-          user.password = await bcrypt.hash(user.password, 10);
+          user.password = await passwordHasher.hash(user.password);
         }
       },
       beforeUpdate: async (user) => {
         if (user.changed('password')) {
-          user.password = await bcrypt.hash(user.password, 10);
+          user.password = await passwordHasher.hash(user.password);
         }
       }
     }
   });
 
-  // Instance methods
+  // Instance methods (bcrypt runs on the worker pool, off the event loop)
   User.prototype.validatePassword = async function(password) {
-    return await bcrypt.compare(password, this.password);
+    return await passwordHasher.compare(password, this.password);
   };
 
   User.prototype.toJSON = function() {
@@ -1,49 +1,29 @@
 const express = require("express");
-const crypto = require("crypto");
-const { Customer, Order, Product } = require("../models");
+const { ingestWebhook } = require("../services/webhook_ingest");
 
 const router = express.Router();
 
-// Middleware to capture raw body for HMAC
-router.use((req, res, next) => {
-  let data = [];
-  req.on("data", chunk => data.push(chunk));
-  req.on("end", () => {
-    req.rawBody = Buffer.concat(data).toString();
-    next();
-  });
-});
-
-// Verify Shopify HMAC
-function verifyShopify(req, res, next) {
-  const hmacHeader = req.get("X-Shopify-Hmac-Sha256");
-  const secret = process.env.SHOPIFY_API_SECRET;
-
-  const hash = crypto
-    .createHmac("sha256", secret)
-    .update(req.rawBody, "utf8")
-    .digest("base64");
-
-  if (hash !== hmacHeader) {
-    return res.status(401).send("Invalid HMAC");
-  }
-  next();
-}
+// HMAC is computed over the exact bytes Shopify sent, so the body stays a
+// Buffer (this router is mounted before the app-wide JSON parser)
+router.use(express.raw({ type: "*/*", limit: "5mb" }));
 
-// === Order webhook ===
-router.post("/orders", verifyShopify, express.json(), async (req, res) => {
+// Every topic posts here (/webhooks, /webhooks/orders, ...); the topic comes
+// from X-Shopify-Topic. Events are queued and written in micro-batches, so
+// Shopify gets its response without waiting on the database.
+router.post("*", async (req, res) => {
   try {
-    const order = req.body;
-    await Order.create({
-      customer_id: null, 
-      product_id: null,
-      total: order.total_price || 0,
-      tenant_id: 1, 
-      createdAt: new Date(order.created_at),
+    const status = await ingestWebhook({
+      shopDomain: req.get("X-Shopify-Shop-Domain"),
+      topic: req.get("X-Shopify-Topic"),
+      webhookId: req.get("X-Shopify-Webhook-Id"),
+      hmac: req.get("X-Shopify-Hmac-Sha256"),
+      rawBody: req.body
     });
 
-    console.log("✅ Order ingested:", order.id);
-    res.status(200).send("ok");
+    if (status === 503) {
+      res.set("Retry-After", "5");
+    }
+    res.status(status).send(status === 200 ? "ok" : "rejected");
   } catch (err) {
     console.error("❌ Webhook error:", err);
     res.status(500).send("error");
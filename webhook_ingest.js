@@ -0,0 +1,324 @@
+const crypto = require('crypto');
+const { Tenant, Order, sequelize } = require('../models');
+const { LruTtlCache } = require('./lru_cache');
+const { publish, subscribe } = require('./cluster_bus');
+const { ShopifyService } = require('./shopify_service');
+const { removeOrderLineItems } = require('./product_sales');
+const { refreshOrderDays } = require('./rollups');
+const { bumpDataVersion } = require('./metrics_cache');
+
+const BATCH_SIZE = parseInt(process.env.WEBHOOK_BATCH_SIZE, 10) || 250;
+const FLUSH_INTERVAL_MS = parseInt(process.env.WEBHOOK_FLUSH_MS, 10) || 200;
+// Events buffered across all tenants before webhooks are refused with 503
+const MAX_PENDING = parseInt(process.env.WEBHOOK_MAX_PENDING, 10) || 50000;
+const MAX_ATTEMPTS = 3;
+
+// Webhook topics -> sync entity. Other topics are acknowledged and ignored.
+const TOPICS = {
+    'customers/create': 'customers',
+    'customers/update': 'customers',
+    'orders/create': 'orders',
+    'orders/updated': 'orders',
+    'orders/paid': 'orders',
+    'orders/fulfilled': 'orders',
+    'orders/cancelled': 'orders',
+    // Payload is just { id }
+    'orders/delete': 'orderDeletes',
+    'products/create': 'products',
+    'products/update': 'products'
+};
+
+// Customers first so orders in the same flush resolve their customer ids;
+// deletes last so they win over updates buffered for the same order
+const FLUSH_ORDER = ['customers', 'products', 'orders', 'orderDeletes'];
+
+// Shop domain -> { tenantId, secret, storeDomain, accessToken }, or null
+// for shops we don't know, so bursts don't hit the tenants table per event
+const shops = new LruTtlCache({ max: 10000, ttlMs: 5 * 60 * 1000 });
+
+// Recently accepted X-Shopify-Webhook-Id values. Shopify redelivers on
+// timeouts, and retries arrive within minutes of the original.
+const seen = new LruTtlCache({ max: 200000, ttlMs: 60 * 60 * 1000 });
+
+const stats = {
+    received: 0,
+    duplicates: 0,
+    rejected: 0,
+    ignored: 0,
+    disconnected: 0,
+    refused: 0,
+    written: 0,
+    failed: 0,
+    flushes: 0
+};
+
+function shopName(domain) {
+    return String(domain || '').toLowerCase().replace('.myshopify.com', '');
+}
+
+async function resolveShop(domain) {
+    const name = shopName(domain);
+    if (!name) return null;
+
+    const cached = shops.get(name);
+    if (cached !== undefined) return cached;
+
+    // Tenants store the domain with or without the .myshopify.com suffix
+    const tenant = await Tenant.findOne({
+        attributes: ['id', 'shopify_domain', 'shopify_access_token', 'webhook_secret'],
+        where: {
+            shopify_domain: [name, `${name}.myshopify.com`],
+            status: 'active'
+        },
+        raw: true
+    });
+
+    const shop = tenant ? {
+        tenantId: tenant.id,
+        secret: tenant.webhook_secret || process.env.SHOPIFY_API_SECRET,
+        storeDomain: tenant.shopify_domain,
+        accessToken: tenant.shopify_access_token
+    } : null;
+    shops.set(name, shop);
+    return shop;
+}
+
+// Drop a cached shop after its tenant's domain, secret or status changes
+function forgetShop(domain) {
+    shops.delete(shopName(domain));
+    publish('webhook:shop', shopName(domain));
+}
+
+subscribe('webhook:shop', name => shops.delete(name));
+
+// Constant-time check of X-Shopify-Hmac-Sha256 against the raw body
+function verifyHmac(rawBody, header, secret) {
+    if (!header || !secret || !Buffer.isBuffer(rawBody)) return false;
+
+    const expected = crypto.createHmac('sha256', secret).update(rawBody).digest();
+    const received = Buffer.from(header, 'base64');
+    return received.length === expected.length && crypto.timingSafeEqual(received, expected);
+}
+
+function isDuplicate(webhookId) {
+    return !!webhookId && seen.get(webhookId) !== undefined;
+}
+
+// Buffers webhook payloads per tenant and entity, and writes them through
+// the tenant's SyncWriter (with the same hooks as a sync) once a batch
+// fills up or the flush interval passes. Repeated events for the same
+// Shopify object within a batch collapse to the latest one.
+class WebhookBatcher {
+    constructor({ batchSize = BATCH_SIZE, flushInterval = FLUSH_INTERVAL_MS, maxPending = MAX_PENDING } = {}) {
+        this.batchSize = batchSize;
+        this.flushInterval = flushInterval;
+        this.maxPending = maxPending;
+        this.tenants = new Map();
+        this.pending = 0;
+    }
+
+    // Queue a verified event. Returns false when the buffer is full, so the
+    // route can refuse it and let Shopify redeliver later.
+    accept(shop, entity, payload) {
+        if (this.pending >= this.maxPending) return false;
+
+        const state = this.tenantState(shop);
+        const queue = state.queues[entity];
+        const previous = queue.get(payload.id);
+        if (!previous || !isOlder(payload, previous.payload)) {
+            queue.set(payload.id, { payload, attempts: 0 });
+        }
+        if (!previous) this.pending += 1;
+
+        if (queue.size >= this.batchSize) {
+            this.schedule(state, 0);
+        } else {
+            this.schedule(state, this.flushInterval);
+        }
+        return true;
+    }
+
+    tenantState(shop) {
+        let state = this.tenants.get(shop.tenantId);
+        if (!state) {
+            state = {
+                tenantId: shop.tenantId,
+                service: new ShopifyService(shop.tenantId, {
+                    storeDomain: shop.storeDomain,
+                    accessToken: shop.accessToken
+                }),
+                queues: { customers: new Map(), orders: new Map(), products: new Map(), orderDeletes: new Map() },
+                timer: null,
+                flushing: Promise.resolve()
+            };
+            this.tenants.set(shop.tenantId, state);
+        }
+        return state;
+    }
+
+    schedule(state, delay) {
+        if (state.timer && delay > 0) return;
+        clearTimeout(state.timer);
+        state.timer = setTimeout(() => {
+            state.timer = null;
+            this.flushTenant(state);
+        }, delay);
+    }
+
+    // Flushes of one tenant run one after another
+    flushTenant(state) {
+        state.flushing = state.flushing.then(() => this.writeTenant(state));
+        return state.flushing;
+    }
+
+    async writeTenant(state) {
+        for (const entity of FLUSH_ORDER) {
+            const queue = state.queues[entity];
+            if (queue.size === 0) continue;
+
+            const events = [...queue.values()];
+            queue.clear();
+            this.pending -= events.length;
+
+            try {
+                const records = events.map(event => event.payload);
+                if (entity === 'orderDeletes') {
+                    await removeOrders(state.tenantId, records.map(order => order.id));
+                    stats.written += events.length;
+                    stats.flushes += 1;
+                    continue;
+                }
+                if (entity === 'orders') {
+                    await state.service.customerIndex.ensure(records.map(o => o.customer?.id));
+                }
+                const rows = state.service.normalize(entity, records);
+                await state.service.writer.write(entity, rows);
+                stats.written += events.length;
+                stats.flushes += 1;
+            } catch (error) {
+                console.error(`Webhook flush failed for tenant ${state.tenantId} (${entity}):`, error);
+                this.requeue(state, entity, events);
+            }
+        }
+
+        const remaining = FLUSH_ORDER.some(entity => state.queues[entity].size > 0);
+        if (remaining) {
+            this.schedule(state, this.flushInterval);
+        } else if (!state.timer) {
+            this.tenants.delete(state.tenantId);
+        }
+    }
+
+    // Retry failed events on a later flush. Events still failing after
+    // MAX_ATTEMPTS are dropped; the next incremental sync picks them up
+    // from Shopify by updated_at.
+    requeue(state, entity, events) {
+        const queue = state.queues[entity];
+        for (const event of events) {
+            event.attempts += 1;
+            if (event.attempts >= MAX_ATTEMPTS) {
+                stats.failed += 1;
+                continue;
+            }
+            if (!queue.has(event.payload.id)) {
+                queue.set(event.payload.id, event);
+                this.pending += 1;
+            }
+        }
+    }
+
+    // Write everything still buffered, e.g. on shutdown
+    async flushAll() {
+        await Promise.all([...this.tenants.values()].map((state) => {
+            clearTimeout(state.timer);
+            state.timer = null;
+            return this.flushTenant(state);
+        }));
+    }
+}
+
+// Delete orders removed in Shopify, with their line items (and so their
+// product sales) and their days' rollups, in one transaction
+async function removeOrders(tenantId, shopifyOrderIds) {
+    await sequelize.transaction(async (transaction) => {
+        const where = { tenant_id: tenantId, shopify_order_id: shopifyOrderIds };
+        const orders = await Order.findAll({ attributes: ['date'], where, raw: true, transaction });
+        await Order.destroy({ where, transaction });
+        await removeOrderLineItems(tenantId, shopifyOrderIds, transaction);
+        await refreshOrderDays(tenantId, orders.map(order => order.date), transaction);
+    });
+    // After commit, as SyncWriter does
+    await bumpDataVersion(tenantId);
+}
+
+function isOlder(payload, other) {
+    if (!payload.updated_at || !other.updated_at) return false;
+    return new Date(payload.updated_at) < new Date(other.updated_at);
+}
+
+const batcher = new WebhookBatcher();
+
+// Verify, deduplicate and queue one webhook delivery. Returns the HTTP
+// status to answer with; nothing here waits on the database except the
+// (cached) shop lookup.
+async function ingestWebhook({ shopDomain, topic, webhookId, hmac, rawBody }) {
+    stats.received += 1;
+
+    const shop = await resolveShop(shopDomain);
+    if (!shop) {
+        stats.rejected += 1;
+        return 404;
+    }
+    if (!verifyHmac(rawBody, hmac, shop.secret)) {
+        stats.rejected += 1;
+        return 401;
+    }
+    // No access token: the shop is not connected, so there is no service
+    // to write through. Acknowledge so Shopify stops redelivering; the
+    // first sync after connecting picks the change up.
+    if (!shop.accessToken) {
+        stats.disconnected += 1;
+        return 200;
+    }
+
+    if (isDuplicate(webhookId)) {
+        stats.duplicates += 1;
+        return 200;
+    }
+
+    const entity = TOPICS[topic];
+    if (!entity) {
+        stats.ignored += 1;
+        return 200;
+    }
+
+    let payload;
+    try {
+        payload = JSON.parse(rawBody.toString('utf8'));
+    } catch (error) {
+        stats.rejected += 1;
+        return 400;
+    }
+
+    if (!batcher.accept(shop, entity, payload)) {
+        stats.refused += 1;
+        return 503;
+    }
+    if (webhookId) seen.set(webhookId, true);
+    return 200;
+}
+
+function getWebhookStats() {
+    return { ...stats, pending: batcher.pending, tenants: batcher.tenants.size };
+}
+
+module.exports = {
+    ingestWebhook,
+    verifyHmac,
+    resolveShop,
+    forgetShop,
+    getWebhookStats,
+    flushWebhooks: () => batcher.flushAll(),
+    WebhookBatcher,
+    TOPICS
+};